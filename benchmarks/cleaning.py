@@ -0,0 +1,113 @@
+import sys
+import time
+import getopt
+import numpy as np
+import pandas as pd
+from data_lib.datalibutils import column_trim, number_to_string, clean_dataframe
+
+
+def legacy_column_trim(df):
+    # applymap implementation replaced by the vectorized column_trim
+    trim_strings = lambda x: x.strip() if isinstance(x, str) else x
+    return df.applymap(trim_strings)
+
+
+def legacy_number_to_string(df):
+    # loop implementation replaced by number_to_string, it only ever looked at the first column
+    for col in df.columns:
+        if "ID" in col:
+            df[col] = "'" + df[col]
+            return df
+        else:
+            return df
+
+
+def get_args(argv):
+    """
+    It takes the command line arguments and returns the benchmark settings
+
+    :param argv: This is the list of command-line arguments
+    :return: The number of rows and the number of runs
+    """
+    rows, runs = 1_000_000, 3
+    arg_help = "{0} -n <rows> -r <runs>".format(argv[0])
+
+    try:
+        opts, args = getopt.getopt(argv[1:], "hn:r:", ["help", "rows=", "runs="])
+    except getopt.GetoptError:
+        print(arg_help)
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt in ("-h", "--help"):
+            print(arg_help)
+            sys.exit(2)
+        elif opt in ("-n", "--rows"):
+            rows = int(arg)
+        elif opt in ("-r", "--runs"):
+            runs = int(arg)
+
+    return rows, runs
+
+
+def sample_frame(rows, seed=0):
+    """
+    It builds a dataframe with padded string columns, numeric columns and an ID column
+
+    :param rows: The number of rows
+    :param seed: The random seed
+    :return: a pandas DataFrame.
+    """
+    rng = np.random.default_rng(seed)
+    regions = np.array(["  North ", "South  ", " East", "West ", "NULL", ""], dtype=object)
+    return pd.DataFrame(
+        {
+            "CUSTOMER_ID": rng.integers(1, 10**9, rows).astype(str),
+            "REGION": regions[rng.integers(0, len(regions), rows)],
+            "PRODUCT": np.char.add(" P", rng.integers(0, 500, rows).astype(str)).astype(object),
+            "UNITS": rng.integers(0, 1000, rows),
+            "AMOUNT": rng.random(rows) * 1000,
+        }
+    )
+
+
+def best_time(fn, df, runs):
+    """
+    It runs a function on a copy of the dataframe several times
+
+    :return: the fastest run time in seconds.
+    """
+    timings = []
+    for _ in range(runs):
+        data = df.copy()
+        start = time.perf_counter()
+        fn(data)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    """
+    It compares the vectorized cleaning functions with the applymap and loop implementations
+    """
+    rows, runs = get_args(sys.argv)
+    df = sample_frame(rows)
+
+    cases = [
+        ("column_trim", legacy_column_trim, column_trim),
+        ("number_to_string", legacy_number_to_string, number_to_string),
+        ("clean_dataframe", lambda d: legacy_number_to_string(legacy_column_trim(d)), clean_dataframe),
+    ]
+
+    print(f"{rows:,} rows, best of {runs}")
+    for name, legacy, current in cases:
+        legacy_time = best_time(legacy, df, runs)
+        current_time = best_time(current, df, runs)
+        print(
+            f"{name:<18} legacy {legacy_time:>8.3f} s   vectorized {current_time:>8.3f} s"
+            f"   {legacy_time / current_time:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import sys
+import getopt
+import subprocess
+
+# optional dependencies that must not be loaded by a plain import
+HEAVY_MODULES = ["xlwings", "snowflake.snowpark", "nbconvert", "traitlets", "keyring", "win32com"]
+
+
+def get_args(argv):
+    """
+    It takes the command line arguments and returns the benchmark settings
+
+    :param argv: This is the list of command-line arguments
+    :return: The module to import, the number of runs and the import time limit in milliseconds
+    """
+    module, runs, max_ms = "data_lib.datagetter", 5, None
+    arg_help = "{0} -m <module> -r <runs> -t <max milliseconds>".format(argv[0])
+
+    try:
+        opts, args = getopt.getopt(argv[1:], "hm:r:t:", ["help", "module=", "runs=", "max-ms="])
+    except getopt.GetoptError:
+        print(arg_help)
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt in ("-h", "--help"):
+            print(arg_help)
+            sys.exit(2)
+        elif opt in ("-m", "--module"):
+            module = arg
+        elif opt in ("-r", "--runs"):
+            runs = int(arg)
+        elif opt in ("-t", "--max-ms"):
+            max_ms = float(arg)
+
+    return module, runs, max_ms
+
+
+def import_times(module):
+    """
+    It imports a module in a fresh interpreter with `-X importtime` and parses the report
+
+    :param module: The module to be imported
+    :return: a dictionary of imported module names and their cumulative import time in microseconds
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    """
+    It measures the import time of the package and fails when a heavy optional dependency is
+    imported or when the import is slower than the limit
+    """
+    module, runs, max_ms = get_args(sys.argv)
+
+    # the fastest run is the least noisy measure of the import cost
+    times = min((import_times(module) for _ in range(runs)), key=lambda t: t[module])
+    total_ms = times[module] / 1000
+
+    print(f"import {module}: {total_ms:.1f} ms (best of {runs})")
+    for name, cumulative in sorted(times.items(), key=lambda t: -t[1])[:15]:
+        print(f"    {cumulative / 1000:>9.1f} ms  {name}")
+
+    failed = False
+    heavy = [name for name in times if name.split(".")[0] in HEAVY_MODULES or name in HEAVY_MODULES]
+    if heavy:
+        print(f"heavy optional modules imported: {', '.join(sorted(heavy))}")
+        failed = True
+    if max_ms is not None and total_ms > max_ms:
+        print(f"import time {total_ms:.1f} ms is above the {max_ms:.1f} ms limit")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+import os
+import sys
+import json
+import time
+import getopt
+import shutil
+import platform
+import tempfile
+import pandas as pd
+import keyring
+from keyring.backend import KeyringBackend
+from data_lib import DataGetter, engine_registry, credential_cache
+from data_lib.datalibutils import column_trim, number_to_string, create_database_uri
+from benchmarks.cleaning import sample_frame
+
+
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+PROJECT_FOLDERS = [
+    "01_notebooks",
+    "02_data/01_input_files",
+    "02_data/02_input_query",
+    "02_data/03_stage_files",
+    "02_data/04_output_files",
+    "02_data/05_archived_files",
+]
+
+
+class MemoryKeyring(KeyringBackend):
+    """
+    An in-memory keyring so init_database runs offline against the generated SQLite database
+    """
+
+    priority = 1
+
+    def __init__(self, passwords):
+        super().__init__()
+        self._passwords = passwords
+
+    def get_password(self, service, username):
+        return self._passwords.get((service, username))
+
+    def set_password(self, service, username, password):
+        self._passwords[(service, username)] = password
+
+    def delete_password(self, service, username):
+        self._passwords.pop((service, username), None)
+
+
+def get_args(argv):
+    """
+    It takes the command line arguments and returns the benchmark settings
+
+    :param argv: This is the list of command-line arguments
+    :return: a dictionary of settings
+    """
+    settings = {
+        "rows": [10_000, 100_000],
+        "runs": 3,
+        "cases": None,
+        "output": os.path.join(RESULTS_PATH, "latest.json"),
+        "baseline": os.path.join(RESULTS_PATH, "baseline.json"),
+        "tolerance": 1.25,
+        "save_baseline": False,
+    }
+    arg_help = (
+        "{0} -n <rows,rows> -r <runs> -c <case,case> -o <output> -b <baseline> "
+        "-t <tolerance> --save-baseline".format(argv[0])
+    )
+
+    try:
+        opts, args = getopt.getopt(
+            argv[1:],
+            "hn:r:c:o:b:t:",
+            ["help", "rows=", "runs=", "cases=", "output=", "baseline=", "tolerance=", "save-baseline"],
+        )
+    except getopt.GetoptError:
+        print(arg_help)
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt in ("-h", "--help"):
+            print(arg_help)
+            sys.exit(2)
+        elif opt in ("-n", "--rows"):
+            settings["rows"] = [int(rows) for rows in arg.split(",")]
+        elif opt in ("-r", "--runs"):
+            settings["runs"] = int(arg)
+        elif opt in ("-c", "--cases"):
+            settings["cases"] = arg.split(",")
+        elif opt in ("-o", "--output"):
+            settings["output"] = arg
+        elif opt in ("-b", "--baseline"):
+            settings["baseline"] = arg
+        elif opt in ("-t", "--tolerance"):
+            settings["tolerance"] = float(arg)
+        elif opt == "--save-baseline":
+            settings["save_baseline"] = True
+
+    return settings
+
+
+def create_project(root, rows):
+    """
+    It creates a project folder with a SQLite database, a query file and CSV and Parquet input files
+
+    :param root: The project folder
+    :param rows: The number of generated rows
+    :return: the path of the SQLite database.
+    """
+    for folder in PROJECT_FOLDERS:
+        os.makedirs(os.path.join(root, folder), exist_ok=True)
+
+    df = sample_frame(rows)
+    database = os.path.join(root, "02_data", "bench.db")
+    getter = DataGetter()
+    getter._engine = getter.set_engine(f"sqlite:///{database}")
+    getter.load_dataframe(df, "sales", mode="replace", batch_size=50_000)
+    getter._engine.dispose()
+
+    with open(os.path.join(root, "02_data", "02_input_query", "bench_sales.sql"), "w") as put:
+        put.write("SELECT * FROM sales WHERE UNITS >= {min_units}")
+
+    df.to_csv(os.path.join(root, "02_data", "01_input_files", "sales.csv"), index=False)
+    df.to_parquet(os.path.join(root, "02_data", "01_input_files", "sales.parquet"), index=False)
+    return database
+
+
+def use_memory_keyring(database):
+    """
+    It stores the credentials of the generated SQLite database in an in-memory keyring
+    """
+    values = {"User": "bench", "Password": "bench", "Host": "localhost", "Port": "0", "Database": database}
+    keys = {"User": "username", "Password": "password", "Host": "host", "Port": "port", "Database": "database"}
+    keyring.set_keyring(
+        MemoryKeyring({(f"SQLite_Bench_{name}", keys[name]): value for name, value in values.items()})
+    )
+    credential_cache.invalidate()
+
+
+def build_cases(db, frame):
+    """
+    It returns the benchmark cases, functions that take no arguments
+
+    :param db: A DataGetter connected to the generated database
+    :param frame: The generated dataframe
+    :return: a dictionary of case names and functions.
+    """
+
+    def cold_init_database():
+        engine_registry.shutdown()
+        credential_cache.invalidate()
+        DataGetter().init_database("sqlite", "Bench")
+
+    def chunked_query():
+        for _ in db.iter_sql_query("bench_sales", chunksize=50_000, min_units=0):
+            pass
+
+    cases = {
+        "create_database_uri": lambda: create_database_uri("sqlite", "Bench"),
+        "init_database_cold": cold_init_database,
+        "init_database_warm": lambda: DataGetter().init_database("sqlite", "Bench"),
+        "run_sql_query": lambda: db.run_sql_query("bench_sales", min_units=0),
+        "iter_sql_query": chunked_query,
+        "read_file_csv": lambda: db.read_file(pd.read_csv, "sales.csv"),
+        "read_file_parquet": lambda: db.read_file(pd.read_parquet, "sales.parquet"),
+        "column_trim": lambda: column_trim(frame),
+        "number_to_string": lambda: number_to_string(frame),
+        "export_csv": lambda: db.export_data(frame, custom_filename="bench.csv"),
+        "export_parquet": lambda: db.export_data(frame, custom_filename="bench.parquet"),
+        "export_xlsx": lambda: db.export_data(frame, custom_filename="bench.xlsx"),
+    }
+
+    # a single xlsx sheet holds at most 1,048,576 rows including the header
+    if len(frame) >= 1_048_576:
+        cases.pop("export_xlsx")
+    return cases
+
+
+def time_case(function, runs):
+    """
+    It runs a benchmark case several times
+
+    :return: the best and mean run time in seconds.
+    """
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), sum(timings) / len(timings)
+
+
+def run_suite(settings):
+    """
+    It runs every benchmark case for every row count in a temporary project folder
+
+    :return: a list of results.
+    """
+    results = []
+    cwd = os.getcwd()
+
+    for rows in settings["rows"]:
+        root = tempfile.mkdtemp(prefix="data_lib_bench_")
+        try:
+            database = create_project(root, rows)
+            use_memory_keyring(database)
+            # DataGetter resolves the project folder from the notebooks folder
+            os.chdir(os.path.join(root, "01_notebooks"))
+
+            db = DataGetter()
+            db.init_database("sqlite", "Bench")
+            frame = db.run_sql_query("bench_sales", min_units=0)
+
+            for case, function in build_cases(db, frame).items():
+                if settings["cases"] is not None and case not in settings["cases"]:
+                    continue
+                best, mean = time_case(function, settings["runs"])
+                results.append({"case": case, "rows": rows, "best": best, "mean": mean})
+                print(f"{case:<22} {rows:>12,} rows   best {best:>9.4f} s   mean {mean:>9.4f} s")
+        finally:
+            os.chdir(cwd)
+            engine_registry.shutdown()
+            shutil.rmtree(root, ignore_errors=True)
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    It compares the best run times with a baseline
+
+    :param results: The results of this run
+    :param baseline: The results of the baseline run
+    :param tolerance: The slowdown ratio above which a case is a regression
+    :return: the list of regressed cases.
+    """
+    baseline_times = {(result["case"], result["rows"]): result["best"] for result in baseline}
+    regressions = []
+
+    print(f"\ncompared with the baseline, regression above {tolerance:.2f}x")
+    for result in results:
+        previous = baseline_times.get((result["case"], result["rows"]))
+        if previous is None:
+            continue
+        ratio = result["best"] / previous if previous > 0 else float("inf")
+        flag = "REGRESSION" if ratio > tolerance else ""
+        print(f"{result['case']:<22} {result['rows']:>12,} rows   {ratio:>6.2f}x {flag}")
+        if ratio > tolerance:
+            regressions.append(result)
+    return regressions
+
+
+def main():
+    """
+    It runs the benchmark suite, saves the results and compares them with the stored baseline
+    """
+    settings = get_args(sys.argv)
+    results = run_suite(settings)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "cpus": os.cpu_count(),
+        },
+        "runs": settings["runs"],
+        "results": results,
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(settings["output"])), exist_ok=True)
+    with open(settings["output"], "w") as put:
+        json.dump(report, put, indent=2)
+    print(f"\nresults saved to {settings['output']}")
+
+    if settings["save_baseline"]:
+        shutil.copyfile(settings["output"], settings["baseline"])
+        print(f"baseline saved to {settings['baseline']}")
+        return
+
+    if os.path.exists(settings["baseline"]):
+        with open(settings["baseline"]) as get:
+            baseline = json.load(get)["results"]
+        if compare(results, baseline, settings["tolerance"]):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
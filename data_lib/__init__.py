@@ -1,2 +1,37 @@
-from data_lib.datagetter import DataGetter
-from data_lib.datalibutils import create_folder_tree, notebook_to_html
\ No newline at end of file
+import importlib
+
+# public names and the modules they live in, imported on first access so
+# `import data_lib` stays cheap
+_lazy_imports = {
+    "DataGetter": "data_lib.datagetter",
+    "AsyncDataGetter": "data_lib.asyncgetter",
+    "async_engines": "data_lib.asyncgetter",
+    "QueryCache": "data_lib.querycache",
+    "engine_registry": "data_lib.dbcon",
+    "tracer": "data_lib.tracing",
+    "JsonLinesSink": "data_lib.tracing",
+    "MetricsAggregator": "data_lib.tracing",
+    "PrometheusTextfileSink": "data_lib.tracing",
+    "LocalSession": "data_lib.snowparkpool",
+    "credential_cache": "data_lib.credentials",
+    "KeyringProvider": "data_lib.credentials",
+    "EnvironmentProvider": "data_lib.credentials",
+    "EncryptedFileProvider": "data_lib.credentials",
+    "create_folder_tree": "data_lib.datalibutils",
+    "notebook_to_html": "data_lib.datalibutils",
+    "notebooks_to_html": "data_lib.datalibutils",
+}
+
+__all__ = list(_lazy_imports)
+
+
+def __getattr__(name):
+    if name in _lazy_imports:
+        value = getattr(importlib.import_module(_lazy_imports[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
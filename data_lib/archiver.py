@@ -0,0 +1,219 @@
+import os
+import re
+import time
+import gzip
+import queue
+import atexit
+import shutil
+import tarfile
+import datetime as dt
+import threading
+import weakref
+
+
+# file extension added by each compression
+COMPRESSION_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+
+# seconds the background worker waits for new files before it exits
+WORKER_IDLE_SECONDS = 5
+
+# archivers whose queued files are compressed before the process exits
+_archivers = weakref.WeakSet()
+
+
+class Archiver:
+    def __init__(self, archive_path, compression="gzip", keep=None, max_age_days=None):
+        """
+        This is the constructor function for the archiver of superseded files. Files are moved to the
+        archive folder right away and compressed on a background worker, so callers never wait on the
+        compression of large files.
+
+        :param archive_path: The archive folder
+        :param compression: "gzip", or "zstd" when the zstandard package is installed
+        :param keep: The number of archived versions kept per file, all of them if None
+        :param max_age_days: The number of days archived versions are kept, forever if None
+        """
+        self._archive_path = archive_path
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self.configure(compression, keep, max_age_days)
+        _archivers.add(self)
+
+    def configure(self, compression="gzip", keep=None, max_age_days=None):
+        """
+        This function sets the compression and the retention policy of the files archived from now on.
+
+        :param compression: "gzip", or "zstd" when the zstandard package is installed
+        :param keep: The number of archived versions kept per file, all of them if None
+        :param max_age_days: The number of days archived versions are kept, forever if None
+        """
+        if compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError(
+                f"Unsupported compression: {compression}. Supported compressions: gzip, zstd."
+            )
+        if compression == "zstd":
+            try:
+                import zstandard
+            except ImportError:
+                print("zstandard is not installed, archived files will be compressed with gzip.")
+                compression = "gzip"
+
+        self.compression = compression
+        self.keep = keep
+        self.max_age_days = max_age_days
+
+    def archive(self, file_path):
+        """
+        This function moves a file or a folder to the archive folder with a timestamp and queues its
+        compression and the retention policy of its archived versions.
+
+        :param file_path: The file or folder to be archived
+        :return: the archived path, or None when file_path does not exist.
+        """
+        if not os.path.exists(file_path):
+            return None
+
+        os.makedirs(self._archive_path, exist_ok=True)
+        stem, extension = os.path.splitext(os.path.basename(file_path.rstrip("/\\")))
+        timestamp = dt.datetime.today().strftime("%Y%m%d_%H%M%S_%f")
+        archived_path = os.path.join(self._archive_path, f"{stem}__{timestamp}{extension}")
+
+        # a rename on the same drive, the slow compression happens in the background
+        shutil.move(file_path, archived_path)
+
+        # the versions of a file share its name and extension around the timestamp
+        versions = re.compile(rf"^{re.escape(stem)}__\d{{8}}_\d{{6}}_\d{{6}}{re.escape(extension)}(\.|$)")
+        self._queue.put((archived_path, versions))
+        self._start_worker()
+        return archived_path
+
+    def flush(self):
+        """
+        This function waits until every queued file is compressed.
+        """
+        self._queue.join()
+
+    def close(self):
+        """
+        This function compresses the queued files and stops the background worker.
+        """
+        with self._lock:
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            self._queue.put(None)
+            worker.join()
+
+    def _start_worker(self):
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="data_lib_archiver", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=WORKER_IDLE_SECONDS)
+            except queue.Empty:
+                # the worker exits when it is idle, the next archive starts a new one
+                with self._lock:
+                    if self._queue.empty():
+                        self._worker = None
+                        return
+                continue
+            try:
+                if item is None:
+                    return
+                archived_path, versions = item
+                self._compress(archived_path)
+                self._apply_retention(versions)
+            except Exception as e:
+                print(f"Archiving failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _compress(self, archived_path):
+        if not os.path.exists(archived_path):
+            # removed by the retention policy before it was compressed
+            return
+
+        is_folder = os.path.isdir(archived_path)
+        extension = (".tar" if is_folder else "") + COMPRESSION_EXTENSIONS[self.compression]
+        compressed_path = archived_path + extension
+        temp_path = compressed_path + ".tmp"
+
+        with self._open_compressed(temp_path) as compressed:
+            if is_folder:
+                with tarfile.open(fileobj=compressed, mode="w|") as tar:
+                    tar.add(archived_path, arcname=os.path.basename(archived_path))
+            else:
+                with open(archived_path, "rb") as source:
+                    shutil.copyfileobj(source, compressed, 1024 * 1024)
+
+        os.replace(temp_path, compressed_path)
+        if is_folder:
+            shutil.rmtree(archived_path)
+        else:
+            os.remove(archived_path)
+
+    def _open_compressed(self, path):
+        if self.compression == "zstd":
+            import zstandard
+
+            return zstandard.ZstdCompressor().stream_writer(open(path, "wb"), closefd=True)
+        return gzip.open(path, "wb")
+
+    def _apply_retention(self, versions_pattern):
+        versions = sorted(
+            (name for name in os.listdir(self._archive_path) if versions_pattern.match(name)),
+            reverse=True,
+        )
+        expired = []
+        if self.keep is not None:
+            expired.extend(versions[self.keep:])
+        if self.max_age_days is not None:
+            cutoff = time.time() - self.max_age_days * 86400
+            expired.extend(
+                name for name in versions
+                if os.path.getmtime(os.path.join(self._archive_path, name)) < cutoff
+            )
+
+        for name in set(expired):
+            path = os.path.join(self._archive_path, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.exists(path):
+                os.remove(path)
+
+
+_shared_archivers = {}
+_shared_lock = threading.Lock()
+
+
+def shared_archiver(archive_path):
+    """
+    Returns the archiver of an archive folder, every caller in the process shares one instance per
+    folder so they share its background worker and its retention policy
+
+    Parameters
+    ----------
+    archive_path : str
+        The archive folder
+
+    Returns
+    -------
+    Archiver
+        The archiver of the folder
+    """
+    folder = os.path.abspath(archive_path)
+    with _shared_lock:
+        archiver = _shared_archivers.get(folder)
+        if archiver is None:
+            archiver = _shared_archivers[folder] = Archiver(archive_path)
+    return archiver
+
+
+@atexit.register
+def _close_archivers():
+    for archiver in list(_archivers):
+        archiver.close()
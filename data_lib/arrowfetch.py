@@ -0,0 +1,111 @@
+import importlib
+import pandas as pd
+from .sqltemplate import sql_templates
+from .tracing import tracer
+
+
+# ADBC driver module of each backend
+ADBC_DRIVERS = {
+    "postgresql": "adbc_driver_postgresql.dbapi",
+    "sqlite": "adbc_driver_sqlite.dbapi",
+}
+
+
+def _adbc_module(backend):
+    module = ADBC_DRIVERS.get(backend)
+    if module is None:
+        return None
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        return None
+
+
+def fetch_arrow_table(engine, sql_text, params=None):
+    """
+    Runs a query with the native Arrow result sets of the driver: the Snowflake connector, or ADBC for
+    postgresql and sqlite when it is installed
+
+    Parameters
+    ----------
+    engine : sqlalchemy.engine.Engine
+        The database engine
+    sql_text : str
+        The resolved SQL text
+    params : dict
+        The bind parameters, written as `:name` in the SQL text
+
+    Returns
+    -------
+    pyarrow.Table
+        The results, or None when the driver has no native Arrow support
+    """
+    backend = engine.url.get_backend_name()
+
+    if backend == "snowflake":
+        return _snowflake_arrow(engine, sql_text, params)
+
+    adbc = _adbc_module(backend)
+    if adbc is not None and params is None:
+        return _adbc_arrow(adbc, engine.url, sql_text)
+
+    return None
+
+
+def _snowflake_arrow(engine, sql_text, params):
+    import pyarrow as pa
+
+    if params is not None:
+        # compile the bind parameters to the paramstyle of the connector
+        compiled = sql_templates.statement(sql_text).compile(dialect=engine.dialect)
+        sql_text, params = str(compiled), {**compiled.params, **params}
+
+    with tracer.phase("connect"):
+        connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        with tracer.phase("execute"):
+            cursor.execute(sql_text, params)
+        with tracer.phase("fetch"):
+            # one Arrow table per result chunk, without building Python rows
+            batches = list(cursor.fetch_arrow_batches())
+        if batches:
+            return pa.concat_tables(batches)
+        return pa.table({column[0]: pa.array([], pa.null()) for column in cursor.description})
+    finally:
+        connection.close()
+
+
+def _adbc_arrow(adbc, url, sql_text):
+    if url.get_backend_name() == "sqlite":
+        uri = url.database
+    else:
+        uri = url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+    with tracer.phase("connect"):
+        connection = adbc.connect(uri)
+    try:
+        with connection.cursor() as cursor:
+            with tracer.phase("execute"):
+                cursor.execute(sql_text)
+            with tracer.phase("fetch"):
+                return cursor.fetch_arrow_table()
+    finally:
+        connection.close()
+
+
+def arrow_to_pandas(table):
+    """
+    Converts an Arrow table to a dataframe backed by Arrow arrays, without copying them to NumPy
+
+    Parameters
+    ----------
+    table : pyarrow.Table
+        The Arrow table
+
+    Returns
+    -------
+    pandas.DataFrame
+        A dataframe with pyarrow dtypes
+    """
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
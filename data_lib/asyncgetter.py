@@ -0,0 +1,277 @@
+import time
+import atexit
+import asyncio
+import weakref
+import threading
+import contextvars
+import importlib
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from .datagetter import DataGetter
+from .datalibutils import split_sql_statements
+from .dbcon import POOL_OPTIONS
+from .sqltemplate import sql_templates
+
+
+# async driver module and SQLAlchemy driver name of each backend
+ASYNC_DRIVERS = {
+    "sqlite": ("aiosqlite", "sqlite+aiosqlite"),
+    "postgresql": ("asyncpg", "postgresql+asyncpg"),
+    "mysql": ("aiomysql", "mysql+aiomysql"),
+}
+
+
+def async_driver(url):
+    """
+    This function returns the async SQLAlchemy driver name of a database URL when its driver is
+    installed.
+
+    :param url: A SQLAlchemy URL
+    :return: the async driver name, or None when the backend has no installed async driver.
+    """
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        return None
+    try:
+        importlib.import_module(driver[0])
+    except ImportError:
+        return None
+    return driver[1]
+
+
+class AsyncEngineRegistry:
+    def __init__(self):
+        """
+        This is the constructor function for a process wide registry of the async engines, thread pools
+        and concurrency limits of the database targets, so every AsyncDataGetter of a target shares
+        one limit and one connection pool. Async engines and semaphores belong to an event loop, each
+        loop gets its own, and the thread pool of a target is shared by all of them.
+        """
+        self._lock = threading.Lock()
+        self._executors = {}
+        self._loops = weakref.WeakKeyDictionary()
+
+    def get(self, key, url, max_concurrency=4, **pool_options):
+        """
+        This function returns the async engine, thread pool and semaphore of a database target,
+        creating them on the first request.
+
+        :param key: The database target, a (provider, environment, schema, role) tuple
+        :param url: The SQLAlchemy URL of the target
+        :param max_concurrency: The maximum number of queries running at the same time on the target.
+        It is ignored when the target already exists
+        :param pool_options: The connection pool settings of the async engine, ignored when it exists
+        :return: an (async engine, thread pool, semaphore) tuple, the engine is None without an async
+        driver and the thread pool is None with one.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            targets = self._loops.setdefault(loop, {})
+            if key not in targets:
+                engine, executor = None, None
+                driver = async_driver(url)
+                if driver is not None:
+                    from sqlalchemy.ext.asyncio import create_async_engine
+
+                    engine_args = (
+                        {} if url.get_backend_name() == "sqlite" else {**POOL_OPTIONS, **pool_options}
+                    )
+                    engine = create_async_engine(url.set(drivername=driver), **engine_args)
+                else:
+                    executor = self._executors.get(key)
+                    if executor is None:
+                        executor = self._executors[key] = ThreadPoolExecutor(
+                            max_workers=max_concurrency, thread_name_prefix="data_lib_async"
+                        )
+                targets[key] = (engine, executor, asyncio.Semaphore(max_concurrency))
+            return targets[key]
+
+    async def dispose(self, key):
+        """
+        This function closes the async engine of a database target in the running loop and its thread
+        pool.
+
+        :param key: The database target, a (provider, environment, schema, role) tuple
+        """
+        with self._lock:
+            engine, _, _ = self._loops.get(asyncio.get_running_loop(), {}).pop(key, (None, None, None))
+            executor = self._executors.pop(key, None)
+        if engine is not None:
+            await engine.dispose()
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def shutdown(self):
+        """
+        This function stops the thread pools of every target.
+        """
+        with self._lock:
+            executors = list(self._executors.values())
+            self._executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=False)
+
+
+async_engines = AsyncEngineRegistry()
+atexit.register(async_engines.shutdown)
+
+
+class AsyncDataGetter:
+    def __init__(self, max_concurrency=4):
+        """
+        This is the constructor function for an asyncio version of DataGetter. Queries use an async
+        driver when one is installed for the provider, and otherwise run on a bounded thread pool, so
+        they never block the event loop.
+
+        :param max_concurrency: The maximum number of queries running at the same time on the target,
+        shared by every AsyncDataGetter of the target and set by the first one
+        """
+        self._getter = DataGetter()
+        self._key = None
+        self._async_engine = None
+        self._executor = None
+        self._semaphore = None
+        self.max_concurrency = max_concurrency
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def init_database(self, provider, environment, schema=None, role="PUBLIC", **pool_options):
+        """
+        This function initializes the database engine with a specified provider and environment, with
+        the same arguments as `DataGetter.init_database`.
+
+        :param provider: The type of database provider, such as "mysql", "postgresql", "sqlite", etc
+        :param environment: The database environment, such as development, testing or production
+        :param schema: The database schema, used by the mysql URI
+        :param role: The database role, used by the snowflake URI
+        :param pool_options: The pool_size, max_overflow, pool_recycle and pool_pre_ping settings of the
+        connection pool
+        """
+        loop = asyncio.get_running_loop()
+        # the credential lookup and the sync engine setup block, keep them off the event loop
+        await loop.run_in_executor(
+            None,
+            partial(self._getter.init_database, provider, environment, schema, role, **pool_options),
+        )
+
+        self._key = (provider, environment, schema, role)
+        self._async_engine, self._executor, self._semaphore = async_engines.get(
+            self._key, self._getter._engine.url, self.max_concurrency, **pool_options
+        )
+
+    async def _run_sync(self, function, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        # the worker joins the trace scope of the calling task
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._executor, partial(context.run, function, *args, **kwargs)
+        )
+
+    async def run_sql_query(self, query, params=None, **kwargs):
+        """
+        This function runs a SQL query and returns the results as a pandas dataframe, with the same
+        `.sql` file lookup and kwargs formatting as `DataGetter.run_sql_query`.
+
+        :param query: The SQL query to be executed, or the name of a `.sql` file in the query folder
+        :param params: A dictionary of bind parameters, written as `:name` in the SQL text
+        :return: a pandas DataFrame that contains the results of a SQL query.
+        """
+        sql_text = self._getter._resolve_query(query, **kwargs)
+
+        async with self._semaphore:
+            if self._async_engine is None:
+                return await self._run_sync(self._getter._read_sql, sql_text, params)
+
+            async with self._async_engine.connect() as connection:
+                return await connection.run_sync(
+                    lambda sync_connection: self._getter._read_sql(sql_text, params, sync_connection)
+                )
+
+    async def execute_sql_query(self, query, params=None, transaction=True, split=True, **kwargs):
+        """
+        This function executes a SQL script one statement at a time, like
+        `DataGetter.execute_sql_query`.
+
+        :param query: The SQL query to be executed, or the name of a `.sql` file in the query folder
+        :param params: A dictionary of bind parameters used by every statement, or a list of them to
+        run every statement as a batch
+        :param transaction: If True the statements run in a single transaction, otherwise each statement
+        is committed on its own
+        :param split: If False the text runs as one statement, for bodies the splitter doesn't
+        recognize
+        :return: a list with the statement, rowcount and elapsed seconds of every statement.
+        """
+        async with self._semaphore:
+            if self._async_engine is None:
+                return await self._run_sync(
+                    self._getter.execute_sql_query, query, params, transaction, split, **kwargs
+                )
+
+            sql_text = self._getter._resolve_query(query, **kwargs)
+            statements = split_sql_statements(sql_text) if split else [sql_text.strip()]
+            results = []
+            engine = self._async_engine
+            async with engine.begin() if transaction else engine.connect() as connection:
+                for statement in statements:
+                    start = time.perf_counter()
+                    if params is None:
+                        result = await connection.exec_driver_sql(statement)
+                    else:
+                        result = await connection.execute(sql_templates.statement(statement), params)
+                    rowcount = result.rowcount
+                    result.close()
+                    if not transaction:
+                        await connection.commit()
+                    results.append(
+                        {
+                            "statement": statement,
+                            "rowcount": rowcount,
+                            "elapsed": time.perf_counter() - start,
+                        }
+                    )
+            return results
+
+    async def stream(self, query, chunksize=50000, params=None, **kwargs):
+        """
+        This function runs a SQL query with a server-side cursor and yields the results as pandas
+        dataframes of at most `chunksize` rows. With an async driver the SQL text is sent as a
+        `sqlalchemy.text` statement, so `:name` is read as a bind parameter.
+
+        :param query: The SQL query to be executed, or the name of a `.sql` file in the query folder
+        :param chunksize: The maximum number of rows in each yielded dataframe
+        :param params: A dictionary of bind parameters, written as `:name` in the SQL text
+        :return: an async generator of pandas DataFrames.
+        """
+        async with self._semaphore:
+            if self._async_engine is None:
+                chunks = self._getter.iter_sql_query(query, chunksize, params, **kwargs)
+                try:
+                    while True:
+                        chunk = await self._run_sync(next, chunks, None)
+                        if chunk is None:
+                            break
+                        yield chunk
+                finally:
+                    await self._run_sync(chunks.close)
+                return
+
+            sql_text = self._getter._resolve_query(query, **kwargs)
+            async with self._async_engine.connect() as connection:
+                result = await connection.stream(sql_templates.statement(sql_text), params)
+                columns = list(result.keys())
+                async for rows in result.partitions(chunksize):
+                    yield pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+
+    async def close(self):
+        """
+        This function releases the engine of the instance. The shared engines, thread pool and limit
+        of the target stay open for the other instances, `async_engines.dispose` closes them.
+        """
+        self._async_engine = None
+        self._executor = None
+        self._semaphore = None
@@ -0,0 +1,137 @@
+import csv
+import io
+import uuid
+from sqlalchemy import text
+
+# SQLite refuses statements with more bind parameters than this on older builds
+SQLITE_MAX_VARIABLES = 999
+
+
+def _postgres_copy(table, conn, keys, data_iter):
+    """
+    A `DataFrame.to_sql` insert method that loads rows with the postgresql COPY command
+    """
+    dbapi_conn = conn.connection
+    with dbapi_conn.cursor() as cur:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(data_iter)
+        buffer.seek(0)
+
+        columns = ", ".join(f'"{key}"' for key in keys)
+        table_name = f'"{table.schema}"."{table.name}"' if table.schema else f'"{table.name}"'
+        cur.copy_expert(f"COPY {table_name} ({columns}) FROM STDIN WITH CSV", buffer)
+
+
+def insert_method(dialect, column_count, batch_size):
+    """
+    Returns the fastest `DataFrame.to_sql` insert method of a database dialect and the number of rows
+    sent in each batch
+
+    Parameters
+    ----------
+    dialect : str
+        The SQLAlchemy dialect name, such as "mssql", "postgresql", "mysql", "sqlite" or "snowflake"
+    column_count : int
+        The number of columns of the dataframe
+    batch_size : int
+        The requested number of rows in each batch
+
+    Returns
+    -------
+    tuple
+        The insert method and the batch size
+    """
+    if dialect == "postgresql":
+        return _postgres_copy, batch_size
+    elif dialect == "snowflake":
+        from snowflake.connector.pandas_tools import pd_writer
+
+        # pd_writer stages the batch as Parquet and loads it with write_pandas
+        return pd_writer, batch_size
+    elif dialect == "sqlite":
+        return "multi", max(1, min(batch_size, SQLITE_MAX_VARIABLES // max(column_count, 1)))
+    elif dialect == "mysql":
+        return "multi", batch_size
+
+    # mssql relies on the fast_executemany engine option, other dialects on plain executemany
+    return None, batch_size
+
+
+def _quote(conn, name):
+    return conn.dialect.identifier_preparer.quote(name)
+
+
+def load_dataframe(engine, df, table, mode="append", key_columns=None, schema=None, batch_size=10000):
+    """
+    Writes a dataframe to a database table in batches, with the fastest insert method of the engine
+    dialect. The load runs in a single transaction
+
+    Parameters
+    ----------
+    engine : sqlalchemy.engine.Engine
+        The database engine
+    df : pandas.DataFrame
+        The data to be loaded
+    table : str
+        The name of the target table
+    mode : str
+        "append" inserts the rows, "replace" drops and recreates the table and "upsert" replaces the
+        rows that match on key_columns and inserts the others
+    key_columns : list
+        The columns that identify a row, required by "upsert"
+    schema : str
+        The schema of the target table
+    batch_size : int
+        The number of rows sent in each batch
+
+    Returns
+    -------
+    int
+        The number of rows loaded
+    """
+    if mode not in ("append", "replace", "upsert"):
+        raise ValueError(f"Unsupported mode: {mode}. Supported modes: append, replace, upsert.")
+    if mode == "upsert" and not key_columns:
+        raise ValueError("The upsert mode needs the key_columns of the table.")
+
+    method, chunksize = insert_method(engine.dialect.name, len(df.columns), batch_size)
+
+    with engine.begin() as conn:
+        if mode != "upsert" or not engine.dialect.has_table(conn, table, schema=schema):
+            df.to_sql(
+                table,
+                conn,
+                schema=schema,
+                if_exists="replace" if mode == "replace" else "append",
+                index=False,
+                chunksize=chunksize,
+                method=method,
+            )
+            return len(df)
+
+        # upsert: load a staging table, delete the matching rows and insert the staged ones. The
+        # staging table name is unique so concurrent upserts and existing tables are never touched
+        stage_table = f"{table}_stage_{uuid.uuid4().hex[:12]}"
+        df.to_sql(
+            stage_table,
+            conn,
+            schema=schema,
+            if_exists="fail",
+            index=False,
+            chunksize=chunksize,
+            method=method,
+        )
+
+        prefix = f"{_quote(conn, schema)}." if schema else ""
+        target = prefix + _quote(conn, table)
+        stage = prefix + _quote(conn, stage_table)
+        columns = ", ".join(_quote(conn, col) for col in df.columns)
+        match = " AND ".join(
+            f"{target}.{_quote(conn, col)} = {stage}.{_quote(conn, col)}" for col in key_columns
+        )
+
+        conn.execute(text(f"DELETE FROM {target} WHERE EXISTS (SELECT 1 FROM {stage} WHERE {match})"))
+        conn.execute(text(f"INSERT INTO {target} ({columns}) SELECT {columns} FROM {stage}"))
+        conn.execute(text(f"DROP TABLE {stage}"))
+
+    return len(df)
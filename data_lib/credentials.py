@@ -0,0 +1,290 @@
+import os
+import json
+import time
+import threading
+
+
+# keyring service name of each provider
+KR_SERVICES = {
+    "mssql": "MSSQL",
+    "mysql": "MySQL",
+    "teradata": "Teradata",
+    "postgresql": "PostgreSQL",
+    "sqlite": "SQLite",
+    "snowflake": "Snowflake",
+}
+
+# keyring service suffix and user name of each credential, in the order they are returned
+CREDENTIAL_KEYS = [
+    ("User", "username"),
+    ("Password", "password"),
+    ("Host", "host"),
+    ("Port", "port"),
+    ("Database", "database"),
+]
+
+
+def service_prefix(provider, environment):
+    """
+    Returns the keyring service prefix of a database target, such as "Snowflake_Prod"
+    """
+    return KR_SERVICES[provider] + "_" + environment
+
+
+class KeyringProvider:
+    """
+    Reads the credentials of a database target from the system keyring
+    """
+
+    def get(self, provider, environment):
+        """
+        This function returns the credentials of a database target.
+
+        :param provider: The database provider, such as "snowflake"
+        :param environment: The database environment, such as "Prod"
+        :return: a (username, password, host, port, database) tuple, or None when the keyring is not
+        available.
+        """
+        return self.get_many([(provider, environment)]).get((provider, environment))
+
+    def get_many(self, targets):
+        """
+        This function returns the credentials of several database targets, resolving the keyring
+        backend once for all of them.
+
+        :param targets: A list of (provider, environment) tuples
+        :return: a dictionary of targets and their (username, password, host, port, database) tuples.
+        """
+        import keyring as kr
+
+        try:
+            backend = kr.get_keyring()
+            credentials = {}
+            for provider, environment in targets:
+                prefix = service_prefix(provider, environment)
+                credentials[(provider, environment)] = tuple(
+                    backend.get_password(f"{prefix}_{suffix}", username) or ""
+                    for suffix, username in CREDENTIAL_KEYS
+                )
+            return credentials
+
+        except kr.errors.NoKeyringError:
+            print("No kr service available.")
+            print(
+                "To use this function, you must store the database credentials in the kr, or set "
+                "them in DATA_LIB_<PROVIDER>_<ENVIRONMENT>_<KEY> environment variables."
+            )
+            return {}
+        except kr.errors.KeyringError as e:
+            print(f"Error retrieving database credentials from kr: {e}")
+            print(
+                "Make sure the database credentials are stored in the kr using the following key "
+                "names: username, password, host, port, database (if applicable)"
+            )
+            return {}
+
+
+class EnvironmentProvider:
+    def __init__(self, prefix="DATA_LIB"):
+        """
+        This is the constructor function for the provider of credentials set in environment variables,
+        for headless workers without a keyring: DATA_LIB_SNOWFLAKE_PROD_USER, DATA_LIB_SNOWFLAKE_PROD_HOST
+        and so on with the keys USER, PASSWORD, HOST, PORT and DATABASE.
+
+        :param prefix: The prefix of the environment variables
+        """
+        self.prefix = prefix
+
+    def get(self, provider, environment):
+        """
+        This function returns the credentials of a database target.
+
+        :param provider: The database provider, such as "snowflake"
+        :param environment: The database environment, such as "Prod"
+        :return: a (username, password, host, port, database) tuple, or None when no variable is set.
+        """
+        name = f"{self.prefix}_{provider}_{environment}".upper()
+        # unset values are empty like in the keyring, an empty password means externalbrowser
+        credentials = tuple(
+            os.environ.get(f"{name}_{suffix.upper()}", "") for suffix, _ in CREDENTIAL_KEYS
+        )
+        if not any(credentials):
+            return None
+        return credentials
+
+    def get_many(self, targets):
+        return {target: self.get(*target) for target in targets}
+
+
+class EncryptedFileProvider:
+    def __init__(self, file_path, key=None):
+        """
+        This is the constructor function for the provider of credentials stored in a Fernet encrypted
+        JSON file, for headless workers without a keyring. It needs the cryptography package.
+
+        :param file_path: The encrypted credentials file
+        :param key: The Fernet key, defaults to the DATA_LIB_CREDENTIALS_KEY environment variable.
+        Create one with `cryptography.fernet.Fernet.generate_key()`
+        """
+        self.file_path = file_path
+        self._key = key or os.environ.get("DATA_LIB_CREDENTIALS_KEY")
+        if self._key is None:
+            raise ValueError(
+                "The encrypted credentials file needs a key, pass it or set DATA_LIB_CREDENTIALS_KEY."
+            )
+
+    def _fernet(self):
+        try:
+            from cryptography.fernet import Fernet
+        except ImportError:
+            raise ImportError(
+                "The encrypted credentials file needs the cryptography package: pip install cryptography"
+            )
+        return Fernet(self._key)
+
+    def _load(self):
+        try:
+            with open(self.file_path, "rb") as get:
+                return json.loads(self._fernet().decrypt(get.read()))
+        except FileNotFoundError:
+            return {}
+
+    def get(self, provider, environment):
+        """
+        This function returns the credentials of a database target.
+
+        :param provider: The database provider, such as "snowflake"
+        :param environment: The database environment, such as "Prod"
+        :return: a (username, password, host, port, database) tuple, or None when it is not stored.
+        """
+        return self.get_many([(provider, environment)]).get((provider, environment))
+
+    def get_many(self, targets):
+        """
+        This function returns the credentials of several database targets, decrypting the file once.
+
+        :param targets: A list of (provider, environment) tuples
+        :return: a dictionary of targets and their (username, password, host, port, database) tuples.
+        """
+        stored = self._load()
+        credentials = {}
+        for provider, environment in targets:
+            entry = stored.get(service_prefix(provider, environment))
+            if entry is not None:
+                credentials[(provider, environment)] = tuple(
+                    entry.get(username) or "" for _, username in CREDENTIAL_KEYS
+                )
+        return credentials
+
+    def store(self, provider, environment, username, password=None, host=None, port=None, database=None):
+        """
+        This function adds or replaces the credentials of a database target in the encrypted file.
+
+        :param provider: The database provider, such as "snowflake"
+        :param environment: The database environment, such as "Prod"
+        """
+        stored = self._load()
+        stored[service_prefix(provider, environment)] = {
+            "username": username or "",
+            "password": password or "",
+            "host": host or "",
+            "port": "" if port is None else str(port),
+            "database": database or "",
+        }
+
+        temp_path = self.file_path + ".tmp"
+        with open(temp_path, "wb") as put:
+            put.write(self._fernet().encrypt(json.dumps(stored).encode("utf8")))
+        os.replace(temp_path, self.file_path)
+
+
+class CredentialCache:
+    def __init__(self, providers=None, ttl=900):
+        """
+        This is the constructor function for the in-memory cache of resolved database credentials, so
+        only the first `init_database` of a target in the process waits on the keyring.
+
+        :param providers: The credential providers, tried in order until one has the target. Defaults
+        to the environment variables and the system keyring
+        :param ttl: The number of seconds resolved credentials are kept, 0 disables the cache
+        """
+        self._lock = threading.Lock()
+        self._credentials = {}
+        self.providers = providers if providers is not None else [EnvironmentProvider(), KeyringProvider()]
+        self.ttl = ttl
+
+    def configure(self, providers=None, ttl=None):
+        """
+        This function replaces the providers or the time to live of the cache and empties it.
+
+        :param providers: The credential providers, tried in order
+        :param ttl: The number of seconds resolved credentials are kept
+        """
+        with self._lock:
+            if providers is not None:
+                self.providers = providers
+            if ttl is not None:
+                self.ttl = ttl
+            self._credentials.clear()
+
+    def get(self, provider, environment):
+        """
+        This function returns the credentials of a database target, from the cache when they are fresh.
+
+        :param provider: The database provider, such as "snowflake"
+        :param environment: The database environment, such as "Prod"
+        :return: a (username, password, host, port, database) tuple, or None when no provider has it.
+        """
+        return self.get_many([(provider, environment)]).get((provider, environment))
+
+    def get_many(self, targets):
+        """
+        This function returns the credentials of several database targets, asking every provider for
+        all the missing targets at once.
+
+        :param targets: A list of (provider, environment) tuples
+        :return: a dictionary of the found targets and their (username, password, host, port,
+        database) tuples.
+        """
+        now = time.time()
+        credentials = {}
+        with self._lock:
+            for target in targets:
+                entry = self._credentials.get(target)
+                if entry is not None and entry[1] > now:
+                    credentials[target] = entry[0]
+            providers = list(self.providers)
+
+        missing = [target for target in targets if target not in credentials]
+        for credential_provider in providers:
+            if not missing:
+                break
+            found = {
+                target: values
+                for target, values in credential_provider.get_many(missing).items()
+                if values is not None and any(values)
+            }
+            credentials.update(found)
+            missing = [target for target in missing if target not in found]
+
+            if self.ttl:
+                with self._lock:
+                    for target, values in found.items():
+                        self._credentials[target] = (values, time.time() + self.ttl)
+
+        return credentials
+
+    def invalidate(self, provider=None, environment=None):
+        """
+        This function removes cached credentials, after a password rotation for example.
+
+        :param provider: The database provider whose credentials are removed, all if None
+        :param environment: The database environment whose credentials are removed, all if None
+        """
+        with self._lock:
+            for target in list(self._credentials):
+                if provider in (None, target[0]) and environment in (None, target[1]):
+                    del self._credentials[target]
+
+
+credential_cache = CredentialCache()
@@ -1,18 +1,39 @@
 # library imports
 import os
+import glob
 import json
+import time
 import platform as pt
+import contextvars
 import pandas as pd
-import xlwings as xw
-from xlwings.utils import rgb_to_int
-from snowflake.snowpark import Session
+from contextlib import contextmanager, nullcontext
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from .datalibutils import *
-from .dbcon import DBCon 
+from .dbcon import DBCon, engine_registry
+from .querycache import shared_query_cache
+from .sqltemplate import sql_templates
+from .exporter import headless_format, write_frames, write_parts, part_path
+from . import bulkload
+from .tracing import tracer, JsonLinesSink
+from .arrowfetch import fetch_arrow_table, arrow_to_pandas
+from .incremental import IncrementalStore, merge_increment, drop_staged_rows
+from .stagestore import StageStore
+from .archiver import shared_archiver
+from .singleflight import single_flight
+from .spill import spill_chunks
+from .snowparkpool import snowpark_sessions, LocalSession, apply_pushdown
 
 
+class QueryResults(dict):
+    """
+    A dictionary of query names and their result dataframes, with the exceptions of the queries that
+    failed in `errors`.
+    """
 
-if pt.system() == "Windows":
-   import win32com.client
+    def __init__(self):
+        super().__init__()
+        self.errors = {}
 
 
 class DataGetter (DBCon):
@@ -33,72 +54,524 @@ class DataGetter (DBCon):
         self._output_path = self._root_path + "/02_data/04_output_files/"      
         self._archived_path = self._root_path + "/02_data/05_archived_files/"
         self._engine =  None
+        self._provider = None
+        self._environment = None
+        self._query_cache = None
+        self._single_flight = None
+        self._stage_store = StageStore(self._stage_path)
+        self._archiver = shared_archiver(self._archived_path)
 
     def init_database(
         
-        self, provider, environment
+        self, provider, environment, schema=None, role="PUBLIC", **pool_options
     ):
         """
-        This function initializes a database engine with a specified provider and environment.
+        This function initializes a database engine with a specified provider and environment. The
+        engine and its connection pool are shared by every DataGetter that uses the same target.
         
         :param provider: The type of database provider, such as "mysql", "postgresql", "sqlite", etc
         :param environment: The environment parameter is used to specify the environment in which the
         database is being initialized. This could be a development, testing, or production environment,
         for example. The value of this parameter will be used to create the appropriate database URI for
         the specified provider
+        :param schema: The database schema, used by the mysql URI
+        :param role: The database role, used by the snowflake URI
+        :param pool_options: The pool_size, max_overflow, pool_recycle and pool_pre_ping settings of the
+        connection pool, applied when the engine of the target is first created
+        """
+        self._engine = self.shared_engine(
+            (provider, environment, schema, role),
+            lambda: create_database_uri(provider, environment, schema, role),
+            **pool_options,
+        )
+        self._provider = provider
+        self._environment = environment
+
+    def enable_query_cache(self, ttl=3600, max_size_mb=1024):
+        """
+        This function turns on the on-disk query result cache, stored as Parquet files in the stage
+        folder. Cached results are reused by `run_sql_query` until they expire. Every DataGetter of the
+        project in the process shares the same cache, the last settings apply to all of them.
+
+        :param ttl: The default number of seconds a cached result stays valid
+        :param max_size_mb: The maximum total size of the cache in megabytes, the least recently used
+        results are evicted above it
+        """
+        self._query_cache = shared_query_cache(
+            self._stage_path + "query_cache/", ttl=ttl, max_size=max_size_mb * 1024**2
+        )
+
+    def enable_single_flight(self, max_size_mb=256, ttl=60):
+        """
+        This function turns on the single-flight layer of `run_sql_query`: concurrent identical
+        queries of any DataGetter in the process wait on one execution and share its result, and
+        recent results are kept in memory. Every caller gets its own copy of the result, a shallow
+        one when pandas copy-on-write is enabled.
+
+        :param max_size_mb: The maximum memory of the kept results in megabytes, shared by the process
+        :param ttl: The number of seconds a result is kept, 0 only shares in-flight queries
         """
-        db_uri = create_database_uri(provider, environment)
-        self._engine = self.set_engine(db_uri)
+        single_flight.max_size = max_size_mb * 1024**2
+        single_flight.ttl = ttl
+        self._single_flight = single_flight
+
+    def invalidate_query_cache(self, query=None):
+        """
+        This function removes cached query results.
+
+        :param query: The query name whose results are removed, all results are removed if None
+        :return: the number of removed results.
+        """
+        if self._query_cache is None:
+            return 0
+        return self._query_cache.invalidate(query=query)
        
-    def snowpark_session(self):        
+    def _snowpark_key(self):
+        if self._engine_args is None:
+            # other providers use a local stand-in session over their engine
+            return ("local", str(self._engine.url))
+        return (self._engine_args["account"], self._engine_args["user"], self._engine_args.get("role"))
+
+    def snowpark_session(self):
+        """
+        This function returns the Snowpark session of the database target. Sessions are pooled per
+        (account, user, role) and kept alive by the connector heartbeat, so the login only happens
+        once per process. Other providers get a LocalSession that runs the same dataframe steps as
+        SQL over their engine.
+        :return: a Snowpark session, or a LocalSession.
+        """
+        if self._engine_args is None:
+            return snowpark_sessions.get(self._snowpark_key(), lambda: LocalSession(self._engine))
+
+        def create_session():
+            from snowflake.snowpark import Session
+
+            return Session.builder.configs(
+                {**self._engine_args, "client_session_keep_alive": True}
+            ).create()
+
+        return snowpark_sessions.get(self._snowpark_key(), create_session)
+
+    def close_snowpark_session(self):
         """
-        This function creates and returns a Snowpark session using the provided engine arguments.
-        :return: The function `snowpark_session` returns a Snowpark session object created using the
-        `Session.builder.configs` method with the `_engine_args` parameter passed in.
+        This function closes the pooled Snowpark session of the database target, the next
+        `snowpark_session` call logs in again.
         """
-        snowpark_session = Session.builder.configs(self._engine_args).create()
-        return snowpark_session 
+        snowpark_sessions.close(self._snowpark_key())
 
-    def run_sql_query(self, query, **kwargs):
+    def snowpark_frame(self, query, **kwargs):
+        """
+        This function returns a lazy Snowpark dataframe of a query, whose steps run in the warehouse
+        until `to_pandas` is called.
+
+        :param query: The SQL query, or the name of a `.sql` file in the query folder
+        :return: a Snowpark DataFrame, or a LocalDataFrame.
+        """
+        return self.snowpark_session().sql(self._resolve_query(query, **kwargs))
+
+    def run_pushdown(
+        self, query, joins=None, filters=None, group_by=None, aggregations=None, columns=None,
+        order_by=None, limit=None, **kwargs
+    ):
+        """
+        This function runs join, filter and aggregate steps on a query in the database with Snowpark
+        and only returns the reduced result as a pandas dataframe.
+
+        :param query: The SQL query, or the name of a `.sql` file in the query folder
+        :param joins: A list of (query, on, how) tuples, the joined queries are names or SQL text and
+        on is a column name or a list of them
+        :param filters: A list of SQL conditions that must all match, such as ["UNITS > 0"]
+        :param group_by: The grouping columns of the aggregations
+        :param aggregations: The output columns and their (column, function) pairs, such as
+        {"TOTAL_UNITS": ("UNITS", "sum")}
+        :param columns: The output columns
+        :param order_by: The sort columns
+        :param limit: The maximum number of rows
+        :return: a pandas DataFrame.
+        """
+        with tracer.span("run_pushdown", query, self._provider, self._environment):
+            frame = self.snowpark_frame(query, **kwargs)
+            frame = apply_pushdown(
+                frame,
+                joins=[
+                    (self.snowpark_frame(right, **kwargs), on, how) for right, on, how in joins or []
+                ],
+                filters=filters,
+                group_by=group_by,
+                aggregations=aggregations,
+                columns=columns,
+                order_by=order_by,
+                limit=limit,
+            )
+            with tracer.phase("fetch"):
+                out_df = frame.to_pandas()
+            tracer.record_result(out_df)
+
+        return out_df
+
+    def _resolve_query(self, query, **kwargs):
+        """
+        This function resolves a query name to its SQL text, reading the `.sql` file from the query
+        folder when it exists and formatting it with kwargs when any are passed in. The files are
+        cached in memory until they change.
+
+        :param query: The name of a `.sql` file in the query folder or a raw SQL query
+        :return: the SQL text ready to be executed.
+        """
+        sql_text = sql_templates.read(self._query_path + f"{query}.sql")
+        if sql_text is None:
+            sql_text = query
+
+        return sql_text.format(**kwargs) if kwargs != {} else sql_text
+
+    def _read_sql(self, sql_text, params=None, connection=None, chunksize=None):
+        """
+        This function runs a resolved SQL text with pandas. Bind parameters are sent to the database as
+        real parameters through a cached `sqlalchemy.text` statement.
+
+        :param sql_text: The resolved SQL text
+        :param params: A dictionary of bind parameters, written as `:name` in the SQL text
+        :param connection: The connection to run the query on, defaults to the engine
+        :param chunksize: The number of rows of each dataframe when the results are read in chunks
+        :return: a pandas DataFrame, or an iterator of them when chunksize is set.
+        """
+        if chunksize is not None:
+            connectable = self._engine if connection is None else connection
+            if params is None:
+                return pd.read_sql_query(sql_text, connectable, chunksize=chunksize)
+            return pd.read_sql_query(
+                sql_templates.statement(sql_text), connectable, params=params, chunksize=chunksize
+            )
+
+        # same steps as pd.read_sql_query, split so every phase can be traced
+        with tracer.phase("connect"):
+            active_connection = self._engine.connect() if connection is None else connection
+        try:
+            with tracer.phase("execute"):
+                if params is None:
+                    result = active_connection.exec_driver_sql(sql_text)
+                else:
+                    result = active_connection.execute(sql_templates.statement(sql_text), params)
+            with tracer.phase("fetch"):
+                columns = list(result.keys())
+                rows = result.fetchall()
+            with tracer.phase("build"):
+                out_df = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+        finally:
+            if connection is None:
+                active_connection.close()
+
+        return out_df
+
+    def _optimize_result(self, df, options):
+        """
+        This function runs `optimize_dtypes` on a result dataframe and keeps the memory report in the
+        `dtype_report` attribute of the dataframe.
+
+        :param df: The result dataframe
+        :param options: True, or a dictionary of `optimize_dtypes` settings such as category_ratio
+        :return: the optimized dataframe.
+        """
+        settings = options if isinstance(options, dict) else {}
+        out_df, report = optimize_dtypes(df, inplace=True, **settings)
+        out_df.attrs["dtype_report"] = report
+        return out_df
+
+    def run_sql_query(
+        self, query, cache_ttl=None, optimize_dtypes=False, params=None, spill=False, **kwargs
+    ):
         """
         This function runs a SQL query and returns the results as a pandas dataframe, with the option to
         pass in parameters using kwargs.
         
         :param query: The SQL query to be executed
+        :param params: A dictionary of bind parameters, written as `:name` in the SQL text. Unlike kwargs
+        they don't change the SQL text, so the database can reuse its query plan
+        :param cache_ttl: The number of seconds the result stays in the query cache when it is enabled,
+        defaults to the cache ttl. Use 0 to bypass the cache and the single-flight layer
+        :param optimize_dtypes: True, or a dictionary of `optimize_dtypes` settings, to reduce the memory
+        of the result. The before/after memory report is in `out_df.attrs["dtype_report"]`
+        :param spill: If True the results are streamed to Parquet files in the stage folder and a lazy
+        SpilledResult handle is returned, for results larger than memory. See `spill_sql_query`
         :return: a pandas DataFrame that contains the results of a SQL query.
         """        
-       
-        out_df = pd.DataFrame()
-        query_exists = os.path.exists(self._query_path + f"{query}.sql")
-        
-        if query_exists:
-            if kwargs == {}:
-                file_query = open(self._query_path + f"{query}.sql").read()
-                out_df = pd.read_sql_query(file_query, self._engine)
+        if spill:
+            return self.spill_sql_query(query, params=params, **kwargs)
+
+        with tracer.span("run_sql_query", query, self._provider, self._environment):
+            sql_text = self._resolve_query(query, **kwargs)
+
+            def load():
+                if self._query_cache is None or cache_ttl == 0:
+                    return self._read_sql(sql_text, params)
+
+                cache_key = self._query_cache.make_key(
+                    sql_text, {"kwargs": kwargs, "params": params}, self._provider, self._environment
+                )
+                with tracer.phase("cache"):
+                    df = self._query_cache.get(cache_key)
+                if df is None:
+                    df = self._read_sql(sql_text, params)
+                    with tracer.phase("cache"):
+                        self._query_cache.put(cache_key, df, ttl=cache_ttl, query=query)
+                return df
+
+            if self._single_flight is None or cache_ttl == 0:
+                out_df = load()
             else:
-                with open(self._query_path + f"{query}.sql") as get:
-                    file_query = get.read()
-                out_df = pd.read_sql_query(file_query.format(**kwargs), self._engine)
-        else:
-            if kwargs == {}:
-                out_df = pd.read_sql_query(query, self._engine)
+                out_df = self._single_flight.do(
+                    self._single_flight.make_key(sql_text, params, self._engine), load
+                )
+
+            if optimize_dtypes:
+                out_df = self._optimize_result(out_df, optimize_dtypes)
+
+            tracer.record_result(out_df)
+
+        return out_df
+
+    def run_arrow_query(self, query, as_table=False, params=None, **kwargs):
+        """
+        This function runs a SQL query and returns Arrow backed results. It uses the native Arrow result
+        sets of the Snowflake connector, or ADBC for postgresql and sqlite when it is installed, and
+        otherwise reads the results with pandas into pyarrow dtypes.
+
+        :param query: The SQL query to be executed, or the name of a `.sql` file in the query folder
+        :param as_table: If True a pyarrow Table is returned instead of a dataframe
+        :param params: A dictionary of bind parameters, written as `:name` in the SQL text
+        :return: a pandas DataFrame with pyarrow dtypes, or a pyarrow Table.
+        """
+        import pyarrow as pa
+
+        with tracer.span("run_arrow_query", query, self._provider, self._environment):
+            sql_text = self._resolve_query(query, **kwargs)
+            table = fetch_arrow_table(self._engine, sql_text, params)
+
+            if table is not None:
+                with tracer.phase("build"):
+                    out = table if as_table else arrow_to_pandas(table)
+            else:
+                connectable = self._engine
+                statement = sql_text if params is None else sql_templates.statement(sql_text)
+                with tracer.phase("execute"):
+                    out = pd.read_sql_query(
+                        statement, connectable, params=params, dtype_backend="pyarrow"
+                    )
+                if as_table:
+                    with tracer.phase("build"):
+                        out = pa.Table.from_pandas(out, preserve_index=False)
+
+            tracer.record_rows(out.num_rows if as_table else len(out))
+
+        return out
+
+    def run_incremental(
+        self,
+        query,
+        watermark_column,
+        key_columns=None,
+        mode="append",
+        full_refresh=False,
+        name=None,
+        params=None,
+        **kwargs,
+    ):
+        """
+        This function runs a SQL query incrementally. Only the rows with a watermark column from the
+        last high-water mark are fetched and merged into the rows staged in the stage folder, and the
+        new high-water mark is stored for the next run.
+
+        :param query: The SQL query to be executed, or the name of a `.sql` file in the query folder
+        :param watermark_column: The column that grows with every change, such as updated_at
+        :param key_columns: The columns that identify a row, required by "upsert". In "append" mode they
+        identify the rows at the high-water mark that are already staged, defaults to every column
+        :param mode: "append" adds the new rows, "upsert" replaces the staged rows with the same keys
+        :param full_refresh: If True the whole query is fetched again and replaces the staged rows
+        :param name: The name of the staged extract, defaults to the query name
+        :param params: A dictionary of bind parameters, written as `:name` in the SQL text
+        :return: a pandas DataFrame with every staged row of the query.
+        """
+        if name is None:
+            if not os.path.exists(self._query_path + f"{query}.sql"):
+                raise ValueError("Raw SQL queries need a name for their staged extract.")
+            name = query
+
+        store = IncrementalStore(self._stage_path + "incremental/")
+
+        with tracer.span("run_incremental", name, self._provider, self._environment):
+            sql_text = self._resolve_query(query, **kwargs)
+            watermark = None if full_refresh else store.load_watermark(name)
+
+            if watermark is None:
+                increment = self._read_sql(sql_text, params)
+                staged = None
             else:
-                out_df = pd.read_sql_query(query.format(**kwargs), self._engine)
+                # the query sits on its own lines so a trailing -- comment can't swallow the wrapper.
+                # Rows at the high-water mark are fetched again, rows committed after the last run
+                # with the same watermark would be lost otherwise
+                increment = self._read_sql(
+                    f"SELECT * FROM (\n{sql_text.strip().rstrip(';')}\n) incremental_source "
+                    f"WHERE {watermark_column} >= :data_lib_watermark",
+                    {**(params or {}), "data_lib_watermark": watermark},
+                )
+                staged = store.load(name)
+                if mode == "append":
+                    increment = drop_staged_rows(
+                        increment, staged, watermark_column, watermark, key_columns
+                    )
+
+            with tracer.phase("merge"):
+                out_df = merge_increment(staged, increment, mode, key_columns)
+                store.save(name, out_df)
+
+            if not increment.empty:
+                new_watermark = increment[watermark_column].max()
+                if watermark is None or new_watermark > watermark:
+                    store.save_watermark(name, new_watermark)
+
+            tracer.record_result(out_df)
 
         return out_df
 
-    def execute_sql_query(self, query,):
+    def run_many(self, queries, max_workers=4):
+        """
+        This function runs several independent SQL queries at the same time on a bounded thread pool
+        over the pooled engine. A failing query does not cancel the others. The queries are traced in
+        the trace scope of the caller.
+
+        :param queries: A dictionary of query names and the kwargs passed to `run_sql_query`
+        :param max_workers: The maximum number of queries running at the same time
+        :return: a QueryResults dictionary of query names and result dataframes, the exceptions of the
+        failed queries are in its `errors` attribute.
         """
-        This function executes a SQL query using a specified engine and query path.
+        results = QueryResults()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    contextvars.copy_context().run, self.run_sql_query, query, **(kwargs or {})
+                ): query
+                for query, kwargs in queries.items()
+            }
+            for future in as_completed(futures):
+                query = futures[future]
+                try:
+                    results[query] = future.result()
+                except Exception as e:
+                    print(f"Query {query} failed: {e}")
+                    results.errors[query] = e
+
+        return results
+
+    def iter_sql_query(self, query, chunksize=50000, params=None, **kwargs):
+        """
+        This function runs a SQL query with a server-side cursor and yields the results as pandas
+        dataframes of at most `chunksize` rows, so large extracts can be processed with constant memory.
+
+        :param query: The SQL query to be executed, or the name of a `.sql` file in the query folder
+        :param chunksize: The maximum number of rows in each yielded dataframe
+        :param params: A dictionary of bind parameters, written as `:name` in the SQL text
+        :return: a generator of pandas DataFrames with the results of the SQL query.
+        """
+        sql_text = self._resolve_query(query, **kwargs)
+
+        connection = self._engine.connect().execution_options(stream_results=True)
+        try:
+            for chunk in self._read_sql(sql_text, params, connection, chunksize):
+                yield chunk
+        finally:
+            connection.close()
+
+    def spill_sql_query(self, query, chunksize=500000, params=None, **kwargs):
+        """
+        This function streams the results of a SQL query to temporary Parquet files in the stage folder
+        and returns a lazy handle instead of a dataframe, so results larger than memory can be selected,
+        filtered, aggregated or read in chunks. The files are deleted when the handle is closed.
+
+        :param query: The SQL query to be executed, or the name of a `.sql` file in the query folder
+        :param chunksize: The number of rows held in memory while the results are spilled
+        :param params: A dictionary of bind parameters, written as `:name` in the SQL text
+        :return: a SpilledResult.
+        """
+        with tracer.span("spill_sql_query", query, self._provider, self._environment):
+            spilled = spill_chunks(
+                self.iter_sql_query(query, chunksize=chunksize, params=params, **kwargs),
+                self._stage_path + "_spill/",
+            )
+            tracer.record_rows(len(spilled))
+
+        return spilled
+
+    def load_dataframe(
+        self, df, table, mode="append", key_columns=None, schema=None, batch_size=10000
+    ):
+        """
+        This function writes a dataframe to a database table in batches, in a single transaction, with
+        the fastest insert method of the provider: fast_executemany for mssql, COPY for postgresql,
+        multi-row inserts for mysql and sqlite and write_pandas for snowflake.
+
+        :param df: The dataframe to be loaded
+        :param table: The name of the target table
+        :param mode: "append" inserts the rows, "replace" recreates the table and "upsert" replaces the
+        rows that match on key_columns and inserts the others
+        :param key_columns: The columns that identify a row, required by "upsert"
+        :param schema: The schema of the target table
+        :param batch_size: The number of rows sent in each batch
+        :return: the number of rows loaded.
+        """
+        return bulkload.load_dataframe(
+            self._engine,
+            df,
+            table,
+            mode=mode,
+            key_columns=key_columns,
+            schema=schema,
+            batch_size=batch_size,
+        )
+
+    def execute_sql_query(self, query, params=None, transaction=True, split=True, **kwargs):
+        """
+        This function executes a SQL script, the name of a `.sql` file in the query folder or a raw SQL
+        text, one statement at a time over a single connection.
         
         :param query: The SQL query to be executed
+        :param params: A dictionary of bind parameters used by every statement, or a list of them to
+        run every statement as a batch with executemany
+        :param transaction: If True the statements run in a single transaction that is rolled back when
+        one of them fails, otherwise each statement is committed on its own
+        :param split: If False the text runs as one statement, for bodies the splitter doesn't
+        recognize
+        :return: a list with the statement, rowcount and elapsed seconds of every statement.
         """
-        
-        self._engine.execute(query) if os.path.exists(
-                self._query_path + f"{query}.sql"
-            ) else self._engine.execute(query)
-        
-        self._engine.dispose
+        with tracer.span("execute_sql_query", query, self._provider, self._environment):
+            sql_text = self._resolve_query(query, **kwargs)
+            statements = split_sql_statements(sql_text) if split else [sql_text.strip()]
+            results = []
+
+            with tracer.phase("connect"):
+                connection = self._engine.connect()
+            with connection, connection.begin() if transaction else nullcontext():
+                with tracer.phase("execute"):
+                    for statement in statements:
+                        start = time.perf_counter()
+                        if params is None:
+                            result = connection.exec_driver_sql(statement)
+                        else:
+                            result = connection.execute(sql_templates.statement(statement), params)
+                        rowcount = result.rowcount
+                        # an open cursor keeps mssql+pyodbc busy for the next statement
+                        result.close()
+                        results.append(
+                            {
+                                "statement": statement,
+                                "rowcount": rowcount,
+                                "elapsed": time.perf_counter() - start,
+                            }
+                        )
+
+            tracer.record_rows(sum(max(result["rowcount"], 0) for result in results))
+
+        return results
         
     def is_connected(self):
         """
@@ -119,31 +592,181 @@ class DataGetter (DBCon):
     def engine(self):
         """
         This function returns the value of the private attribute "engine".
-        :return: The method `engine` is being defined as returning the private attribute `__engine` of
+        :return: The method `engine` is being defined as returning the private attribute `_engine` of
         the object.
         """
-        return self.__engine
+        return self._engine
+
+    @contextmanager
+    def trace(self, run=None, sinks=None):
+        """
+        This function scopes query tracing to a report run. Every run_sql_query, execute_sql_query,
+        read_file and export_data call inside of it is timed by phase and sent to the sinks.
+
+        :param run: The name of the report run, added to every trace
+        :param sinks: The sinks that receive the traces, such as MetricsAggregator or
+        PrometheusTextfileSink. Defaults to a JSON lines log in the project folder
+        :return: the list of sinks.
+        """
+        if sinks is None:
+            sinks = [JsonLinesSink(self._root_path + "/data_lib_trace.jsonl")]
+        with tracer.scope(run, sinks) as scope_sinks:
+            yield scope_sinks
+
+    def pool_stats(self):
+        """
+        This function returns the connection pool usage of every engine shared in the process.
+        :return: a dictionary of (provider, environment, schema, role) targets and their pool size,
+        checked out, idle and overflow connections.
+        """
+        return engine_registry.stats()
+
+    def shutdown_engines(self):
+        """
+        This function closes the connections of every engine shared in the process. Engines are created
+        again by the next `init_database` call.
+        """
+        engine_registry.shutdown()
+        self._engine = None
         
 
-    def read_file(self, reader, file_path, **kwargs):
+    def read_file(
+        self,
+        reader,
+        file_path,
+        optimize_dtypes=False,
+        columns=None,
+        row_filter=None,
+        source_column=None,
+        max_workers=None,
+        use_processes=False,
+        **kwargs,
+    ):
         """
         It takes a function as an argument and returns the result of calling that function on the file
-        path
+        path. A glob pattern reads every matching file in parallel and concatenates them once, a file
+        whose name has glob characters is read as named when it exists.
 
         :param reader: a function that takes a file path and returns a pandas dataframe
-        :param file_path: The path to the file to read
+        :param file_path: The path to the file to read, or a glob pattern such as "sales_*.csv"
+        :param optimize_dtypes: True, or a dictionary of `optimize_dtypes` settings, to reduce the memory
+        of the result. The before/after memory report is in `out_df.attrs["dtype_report"]`
+        :param columns: The columns to load, passed to the reader as usecols or columns when it supports it
+        :param row_filter: A function that takes the dataframe of a file and returns a boolean mask of the
+        rows to keep
+        :param source_column: The name of a category column added with the file name of every row
+        :param max_workers: The maximum number of files read at the same time
+        :param use_processes: If True the files are read on a process pool instead of a thread pool. The
+        reader and the row filter must then be picklable, so no lambdas
         :return: the reader function.
         """
-        out_df = (
-            reader(self._input_path + file_path, **kwargs)
-            if os.path.exists(self._input_path + file_path)
-            else reader(file_path, **kwargs)
-        )
+        with tracer.span("read_file", file_path):
+            # an existing file is read as named, even with glob characters such as "[final]"
+            if os.path.exists(self._input_path + file_path):
+                file_paths = [self._input_path + file_path]
+            elif os.path.exists(file_path):
+                file_paths = [file_path]
+            elif any(char in file_path for char in "*?["):
+                file_paths = sorted(glob.glob(self._input_path + file_path)) or sorted(
+                    glob.glob(file_path)
+                )
+                if not file_paths:
+                    raise FileNotFoundError(f"No files match {file_path}")
+            else:
+                file_paths = [file_path]
+
+            read_part = partial(
+                read_file_part,
+                reader,
+                kwargs=kwargs,
+                columns=columns,
+                row_filter=row_filter,
+                source_column=source_column,
+            )
+
+            with tracer.phase("read"):
+                if len(file_paths) == 1:
+                    frames = [read_part(file_paths[0])]
+                else:
+                    pool = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+                    with pool(max_workers=max_workers) as executor:
+                        frames = list(executor.map(read_part, file_paths))
+
+            with tracer.phase("build"):
+                out_df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+                if source_column is not None:
+                    out_df[source_column] = out_df[source_column].astype("category")
+
+            if optimize_dtypes:
+                out_df = self._optimize_result(out_df, optimize_dtypes)
+
+            tracer.record_result(out_df)
+
         return out_df
 
+    def stage_write(self, df, name, partition_by=None, mode="overwrite", row_group_size=None):
+        """
+        This function writes a dataframe to a Parquet dataset in the stage folder, partitioned in
+        folders by the values of the partition_by columns.
+
+        :param df: The data to be staged
+        :param name: The dataset name
+        :param partition_by: The partition columns, such as ["YEAR", "REGION"]
+        :param mode: "overwrite" replaces the dataset, "overwrite_partitions" only replaces the
+        partitions that are in df and "append" adds the rows to the dataset
+        :param row_group_size: The maximum number of rows of a Parquet row group
+        """
+        with tracer.span("stage_write", name):
+            self._stage_store.write(df, name, partition_by, mode, row_group_size)
+            tracer.record_result(df)
+
+    def stage_read(self, name, columns=None, filters=None):
+        """
+        This function reads a Parquet dataset from the stage folder, reading only the requested columns
+        and skipping the partitions and row groups that don't match the filters.
+
+        :param name: The dataset name
+        :param columns: The columns to read, defaults to every column
+        :param filters: A list of (column, operator, value) tuples that must all match, such as
+        [("REGION", "=", "EU"), ("UNITS", ">", 0)], a list of those lists, or a pyarrow expression
+        :return: a pandas DataFrame.
+        """
+        with tracer.span("stage_read", name):
+            out_df = self._stage_store.read(name, columns, filters)
+            tracer.record_result(out_df)
+        return out_df
+
+    def configure_archive(self, compression="gzip", keep=None, max_age_days=None):
+        """
+        This function sets how superseded outputs and stage files are archived in the archive folder.
+        The archiver is shared by every DataGetter of the folder, so the settings apply to all of them.
+
+        :param compression: "gzip", or "zstd" when the zstandard package is installed
+        :param keep: The number of archived versions kept per file, all of them if None
+        :param max_age_days: The number of days archived versions are kept, forever if None
+        """
+        self._archiver.configure(compression, keep, max_age_days)
+
+    def archive_stage(self, name):
+        """
+        This function moves a stage file or dataset to the archive folder, it is compressed in the
+        background.
+
+        :param name: The file or dataset name in the stage folder
+        :return: the archived path, or None when it does not exist.
+        """
+        return self._archiver.archive(self._stage_path + name)
+
+    def flush_archive(self):
+        """
+        This function waits until every archived file is compressed.
+        """
+        self._archiver.flush()
+
     def _file_saver(self, data, file_name, protect_file, security_method, auth_users):
         """
-        :param data: The data to be written to the Excel file
+        :param data: The data to be written to the file, a dataframe or an iterable of dataframe chunks
+        for xlsx, csv and parquet files
         :param file_name: The name of the file to be saved
         :param protect_file: If True, the file will be password protected
         :param draft_email: If True, the email will be saved as a draft. If False, the email will be
@@ -152,16 +775,32 @@ class DataGetter (DBCon):
         :param email_folder: The folder where the email will be saved
         """
 
-        # Before saving the file set DisplayAlerts to False to suppress the warning dialog:
+        output_path = f"{self._output_path}{file_name}"
+
+        # xlsx, csv and parquet files are streamed without Excel unless they need protection, the
+        # existing file is archived once the new one is complete
+        file_format = headless_format(file_name)
+        if file_format is not None and not protect_file:
+            with tracer.phase("write"):
+                rows = write_frames(
+                    data, output_path, file_format, text_columns=id_columns,
+                    before_replace=self._archiver.archive,
+                )
+            tracer.record_rows(rows)
+            return
 
-        # remove existing files before save
-        file_cleaner(f"{self._output_path}{file_name}")
+        # archive existing files before save, they are compressed in the background
+        self._archiver.archive(output_path)
+
+        import xlwings as xw
+
+        if pt.system() == "Windows":
+            import win32com.client
+
+        # Before saving the file set DisplayAlerts to False to suppress the warning dialog:
 
         # default password
         file_password = None
-        # file_format = file_format_constant(file_name)
-
-        output_path = f"{self._output_path}{file_name}"
 
         # workbook / sheet variables
         app = xw.App(visible=False)
@@ -223,4 +862,75 @@ class DataGetter (DBCon):
         file_name = file_namer(custom_filename)
 
         # save file
-        self._file_saver(odf, file_name, protect_file, security_method, auth_users)
+        with tracer.span("export_data", file_name, self._provider, self._environment):
+            self._file_saver(odf, file_name, protect_file, security_method, auth_users)
+
+    def export_query(
+        self,
+        query,
+        custom_filename=None,
+        rollover="sheet",
+        max_rows=None,
+        chunksize=100000,
+        max_workers=None,
+        params=None,
+        **kwargs,
+    ):
+        """
+        This function streams the results of a query from the cursor to an xlsx, csv or parquet file
+        one chunk at a time, without building the whole dataframe. Results above the Excel row limit
+        roll over to new sheets of the same workbook, or to new files.
+
+        :param query: The name of a `.sql` file in the query folder, a raw SQL query, or an iterable of
+        dataframe chunks
+        :param custom_filename: The output file name, its extension picks the format
+        :param rollover: "sheet" adds sheets to the workbook and "file" writes numbered files such as
+        "sales_001.xlsx"
+        :param max_rows: The data rows of each sheet or file, defaults to the Excel row limit. With
+        "file" csv and parquet exports are only split when it is set
+        :param chunksize: The number of rows read from the cursor at once
+        :param max_workers: The number of files written at the same time with "file"
+        :param params: A dictionary of bind parameters, written as `:name` in the SQL text
+        :return: a list of (file path, rows) tuples of the written files.
+        """
+        if rollover not in ("sheet", "file"):
+            raise ValueError(f"Unsupported rollover: {rollover}. Supported rollovers: sheet, file.")
+
+        # the default report name with an xlsx extension, xlsb needs Excel
+        file_name = custom_filename or os.path.splitext(file_namer(None))[0] + ".xlsx"
+        file_format = headless_format(file_name)
+        if file_format is None:
+            raise ValueError("Streaming exports support xlsx, csv and parquet files.")
+
+        if isinstance(query, str):
+            label = query
+            chunks = self.iter_sql_query(query, chunksize=chunksize, params=params, **kwargs)
+        else:
+            label = file_name
+            chunks = query
+
+        output_path = f"{self._output_path}{file_name}"
+        with tracer.span("export_query", label, self._provider, self._environment):
+            # the existing files are only archived once the export is complete
+            if rollover == "sheet":
+                with tracer.phase("write"):
+                    rows = write_frames(
+                        chunks, output_path, file_format, text_columns=id_columns,
+                        max_rows=max_rows, before_replace=self._archiver.archive,
+                    )
+                written = [(output_path, rows)]
+            else:
+                with tracer.phase("write"):
+                    written = write_parts(
+                        chunks, output_path, file_format, max_rows=max_rows,
+                        text_columns=id_columns, max_workers=max_workers,
+                        before_replace=self._archiver.archive,
+                    )
+                # archive the extra parts of a longer previous export
+                part = len(written)
+                while os.path.exists(part_path(output_path, part)):
+                    self._archiver.archive(part_path(output_path, part))
+                    part += 1
+            tracer.record_rows(sum(rows for _, rows in written))
+
+        return written
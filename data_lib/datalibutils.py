@@ -1,7 +1,11 @@
-import keyring as kr, datetime as dt, nbformat as nbf, os
-from nbconvert.exporters import HTMLExporter
-from nbconvert.preprocessors import TagRemovePreprocessor
-from traitlets.config import Config
+import datetime as dt, os, inspect, json, glob, hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+
+
+# string values treated as missing by normalize_nulls
+NULL_VALUES = ["", "NULL", "null", "None", "none", "nan", "NaN", "N/A", "n/a"]
 
 
 # delete existing file
@@ -19,8 +23,15 @@ def file_cleaner(file_name):
         os.remove(file_name)
 
 
+def _string_columns(df):
+    """
+    Returns the names of the object and string columns of a dataframe
+    """
+    return df.select_dtypes(include=["object", "string"]).columns
+
+
 # trims whitespaces
-def column_trim(df):
+def column_trim(df, inplace=False):
     """
     Trims any trailing spaces on string dataframe columns
 
@@ -28,6 +39,9 @@ def column_trim(df):
     ----------
     df : dataframe
         The dataframe that needs column trims
+    inplace : bool
+        If True the columns of df are replaced, otherwise a shallow copy is returned and only the
+        trimmed columns are new
 
     Returns
     -------
@@ -35,8 +49,46 @@ def column_trim(df):
         a dataframe with all column strings trimmed
     """
 
-    trim_strings = lambda x: x.strip() if isinstance(x, str) else x
-    return df.applymap(trim_strings)
+    out = df if inplace else df.copy(deep=False)
+    for col in _string_columns(out):
+        values = out[col]
+        try:
+            trimmed = values.str.strip()
+        except AttributeError:
+            # object column without any strings
+            continue
+        # .str returns NaN for values that aren't strings, keep those as they were
+        out[col] = trimmed.where(trimmed.notna(), values)
+    return out
+
+
+def normalize_nulls(df, null_values=NULL_VALUES, inplace=False):
+    """
+    Replaces the string placeholders of missing values with NaN on string dataframe columns
+
+    Parameters
+    ----------
+    df : dataframe
+        The dataframe to be normalized
+    null_values : list
+        The string values treated as missing
+    inplace : bool
+        If True the columns of df are replaced, otherwise a shallow copy is returned and only the
+        normalized columns are new
+
+    Returns
+    -------
+    dataframe
+        a dataframe with missing values as NaN
+    """
+
+    out = df if inplace else df.copy(deep=False)
+    for col in _string_columns(out):
+        values = out[col]
+        is_null = values.isin(null_values)
+        if is_null.any():
+            out[col] = values.mask(is_null, np.nan)
+    return out
 
 
 def file_format_constant(file_name):
@@ -58,28 +110,330 @@ def file_format_constant(file_name):
     return constant
 
 
-def number_to_string(df):
+def id_columns(columns):
+    """
+    Returns the ID columns, the columns whose name contains "ID"
+    """
+    return [col for col in columns if "ID" in str(col)]
+
+
+def number_to_string(df, inplace=False):
     """
-    Converts a column of numbers to strings
+    Converts the ID columns to strings prefixed with an apostrophe, so Excel keeps them as text
 
     Parameters
     ----------
     df : pandas.DataFrame
         The dataframe to be converted
-    column_name : str
-        The column name to be converted
+    inplace : bool
+        If True the columns of df are replaced, otherwise a shallow copy is returned and only the
+        converted columns are new
 
     Returns
     -------
     pandas.DataFrame
         The converted dataframe
     """
-    for col in df.columns:
-        if "ID" in col:
-            df[col] = "'" + df[col]
-            return df
+    out = df if inplace else df.copy(deep=False)
+    for col in id_columns(out.columns):
+        values = out[col]
+        out[col] = ("'" + values.astype(str)).where(values.notna(), values)
+    return out
+
+
+# cleaning steps available to clean_dataframe, in their default order
+CLEANING_STEPS = {
+    "trim": column_trim,
+    "nulls": normalize_nulls,
+    "ids": number_to_string,
+}
+
+
+def clean_dataframe(df, steps=None, inplace=False):
+    """
+    Runs a pipeline of column-wise cleaning steps on a dataframe
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        The dataframe to be cleaned
+    steps : list
+        The names of the steps in CLEANING_STEPS, or functions that take a dataframe and an inplace
+        argument, run in order. Defaults to every step in CLEANING_STEPS
+    inplace : bool
+        If True the columns of df are replaced, otherwise a shallow copy is returned and only the
+        cleaned columns are new
+
+    Returns
+    -------
+    pandas.DataFrame
+        The cleaned dataframe
+    """
+    out = df if inplace else df.copy(deep=False)
+    for step in steps if steps is not None else CLEANING_STEPS:
+        clean_step = CLEANING_STEPS[step] if isinstance(step, str) else step
+        out = clean_step(out, inplace=True)
+    return out
+
+
+def optimize_dtypes(
+    df,
+    category_ratio=0.5,
+    max_categories=1000,
+    string_dtype="string[pyarrow]",
+    downcast_floats=False,
+    inplace=False,
+):
+    """
+    Reduces the memory of a dataframe by downcasting numeric columns, converting low-cardinality
+    string columns to category and the other string columns to a string dtype
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        The dataframe to be optimized
+    category_ratio : float
+        The maximum share of unique values for a string column to become a category
+    max_categories : int
+        The maximum number of unique values for a string column to become a category
+    string_dtype : str
+        The dtype of the string columns that don't become categories, None keeps them as objects
+    downcast_floats : bool
+        If True float64 columns are downcast to float32, which loses precision
+    inplace : bool
+        If True the columns of df are replaced, otherwise a shallow copy is returned and only the
+        converted columns are new
+
+    Returns
+    -------
+    tuple
+        The optimized dataframe and a report with the dtypes and memory in bytes of every column before
+        and after, and the totals
+    """
+    dtypes_before = df.dtypes
+    bytes_before = df.memory_usage(index=False, deep=True)
+
+    out = df if inplace else df.copy(deep=False)
+    for col in out.columns:
+        values = out[col]
+        if pd.api.types.is_bool_dtype(values) or isinstance(values.dtype, pd.CategoricalDtype):
+            continue
+        elif pd.api.types.is_integer_dtype(values):
+            out[col] = pd.to_numeric(values, downcast="integer")
+        elif pd.api.types.is_float_dtype(values):
+            if downcast_floats:
+                out[col] = pd.to_numeric(values, downcast="float")
+        elif values.dtype == object or pd.api.types.is_string_dtype(values):
+            try:
+                unique_values = values.nunique(dropna=True)
+            except TypeError:
+                # unhashable values such as lists or dictionaries
+                continue
+            if unique_values <= max_categories and unique_values <= category_ratio * len(values):
+                out[col] = values.astype("category")
+            elif string_dtype is not None and pd.api.types.infer_dtype(values, skipna=True) == "string":
+                out[col] = values.astype(string_dtype)
+
+    bytes_after = out.memory_usage(index=False, deep=True)
+    report = {
+        "bytes_before": int(bytes_before.sum()),
+        "bytes_after": int(bytes_after.sum()),
+        "columns": {
+            col: {
+                "dtype_before": str(dtypes_before[col]),
+                "dtype_after": str(out.dtypes[col]),
+                "bytes_before": int(bytes_before[col]),
+                "bytes_after": int(bytes_after[col]),
+            }
+            for col in out.columns
+        },
+    }
+    return out, report
+
+
+# words after BEGIN that start a transaction instead of a procedural block
+TRANSACTION_WORDS = {
+    "TRANSACTION", "TRAN", "WORK", "DISTRIBUTED", "ISOLATION", "DEFERRED", "IMMEDIATE", "EXCLUSIVE",
+}
+
+# words after END that close a block that didn't open with BEGIN or CASE
+END_WORDS = {"IF", "LOOP", "WHILE", "FOR", "REPEAT"}
+
+
+def _next_word(sql_text, i):
+    # the next word of the text in upper case, "" when a symbol such as ";" comes first
+    rest = sql_text[i:].lstrip()
+    word = ""
+    for char in rest:
+        if not (char.isalnum() or char == "_"):
+            break
+        word += char
+    return word.upper()
+
+
+def split_sql_statements(sql_text):
+    """
+    Splits a SQL script into its statements on the semicolons that are outside of quotes, comments,
+    dollar-quoted bodies ($$ ... $$) and BEGIN ... END blocks, so trigger, procedure and scripting
+    bodies stay in one statement
+
+    Parameters
+    ----------
+    sql_text : str
+        The SQL script
+
+    Returns
+    -------
+    list
+        The statements of the script without their trailing semicolons
+    """
+    statements = []
+    current = []
+    has_code = False
+    depth = 0
+    i, length = 0, len(sql_text)
+
+    while i < length:
+        char = sql_text[i]
+
+        if char in ("'", '"'):
+            # quoted text, a doubled quote is an escaped quote
+            end = i + 1
+            while end < length:
+                if sql_text[end] == char:
+                    if end + 1 < length and sql_text[end + 1] == char:
+                        end += 2
+                        continue
+                    break
+                end += 1
+            current.append(sql_text[i:end + 1])
+            has_code = True
+            i = end + 1
+        elif sql_text.startswith("--", i):
+            end = sql_text.find("\n", i)
+            end = length if end == -1 else end
+            current.append(sql_text[i:end])
+            i = end
+        elif sql_text.startswith("/*", i):
+            end = sql_text.find("*/", i + 2)
+            end = length if end == -1 else end + 2
+            current.append(sql_text[i:end])
+            i = end
+        elif char == "$" and _dollar_tag(sql_text, i):
+            # dollar-quoted body, such as $$ ... $$ or $body$ ... $body$
+            tag = _dollar_tag(sql_text, i)
+            end = sql_text.find(tag, i + len(tag))
+            end = length if end == -1 else end + len(tag)
+            current.append(sql_text[i:end])
+            has_code = True
+            i = end
+        elif char.isalpha() or char == "_":
+            end = i
+            while end < length and (sql_text[end].isalnum() or sql_text[end] in "_$"):
+                end += 1
+            word = sql_text[i:end].upper()
+            if word == "BEGIN" and _next_word(sql_text, end) not in TRANSACTION_WORDS | {""}:
+                depth += 1
+            elif word == "CASE":
+                depth += 1
+            elif word == "END" and depth and _next_word(sql_text, end) not in END_WORDS:
+                depth -= 1
+            current.append(sql_text[i:end])
+            has_code = True
+            i = end
+        elif char == ";" and not depth:
+            if has_code:
+                statements.append("".join(current).strip())
+            current, has_code = [], False
+            i += 1
         else:
-            return df
+            current.append(char)
+            has_code = has_code or not char.isspace()
+            i += 1
+
+    if has_code:
+        statements.append("".join(current).strip())
+
+    return statements
+
+
+def _dollar_tag(sql_text, i):
+    # the $tag$ that opens a dollar-quoted body at i, None for a $1 positional parameter
+    end = sql_text.find("$", i + 1)
+    if end == -1:
+        return None
+    tag = sql_text[i + 1:end]
+    if tag and not (tag[0].isalpha() or tag[0] == "_") or not all(c.isalnum() or c == "_" for c in tag):
+        return None
+    return sql_text[i:end + 1]
+
+
+def projection_kwargs(reader, columns):
+    """
+    Returns the reader argument that loads only some columns of a file, usecols for read_csv and
+    read_excel or columns for read_parquet and read_feather
+
+    Parameters
+    ----------
+    reader : function
+        The function that reads the file
+    columns : list
+        The columns to load
+
+    Returns
+    -------
+    dict
+        The keyword argument, empty when the reader supports neither
+    """
+    try:
+        parameters = inspect.signature(reader).parameters
+    except (TypeError, ValueError):
+        return {}
+
+    if "usecols" in parameters:
+        return {"usecols": columns}
+    elif "columns" in parameters:
+        return {"columns": columns}
+    return {}
+
+
+def read_file_part(reader, file_path, kwargs, columns=None, row_filter=None, source_column=None):
+    """
+    Reads one file with column projection and a row filter
+
+    Parameters
+    ----------
+    reader : function
+        The function that reads the file
+    file_path : str
+        The file location and name
+    kwargs : dict
+        The keyword arguments of the reader
+    columns : list
+        The columns to load, pushed down to the reader when it supports it
+    row_filter : function
+        A function that takes the dataframe and returns a boolean mask of the rows to keep
+    source_column : str
+        The name of a column added with the file name
+
+    Returns
+    -------
+    pandas.DataFrame
+        The rows and columns of the file
+    """
+    if columns is not None:
+        kwargs = {**projection_kwargs(reader, columns), **kwargs}
+
+    df = reader(file_path, **kwargs)
+
+    if columns is not None:
+        df = df[columns]
+    if row_filter is not None:
+        df = df[row_filter(df)]
+    if source_column is not None:
+        df = df.assign(**{source_column: os.path.basename(file_path)})
+
+    return df
 
 
 def password_generator(co_key):
@@ -103,13 +457,16 @@ def file_namer(file_name):
     return file_name
 
 
-def notebook_to_html(notebook_path, html_path):
+def html_exporter():
     """
-    It takes a Jupyter notebook and converts it to an HTML file
+    It builds the HTML exporter used to publish notebooks, without code cells and prompts and with
+    the tagged cells removed
 
-    :param notebook_path: The path to the notebook you want to convert
-    :param html_path: The path to the output HTML file
+    :return: a configured nbconvert HTMLExporter
     """
+    from nbconvert.exporters import HTMLExporter
+    from traitlets.config import Config
+
     # Setup config
     cfg = Config()
 
@@ -120,13 +477,23 @@ def notebook_to_html(notebook_path, html_path):
     # Configure and run out exporter
     cfg.HTMLExporter.preprocessors = ["nbconvert.preprocessors.TagRemovePreprocessor"]
 
-    exporter = HTMLExporter(config=cfg)
-    exporter.register_preprocessor(TagRemovePreprocessor(config=cfg), True)
+    return HTMLExporter(config=cfg)
+
+
+def notebook_to_html(notebook_path, html_path, exporter=None):
+    """
+    It takes a Jupyter notebook and converts it to an HTML file
+
+    :param notebook_path: The path to the notebook you want to convert
+    :param html_path: The path to the output HTML file
+    :param exporter: A configured exporter from html_exporter, reused across calls when given
+    """
+    exporter = exporter or html_exporter()
 
     # Configure and run our exporter - returns a tuple - first element with html,
     # second with notebook metadata
     try:
-        output = HTMLExporter(config=cfg).from_filename(notebook_path)
+        output = exporter.from_filename(notebook_path)
         html_output_name = notebook_path.rsplit(".", 1)[0] + ".html"
         # Write to output html file
         with open(html_path + f"/{html_output_name}", "w", encoding="utf8") as f:
@@ -135,6 +502,78 @@ def notebook_to_html(notebook_path, html_path):
         print("Notebook not found. Review the Notebook path.")
 
 
+# exporter of each notebook rendering worker process, built once by _init_html_worker
+_worker_exporter = None
+
+
+def _init_html_worker():
+    global _worker_exporter
+    _worker_exporter = html_exporter()
+
+
+def _render_notebook(notebook_path, html_file):
+    exporter = _worker_exporter or html_exporter()
+    output = exporter.from_filename(notebook_path)
+    with open(html_file, "w", encoding="utf8") as f:
+        f.write(output[0])
+    return html_file
+
+
+def notebooks_to_html(notebook_dir, html_path, max_workers=None, force=False):
+    """
+    It converts every Jupyter notebook of a folder to HTML on parallel worker processes, each one
+    reusing a single exporter. Notebooks whose content didn't change since their last HTML was
+    rendered are skipped
+
+    :param notebook_dir: The folder with the notebooks
+    :param html_path: The folder of the HTML files
+    :param max_workers: The number of worker processes, defaults to the number of CPUs
+    :param force: If True every notebook is rendered again
+    :return: a dictionary with the rendered and skipped notebooks and the errors of the failed ones
+    """
+    os.makedirs(html_path, exist_ok=True)
+    manifest_path = os.path.join(html_path, ".notebook_hashes.json")
+    try:
+        with open(manifest_path) as get:
+            manifest = json.load(get)
+    except (FileNotFoundError, ValueError):
+        manifest = {}
+
+    report = {"rendered": [], "skipped": [], "failed": {}}
+    jobs = {}
+    for notebook_path in sorted(glob.glob(os.path.join(notebook_dir, "*.ipynb"))):
+        notebook_name = os.path.basename(notebook_path)
+        with open(notebook_path, "rb") as get:
+            content_hash = hashlib.sha256(get.read()).hexdigest()
+        html_file = os.path.join(html_path, notebook_name.rsplit(".", 1)[0] + ".html")
+
+        if not force and manifest.get(notebook_name) == content_hash and os.path.exists(html_file):
+            report["skipped"].append(notebook_name)
+        else:
+            jobs[notebook_name] = (notebook_path, html_file, content_hash)
+
+    if jobs:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_html_worker) as executor:
+            futures = {
+                executor.submit(_render_notebook, notebook_path, html_file): notebook_name
+                for notebook_name, (notebook_path, html_file, _) in jobs.items()
+            }
+            for future in as_completed(futures):
+                notebook_name = futures[future]
+                try:
+                    future.result()
+                    manifest[notebook_name] = jobs[notebook_name][2]
+                    report["rendered"].append(notebook_name)
+                except Exception as e:
+                    print(f"Notebook {notebook_name} failed: {e}")
+                    report["failed"][notebook_name] = e
+
+        with open(manifest_path, "w") as put:
+            json.dump(manifest, put, indent=2)
+
+    return report
+
+
 def create_folder_tree(root_folder, sub_dir_folder, folder_list, path):
     # Create directory
     try:
@@ -158,54 +597,24 @@ def create_folder_tree(root_folder, sub_dir_folder, folder_list, path):
 
 def get_kr_credentials(input_provider, environment):
     """
-    Retrieves the database credentials for the given provider and database name from the kr.
+    Retrieves the database credentials for the given provider and database name from the kr, or from
+    the other providers of the credential cache. Resolved credentials are cached in memory.
     """
-    # Map the provider names to the corresponding kr service names
-    kr_services = {
-        "mssql": "MSSQL",
-        "mysql": "MySQL",
-        "teradata": "Teradata",
-        "postgresql": "PostgreSQL",
-        "sqlite": "SQLite",
-        "snowflake": "Snowflake",
-    }
-    
+    from .credentials import KR_SERVICES, credential_cache
+
     # convert input provider to lower match casing
     provider = input_provider.lower()
     
     # Validate the provider name
-    if provider not in kr_services:
+    if provider not in KR_SERVICES:
         raise ValueError(
-            f"Unsupported provider: {provider}. Supported providers: {', '.join(kr_services.keys())}"
+            f"Unsupported provider: {provider}. Supported providers: {', '.join(KR_SERVICES.keys())}"
         )
 
-    # Get the database credentials from the kr
-    try:
-        
-        username = kr.get_password(kr_services[provider] + "_" + environment + "_User", "username")
-        password = kr.get_password(kr_services[provider]  + "_" + environment + "_Password", "password")
-        host = kr.get_password(kr_services[provider] + "_" + environment +  "_Host", "host")
-        port = kr.get_password(kr_services[provider] + "_" + environment +  "_Port", "port")
-        database = kr.get_password(kr_services[provider] + "_" + environment +  "_Database", "database")
-        return username, password, host, port, database
-            
-    except kr.errors.NokrError:
-        print(f"No kr service available for provider: {provider}.")
-        print(
-            f"To use this function, you must store the database credentials for the {provider} provider in the kr."
-        )
-        print(
-            f"Use the following key names in the kr: username, assword, host, port, database (if applicable)"
-        )
-        return None
-    except kr.errors.PasswordSetError:
-        print(
-            f"Error retrieving database credentials from kr for provider: {provider}."
-        )
-        print(
-            f"Make sure the database credentials are stored in the kr using the following key names: username, password (if applicable)"
-        )
-        return None
+    credentials = credential_cache.get(provider, environment)
+    if credentials is None:
+        return None, None, None, None, None
+    return credentials
     
 def validate_credentials(provider, environment):
 # Validate the database credentials
@@ -258,7 +667,7 @@ def create_database_uri(provider, environment, schema=None, role="PUBLIC"):
     elif provider == "sqlite":
         db_uri = f"sqlite:///{credentials[4]}"
     elif provider == "snowflake":
-        if credentials[1] == "":
+        if not credentials[1]:
             db_uri = f"snowflake://{credentials[0]}@{credentials[2]}?role={role}&authenticator=externalbrowser"
         else:
             db_uri = f"snowflake://{credentials[0]}:{credentials[1]}@{credentials[2]}?role={role}"
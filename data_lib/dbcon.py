@@ -1,4 +1,121 @@
+import atexit
+import threading
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+
+# default connection pool settings, used unless overridden per engine
+POOL_OPTIONS = {
+    "pool_size": 5,
+    "max_overflow": 10,
+    "pool_recycle": 1800,
+    "pool_pre_ping": True,
+}
+
+
+def pool_engine_args(uri, pool_options=None):
+    """
+    This function builds the `create_engine` arguments that set up the connection pool of a database
+    URI, adapting them to the pools each backend supports.
+
+    :param uri: The database URI
+    :param pool_options: The pool_size, max_overflow, pool_recycle and pool_pre_ping settings that
+    override the defaults
+    :return: a dictionary of keyword arguments for `create_engine`.
+    """
+    engine_args = {**POOL_OPTIONS, **(pool_options or {})}
+    url = make_url(uri)
+
+    if url.get_backend_name() == "sqlite":
+        if url.database in (None, "", ":memory:"):
+            # in memory databases live in a single connection per thread
+            engine_args.pop("pool_size", None)
+            engine_args.pop("max_overflow", None)
+        else:
+            engine_args["poolclass"] = QueuePool
+            engine_args["connect_args"] = {"check_same_thread": False}
+    elif url.drivername == "mssql+pyodbc":
+        # send executemany batches as a single parameter array
+        engine_args["fast_executemany"] = True
+
+    return engine_args
+
+
+class EngineRegistry:
+    def __init__(self):
+        """
+        This is the constructor function for a process wide registry that hands out one pooled
+        engine per database target, so every DataGetter in the process shares warm connections.
+        """
+        self._engines = {}
+        self._lock = threading.Lock()
+
+    def get_engine(self, key, uri_factory, **pool_options):
+        """
+        This function returns the pooled engine registered for a database target, creating it on the
+        first request.
+
+        :param key: The database target, a (provider, environment, schema, role) tuple
+        :param uri_factory: A function that returns the database URI, only called when the engine
+        does not exist yet
+        :param pool_options: The pool_size, max_overflow, pool_recycle and pool_pre_ping settings of
+        the engine. They are ignored when the engine already exists
+        :return: a SQLAlchemy engine.
+        """
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is None:
+                uri = uri_factory()
+                engine = create_engine(uri, **pool_engine_args(uri, pool_options))
+                self._engines[key] = engine
+        return engine
+
+    def dispose(self, key):
+        """
+        This function closes the connections of a database target and removes its engine.
+
+        :param key: The database target, a (provider, environment, schema, role) tuple
+        """
+        with self._lock:
+            engine = self._engines.pop(key, None)
+        if engine is not None:
+            engine.dispose()
+
+    def shutdown(self):
+        """
+        This function closes the connections of every registered engine and empties the registry.
+        """
+        with self._lock:
+            engines = list(self._engines.values())
+            self._engines.clear()
+        for engine in engines:
+            engine.dispose()
+
+    def stats(self):
+        """
+        This function returns the connection pool usage of every registered engine.
+        :return: a dictionary of database targets and their pool size, checked out, idle and overflow
+        connections.
+        """
+        with self._lock:
+            engines = dict(self._engines)
+
+        pool_stats = {}
+        for key, engine in engines.items():
+            pool = engine.pool
+            pool_stats[key] = {
+                "pool": type(pool).__name__,
+                "size": pool.size() if hasattr(pool, "size") else None,
+                "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+                "idle": pool.checkedin() if hasattr(pool, "checkedin") else None,
+                "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+            }
+        return pool_stats
+
+
+engine_registry = EngineRegistry()
+atexit.register(engine_registry.shutdown)
 
 
 class DBCon:
@@ -7,16 +124,32 @@ class DBCon:
         self._engine_args = None
         pass
 
-    def set_engine(self, uri):
+    def set_engine(self, uri, **pool_options):
         """
         It takes a dictionary of connection strings and returns the connection string for the database
         type specified in the config file
         :return: The create_engine function is being returned.
         """
-        engine = create_engine(uri)   
+        engine = create_engine(uri, **pool_engine_args(uri, pool_options))   
+        self._engine_args = None
         if "snowflake" in engine.url:
             self.engine_args(engine)  
         return engine 
+
+    def shared_engine(self, key, uri_factory, **pool_options):
+        """
+        This function returns the engine of a database target from the process wide engine registry,
+        so the connection pool is shared with every other instance that uses the same target.
+
+        :param key: The database target, a (provider, environment, schema, role) tuple
+        :param uri_factory: A function that returns the database URI
+        :return: a SQLAlchemy engine.
+        """
+        engine = engine_registry.get_engine(key, uri_factory, **pool_options)
+        self._engine_args = None
+        if "snowflake" in engine.url:
+            self.engine_args(engine)
+        return engine
     
     def engine_args(self, db_engine):
         """
@@ -27,13 +160,12 @@ class DBCon:
         using this object to extract connection parameters such as host, username, and authentication
         method
         """
-        connection_parameters = db_engine.engine.url.translate_connect_args()
-        if len(connection_parameters) == 2:            
-            connection_parameters["account"] = connection_parameters.pop("host")
-            connection_parameters["user"] = connection_parameters.pop("username")
+        url = db_engine.engine.url
+        connection_parameters = url.translate_connect_args()
+        connection_parameters["account"] = connection_parameters.pop("host")
+        connection_parameters["user"] = connection_parameters.pop("username")
+        if "password" not in connection_parameters:
             connection_parameters["authenticator"] = "externalbrowser"
-        else:
-            connection_parameters["user"] = connection_parameters.pop("username")
-            connection_parameters["authenticator"] = connection_parameters.pop("username")
+        if "role" in url.query:
+            connection_parameters["role"] = url.query["role"]
         self._engine_args = connection_parameters
-        
\ No newline at end of file
@@ -0,0 +1,456 @@
+import os
+import uuid
+import queue
+import itertools
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from .datalibutils import file_format_constant
+
+
+# rows of an Excel sheet, the header takes one of them
+EXCEL_MAX_ROWS = 1048576
+
+# rows converted to cells at once, bounds the memory of the boxed cell values
+XLSX_BATCH_ROWS = 50000
+
+
+def headless_format(file_name):
+    """
+    Returns the format a file can be written in without Excel
+
+    Parameters
+    ----------
+    file_name : str
+        The file name, its extension picks the format
+
+    Returns
+    -------
+    str
+        "xlsx", "csv" or "parquet", or None when the format needs Excel
+    """
+    constant = file_format_constant(file_name)
+
+    if constant == 51:
+        return "xlsx"
+    elif constant == 62:
+        return "csv"
+    elif file_name.split(".")[-1] == "parquet":
+        return "parquet"
+
+    return None
+
+
+def write_frames(
+    data, output_path, file_format, sheet_name="Data Export", transform=None, max_rows=None,
+    before_replace=None, text_columns=None,
+):
+    """
+    Streams a dataframe, or an iterable of dataframe chunks, to an xlsx, csv or parquet file one chunk
+    at a time, so memory use doesn't grow with the number of rows. xlsx files roll over to a new sheet,
+    "Data Export 2" and so on, when a sheet is full. The file is written to a temporary name and only
+    replaces output_path once it is complete
+
+    Parameters
+    ----------
+    data : pandas.DataFrame or iterable of pandas.DataFrame
+        The data to be written
+    output_path : str
+        The file location and name
+    file_format : str
+        "xlsx", "csv" or "parquet"
+    sheet_name : str
+        The name of the xlsx sheet
+    transform : function
+        A function applied to each chunk before it is written
+    max_rows : int
+        The data rows of each xlsx sheet, defaults to the Excel limit
+    before_replace : function
+        A function called with output_path once the file is complete, before the existing file is
+        replaced, to archive it for example
+    text_columns : list or function
+        The xlsx columns written as text cells, or a function that picks them from the columns, such
+        as `id_columns`. The values of csv and parquet files are never changed
+
+    Returns
+    -------
+    int
+        The number of rows written
+    """
+    frames = [data] if isinstance(data, pd.DataFrame) else data
+    if transform is not None:
+        frames = (transform(frame) for frame in frames)
+
+    temp_path = _temp_path(output_path)
+    rows = _write_file(frames, temp_path, file_format, sheet_name, max_rows, text_columns)
+    _replace(temp_path, output_path, before_replace)
+    return rows
+
+
+def _temp_path(output_path):
+    # same folder so the final rename doesn't copy the file, and the same extension
+    folder, name = os.path.split(output_path)
+    return os.path.join(folder, f".{uuid.uuid4().hex[:8]}.{name}")
+
+
+def _replace(temp_path, output_path, before_replace=None):
+    try:
+        if before_replace is not None:
+            before_replace(output_path)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        _remove(temp_path)
+        raise
+
+
+def _remove(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _write_file(frames, path, file_format, sheet_name, max_rows=None, text_columns=None):
+    # writes straight to path, a failed write removes the incomplete file
+    if file_format not in WRITERS:
+        raise ValueError(
+            f"Unsupported file format: {file_format}. Supported formats: {', '.join(WRITERS)}."
+        )
+    try:
+        if file_format == "xlsx":
+            return _write_xlsx(frames, path, sheet_name, max_rows, text_columns)
+        return WRITERS[file_format](frames, path, sheet_name, max_rows)
+    except BaseException:
+        _remove(path)
+        raise
+
+
+def split_rows(frames, max_rows):
+    """
+    Splits dataframe chunks in parts of at most max_rows rows, without copying the chunks
+
+    Parameters
+    ----------
+    frames : iterable of pandas.DataFrame
+        The dataframe chunks
+    max_rows : int
+        The maximum number of rows of a part, a single part if None
+
+    Returns
+    -------
+    generator
+        (part number, dataframe) tuples, the chunks of a part are consecutive
+    """
+    part, filled, started = 0, 0, False
+    for frame in frames:
+        if frame.empty:
+            if not started:
+                # an empty result still gets its header
+                started = True
+                yield part, frame
+            continue
+
+        start = 0
+        while start < len(frame):
+            if max_rows is not None and filled == max_rows:
+                part, filled = part + 1, 0
+            take = len(frame) - start
+            if max_rows is not None:
+                take = min(take, max_rows - filled)
+            started = True
+            yield part, frame.iloc[start:start + take]
+            start += take
+            filled += take
+
+
+def _text_cells(ws, values, columns):
+    # text cells with the text number format and a quote prefix, Excel keeps them as typed
+    from openpyxl.cell import WriteOnlyCell
+
+    for col in columns:
+        cells = []
+        for value in values[col]:
+            if value is None:
+                cells.append(None)
+                continue
+            cell = WriteOnlyCell(ws, value=value)
+            cell.number_format = "@"
+            cell.quotePrefix = True
+            cells.append(cell)
+        values[col] = pd.Series(cells, index=values.index, dtype=object)
+    return values
+
+
+def _as_text(values):
+    # integral float IDs, from columns with nulls, are written without the decimal part
+    if pd.api.types.is_float_dtype(values) and (values.dropna() % 1 == 0).all():
+        values = values.astype("Int64")
+    return values.astype(str).where(values.notna(), None)
+
+
+def _cell_values(ws, frame, text):
+    # the values of the rows as python objects, nulls as empty cells
+    values = frame.astype(object).where(frame.notna(), None)
+    if text:
+        for col in text:
+            values[col] = _as_text(frame[col])
+        values = _text_cells(ws, values, text)
+    return values
+
+
+def _write_xlsx(frames, output_path, sheet_name, max_rows=None, text_columns=None):
+    from openpyxl import Workbook
+
+    # write only workbooks stream rows to disk instead of keeping the cells in memory
+    wb = Workbook(write_only=True)
+    rows = 0
+    sheets = 0
+
+    try:
+        for part, pieces in itertools.groupby(
+            split_rows(frames, max_rows or EXCEL_MAX_ROWS - 1), key=lambda item: item[0]
+        ):
+            sheets += 1
+            ws = wb.create_sheet(sheet_name if part == 0 else f"{sheet_name} {part + 1}")
+            header = False
+            for _, frame in pieces:
+                if not header:
+                    ws.append([str(col) for col in frame.columns])
+                    header = True
+                    text = text_columns(frame.columns) if callable(text_columns) else text_columns
+                    text = [col for col in text or [] if col in frame.columns]
+                for start in range(0, len(frame), XLSX_BATCH_ROWS):
+                    values = _cell_values(ws, frame.iloc[start:start + XLSX_BATCH_ROWS], text)
+                    for row in values.itertuples(index=False, name=None):
+                        ws.append(row)
+                rows += len(frame)
+    except BaseException:
+        # release the temporary files of the sheets
+        for ws in wb.worksheets:
+            ws.close()
+        raise
+
+    if sheets == 0:
+        wb.create_sheet(sheet_name)
+    wb.save(output_path)
+    return rows
+
+
+def _write_csv(frames, output_path, sheet_name, max_rows=None):
+    rows = 0
+    header = True
+    with open(output_path, "w", newline="", encoding="utf8") as f:
+        for frame in frames:
+            frame.to_csv(f, header=header, index=False)
+            header = False
+            rows += len(frame)
+    return rows
+
+
+def _unify_schema(schema, other):
+    import pyarrow as pa
+
+    if int(pa.__version__.split(".")[0]) >= 14:
+        # null columns take the type of the chunk, ints next to floats become floats
+        return pa.unify_schemas([schema, other], promote_options="permissive")
+    return pa.schema(
+        [
+            other.field(field.name)
+            if pa.types.is_null(field.type) and field.name in other.names else field
+            for field in schema
+        ],
+        metadata=schema.metadata,
+    )
+
+
+def _promote_parquet(path, promoted_path, schema):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # copies the row groups written so far to a new file with the promoted schema
+    writer = pq.ParquetWriter(promoted_path, schema)
+    try:
+        with open(path, "rb") as get:
+            for batch in pq.ParquetFile(get).iter_batches():
+                writer.write_table(pa.Table.from_batches([batch]).cast(schema))
+    except BaseException:
+        writer.close()
+        _remove(promoted_path)
+        raise
+    os.remove(path)
+    return writer
+
+
+def _write_parquet(frames, output_path, sheet_name, max_rows=None):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    path = output_path
+    rows = 0
+    try:
+        for frame in frames:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            else:
+                # a column that was all null in the first chunks gets its type from a later chunk,
+                # the rows written so far are rewritten with it
+                schema = _unify_schema(writer.schema, table.schema)
+                if not schema.equals(writer.schema):
+                    writer.close()
+                    promoted_path = output_path + ".promoted" if path == output_path else output_path
+                    writer = _promote_parquet(path, promoted_path, schema)
+                    path = promoted_path
+                table = table.select(writer.schema.names).cast(writer.schema)
+            writer.write_table(table)
+            rows += len(frame)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            writer = None
+        if path != output_path:
+            _remove(path)
+        raise
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if path != output_path:
+        os.replace(path, output_path)
+    return rows
+
+
+WRITERS = {"xlsx": _write_xlsx, "csv": _write_csv, "parquet": _write_parquet}
+
+
+def part_path(output_path, part):
+    """
+    Returns the file name of a part of a split export, such as "sales_002.xlsx"
+    """
+    stem, extension = os.path.splitext(output_path)
+    return f"{stem}_{part + 1:03d}{extension}"
+
+
+def _feed(parts, future, item):
+    # a failed writer stops reading its queue, its error is raised instead of blocking forever
+    while True:
+        try:
+            parts.put(item, timeout=0.5)
+            return
+        except queue.Full:
+            if future.done():
+                future.result()
+                raise RuntimeError("The part writer stopped before the end of its rows.")
+
+
+def _drain(chunks, end):
+    # the end marker is compared by identity, dataframes can't be compared with ==
+    while (item := chunks.get()) is not end:
+        yield item
+
+
+def write_parts(
+    data, output_path, file_format, max_rows=None, sheet_name="Data Export", transform=None,
+    max_workers=None, before_replace=None, text_columns=None,
+):
+    """
+    Streams dataframe chunks to a series of files, starting a new file every max_rows rows, such as
+    "sales_001.xlsx" and "sales_002.xlsx". With max_workers every part is written by its own writer
+    thread fed through a queue of one chunk, so the next part is read while the previous ones are
+    still written and memory stays at a few chunks. The parts are written to temporary names and
+    only replace the existing files once every part is complete
+
+    Parameters
+    ----------
+    data : pandas.DataFrame or iterable of pandas.DataFrame
+        The data to be written
+    output_path : str
+        The file location and name, the part number is added to it
+    file_format : str
+        "xlsx", "csv" or "parquet"
+    max_rows : int
+        The data rows of each file, defaults to the Excel limit for xlsx files and a single file
+        otherwise
+    sheet_name : str
+        The name of the xlsx sheet
+    transform : function
+        A function applied to each chunk before it is written
+    max_workers : int
+        The number of parts written at the same time, parts are written one after the other if None
+    before_replace : function
+        A function called with the path of every part once the export is complete, before the
+        existing file is replaced, to archive it for example
+    text_columns : list or function
+        The xlsx columns written as text cells, or a function that picks them from the columns
+
+    Returns
+    -------
+    list
+        (file path, rows) tuples of the written parts
+    """
+    if file_format not in WRITERS:
+        raise ValueError(
+            f"Unsupported file format: {file_format}. Supported formats: {', '.join(WRITERS)}."
+        )
+    if max_rows is None and file_format == "xlsx":
+        max_rows = EXCEL_MAX_ROWS - 1
+
+    frames = [data] if isinstance(data, pd.DataFrame) else data
+    if transform is not None:
+        frames = (transform(frame) for frame in frames)
+    parts = itertools.groupby(split_rows(frames, max_rows), key=lambda item: item[0])
+
+    # (final path, temporary path, rows or future) of every part
+    written = []
+    try:
+        if not max_workers or max_workers <= 1:
+            for part, pieces in parts:
+                path = part_path(output_path, part)
+                temp_path = _temp_path(path)
+                written.append((path, temp_path, None))
+                rows = _write_file(
+                    (frame for _, frame in pieces), temp_path, file_format, sheet_name,
+                    text_columns=text_columns,
+                )
+                written[-1] = (path, temp_path, rows)
+        else:
+            _write_parts_parallel(
+                parts, output_path, file_format, sheet_name, max_workers, written, text_columns
+            )
+
+        for path, temp_path, _ in written:
+            _replace(temp_path, path, before_replace)
+    except BaseException:
+        for _, temp_path, _ in written:
+            _remove(temp_path)
+        raise
+
+    return [(path, rows) for path, _, rows in written]
+
+
+def _write_parts_parallel(
+    parts, output_path, file_format, sheet_name, max_workers, written, text_columns=None
+):
+    end = object()
+    futures = []
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="data_lib_export") as executor:
+        try:
+            for part, pieces in parts:
+                path = part_path(output_path, part)
+                temp_path = _temp_path(path)
+                chunks = queue.Queue(maxsize=1)
+                future = executor.submit(
+                    _write_file, _drain(chunks, end), temp_path, file_format, sheet_name,
+                    text_columns=text_columns,
+                )
+                futures.append((path, temp_path, future, chunks))
+                written.append((path, temp_path, None))
+                for _, frame in pieces:
+                    _feed(chunks, future, frame)
+                _feed(chunks, future, end)
+        except BaseException:
+            # end the part being written so the writers finish before the parts are removed
+            if futures and not futures[-1][2].done():
+                futures[-1][3].put(end)
+            raise
+
+    for index, (path, temp_path, future, _) in enumerate(futures):
+        written[index] = (path, temp_path, future.result())
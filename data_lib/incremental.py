@@ -0,0 +1,157 @@
+import os
+import json
+import datetime as dt
+import pandas as pd
+
+
+class IncrementalStore:
+    def __init__(self, store_path):
+        """
+        This is the constructor function for the stage store of incremental extracts, it keeps the
+        high-water mark of every query in a JSON file and the merged rows in a Parquet file.
+
+        :param store_path: The folder where the watermarks and the datasets are stored
+        """
+        self._store_path = store_path
+        os.makedirs(store_path, exist_ok=True)
+
+    def load_watermark(self, name):
+        """
+        This function returns the last high-water mark of an extract.
+
+        :param name: The extract name
+        :return: the watermark, or None when the extract never ran.
+        """
+        try:
+            with open(self._path(name, "json")) as get:
+                state = json.load(get)
+        except FileNotFoundError:
+            return None
+
+        if state["type"] == "timestamp":
+            return pd.Timestamp(state["watermark"]).to_pydatetime()
+        return state["watermark"]
+
+    def save_watermark(self, name, watermark):
+        """
+        This function stores the high-water mark of an extract.
+
+        :param name: The extract name
+        :param watermark: The highest value of the watermark column
+        """
+        if isinstance(watermark, (pd.Timestamp, dt.datetime, dt.date)):
+            state = {"type": "timestamp", "watermark": pd.Timestamp(watermark).isoformat()}
+        elif hasattr(watermark, "item"):
+            # numpy scalars
+            state = {"type": "value", "watermark": watermark.item()}
+        else:
+            state = {"type": "value", "watermark": watermark}
+
+        temp_path = self._path(name, "json.tmp")
+        with open(temp_path, "w") as put:
+            json.dump(state, put)
+        os.replace(temp_path, self._path(name, "json"))
+
+    def load(self, name):
+        """
+        This function returns the staged rows of an extract.
+
+        :param name: The extract name
+        :return: a pandas DataFrame, or None when the extract never ran.
+        """
+        try:
+            return pd.read_parquet(self._path(name, "parquet"))
+        except FileNotFoundError:
+            return None
+
+    def save(self, name, df):
+        """
+        This function replaces the staged rows of an extract.
+
+        :param name: The extract name
+        :param df: The merged rows
+        """
+        temp_path = self._path(name, "parquet.tmp")
+        df.to_parquet(temp_path, index=False)
+        os.replace(temp_path, self._path(name, "parquet"))
+
+    def _path(self, name, extension):
+        return os.path.join(self._store_path, f"{name}.{extension}")
+
+
+def merge_increment(staged, increment, mode="append", key_columns=None):
+    """
+    Merges the new rows of an incremental extract into the staged rows
+
+    Parameters
+    ----------
+    staged : pandas.DataFrame
+        The staged rows, None on the first run
+    increment : pandas.DataFrame
+        The rows beyond the last high-water mark
+    mode : str
+        "append" adds the new rows, "upsert" replaces the staged rows with the same key_columns
+    key_columns : list
+        The columns that identify a row, required by "upsert"
+
+    Returns
+    -------
+    pandas.DataFrame
+        The merged rows
+    """
+    if mode not in ("append", "upsert"):
+        raise ValueError(f"Unsupported mode: {mode}. Supported modes: append, upsert.")
+    if mode == "upsert" and not key_columns:
+        raise ValueError("The upsert mode needs the key_columns of the query.")
+
+    if staged is None or staged.empty:
+        merged = increment.reset_index(drop=True)
+    elif increment.empty:
+        merged = staged
+    else:
+        merged = pd.concat([staged, increment], ignore_index=True)
+
+    if mode == "upsert":
+        merged = merged.drop_duplicates(subset=key_columns, keep="last").reset_index(drop=True)
+
+    return merged
+
+
+def drop_staged_rows(increment, staged, watermark_column, watermark, key_columns=None):
+    """
+    Drops the rows of an increment that are already staged. Increments are fetched from the last
+    high-water mark included, so the rows at that mark come back on every run
+
+    Parameters
+    ----------
+    increment : pandas.DataFrame
+        The rows from the last high-water mark
+    staged : pandas.DataFrame
+        The staged rows, None on the first run
+    watermark_column : str
+        The column that grows with every change
+    watermark : object
+        The last high-water mark
+    key_columns : list
+        The columns that identify a row, defaults to every column
+
+    Returns
+    -------
+    pandas.DataFrame
+        The rows of the increment that are not staged yet
+    """
+    if staged is None or staged.empty or increment.empty:
+        return increment
+
+    columns = list(key_columns or increment.columns)
+    # compared as text, the staged rows went through a Parquet round trip
+    boundary = staged.loc[staged[watermark_column] == watermark, columns]
+    seen = set(boundary.astype(str).itertuples(index=False, name=None))
+    if not seen:
+        return increment
+
+    at_watermark = increment[watermark_column] == watermark
+    candidates = increment.loc[at_watermark, columns].astype(str)
+    duplicated = pd.Series(False, index=increment.index)
+    duplicated[candidates.index] = [row in seen for row in candidates.itertuples(index=False, name=None)]
+    return increment[~duplicated]
@@ -0,0 +1,313 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+import pandas as pd
+
+
+# seconds between the saves of the last access time of a cached result
+ACCESS_SAVE_SECONDS = 60
+
+# age in seconds of the files missing from the index before they are removed as orphans
+ORPHAN_SECONDS = 3600
+
+
+class QueryCache:
+    def __init__(self, cache_path, ttl=3600, max_size=1024**3):
+        """
+        This is the constructor function for an on-disk query result cache that stores dataframes as
+        Parquet files, expires them after a time to live and evicts the least recently used ones when
+        the total size goes over a cap.
+
+        :param cache_path: The folder where the Parquet files and the cache index are stored
+        :param ttl: The default number of seconds a cached result stays valid
+        :param max_size: The maximum total size of the cached files in bytes
+        """
+        self._cache_path = cache_path
+        self._index_file = os.path.join(cache_path, "cache_index.json")
+        self._lock = threading.Lock()
+        self.ttl = ttl
+        self.max_size = max_size
+
+        os.makedirs(cache_path, exist_ok=True)
+        self._index = {}
+        self._index_stamp = None
+        self._index = self._load_index()
+
+    @staticmethod
+    def make_key(sql_text, params, provider, environment):
+        """
+        This function builds the cache key of a query from its resolved SQL text, parameters, provider
+        and environment.
+
+        :param sql_text: The resolved SQL text of the query
+        :param params: The parameters used to run the query
+        :param provider: The database provider the query runs against
+        :param environment: The database environment the query runs against
+        :return: a hex digest that identifies the query result.
+        """
+        payload = json.dumps(
+            {
+                "sql": sql_text,
+                "params": params,
+                "provider": provider,
+                "environment": environment,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf8")).hexdigest()
+
+    def get(self, key):
+        """
+        This function returns the cached dataframe for a key, or None when it is missing or expired.
+
+        :param key: The cache key built with `make_key`
+        :return: a pandas DataFrame or None.
+        """
+        with self._lock:
+            self._refresh()
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+
+            now = time.time()
+            if now - entry["created"] > entry["ttl"]:
+                with self._shared_index() as index:
+                    self._remove(index, key)
+                return None
+
+            entry["last_access"] = now
+            if now - self._saved_access.get(key, 0) > ACCESS_SAVE_SECONDS:
+                # the access time only orders evictions, it is saved at most once a minute per entry
+                with self._shared_index():
+                    pass
+
+        try:
+            return pd.read_parquet(self._file_path(key))
+        except (OSError, ValueError):
+            # missing or unreadable file
+            with self._lock:
+                with self._shared_index() as index:
+                    self._remove(index, key)
+            return None
+
+    def put(self, key, df, ttl=None, query=None):
+        """
+        This function stores a dataframe in the cache and evicts the least recently used results until
+        the cache fits in its size cap.
+
+        :param key: The cache key built with `make_key`
+        :param df: The dataframe to be cached
+        :param ttl: The number of seconds the result stays valid, defaults to the cache ttl
+        :param query: The query name, used to invalidate all the results of a query
+        """
+        file_path = self._file_path(key)
+        temp_path = file_path + f".{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            df.to_parquet(temp_path, index=False)
+        except Exception as e:
+            # duplicate column names or mixed type columns can't be stored, the result isn't cached
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            print(f"The query result was not cached: {e}")
+            return
+        size = os.path.getsize(temp_path)
+
+        if size > self.max_size:
+            os.remove(temp_path)
+            return
+
+        with self._lock:
+            with self._shared_index() as index:
+                os.replace(temp_path, file_path)
+                now = time.time()
+                index[key] = {
+                    "query": query,
+                    "created": now,
+                    "last_access": now,
+                    "ttl": self.ttl if ttl is None else ttl,
+                    "size": size,
+                }
+                self._evict(index)
+
+    def invalidate(self, query=None, key=None):
+        """
+        This function removes cached results. Without arguments the whole cache is cleared.
+
+        :param query: Remove every cached result of this query name
+        :param key: Remove the cached result with this key
+        :return: the number of removed results.
+        """
+        with self._lock:
+            with self._shared_index() as index:
+                if key is not None:
+                    keys = [key] if key in index else []
+                elif query is not None:
+                    keys = [k for k, entry in index.items() if entry["query"] == query]
+                else:
+                    keys = list(index)
+
+                for k in keys:
+                    self._remove(index, k)
+
+        return len(keys)
+
+    def stats(self):
+        """
+        This function returns the number of cached results and their total size in bytes.
+        :return: a dictionary with the entries and size of the cache.
+        """
+        with self._lock:
+            self._refresh()
+            return {
+                "entries": len(self._index),
+                "size": sum(entry["size"] for entry in self._index.values()),
+                "max_size": self.max_size,
+            }
+
+    def _file_path(self, key):
+        return os.path.join(self._cache_path, f"{key}.parquet")
+
+    def _remove(self, index, key):
+        index.pop(key, None)
+        try:
+            os.remove(self._file_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, index):
+        total_size = sum(entry["size"] for entry in index.values())
+        for key in sorted(index, key=lambda k: index[k]["last_access"]):
+            if total_size <= self.max_size:
+                break
+            total_size -= index[key]["size"]
+            self._remove(index, key)
+
+    def _read_index(self):
+        try:
+            self._index_stamp = _stamp(self._index_file)
+            with open(self._index_file) as get:
+                return json.load(get)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _refresh(self):
+        # other processes share the folder, read their changes when the index file changed
+        if _stamp(self._index_file) != self._index_stamp:
+            self._index = self._merge_access(self._read_index())
+
+    def _merge_access(self, index):
+        # access times that were not saved yet are kept
+        for key, entry in index.items():
+            if key in self._index:
+                entry["last_access"] = max(entry["last_access"], self._index[key]["last_access"])
+        return index
+
+    @contextmanager
+    def _shared_index(self):
+        # changes are made on the index on disk under a file lock, so no process writes over the
+        # entries of another one
+        with _file_lock(self._index_file + ".lock"):
+            index = self._merge_access(self._read_index())
+            yield index
+            temp_index = self._index_file + f".{os.getpid()}.tmp"
+            with open(temp_index, "w") as put:
+                json.dump(index, put)
+            os.replace(temp_index, self._index_file)
+            self._index_stamp = _stamp(self._index_file)
+            self._index = index
+            self._saved_access = {key: entry["last_access"] for key, entry in index.items()}
+
+    def _load_index(self):
+        with _file_lock(self._index_file + ".lock"):
+            index = self._read_index()
+            index = {k: v for k, v in index.items() if os.path.exists(self._file_path(k))}
+
+            # results missing from the index count against no size cap, remove them unless another
+            # process is still writing them
+            cutoff = time.time() - ORPHAN_SECONDS
+            for file_name in os.listdir(self._cache_path):
+                file_path = os.path.join(self._cache_path, file_name)
+                key, extension = os.path.splitext(file_name)
+                orphan = extension == ".tmp" or (extension == ".parquet" and key not in index)
+                if orphan and os.path.getmtime(file_path) < cutoff:
+                    os.remove(file_path)
+        self._saved_access = {key: entry["last_access"] for key, entry in index.items()}
+        return index
+
+
+def _stamp(path):
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except FileNotFoundError:
+        return None
+
+
+@contextmanager
+def _file_lock(lock_path):
+    """
+    Holds an exclusive lock on a file, shared by the processes of the machine
+    """
+    with open(lock_path, "a+b") as lock_file:
+        if os.name == "nt":
+            import msvcrt
+
+            while True:
+                try:
+                    lock_file.seek(0)
+                    # retries for 10 seconds before it raises
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+_shared_caches = {}
+_shared_lock = threading.Lock()
+
+
+def shared_query_cache(cache_path, ttl=3600, max_size=1024**3):
+    """
+    Returns the query cache of a folder, every caller in the process shares one instance per folder
+    so they share its index and its size cap
+
+    Parameters
+    ----------
+    cache_path : str
+        The folder where the Parquet files and the cache index are stored
+    ttl : int
+        The default number of seconds a cached result stays valid
+    max_size : int
+        The maximum total size of the cached files in bytes
+
+    Returns
+    -------
+    QueryCache
+        The cache of the folder, with the ttl and max_size of the last call
+    """
+    folder = os.path.abspath(cache_path)
+    with _shared_lock:
+        cache = _shared_caches.get(folder)
+        if cache is None:
+            cache = _shared_caches[folder] = QueryCache(cache_path, ttl=ttl, max_size=max_size)
+        else:
+            cache.ttl = ttl
+            cache.max_size = max_size
+    return cache
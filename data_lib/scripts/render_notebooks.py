@@ -0,0 +1,61 @@
+import os
+import sys
+import getopt
+from data_lib.datalibutils import notebooks_to_html
+
+
+def get_args(argv):
+    """
+    It takes the command line arguments and returns the render settings
+
+    :param argv: This is the list of command-line arguments
+    :return: The notebook folder, the HTML folder, the number of workers and the force flag
+    """
+    notebook_dir = os.path.join(os.getcwd(), "01_notebooks")
+    html_dir = None
+    workers = None
+    force = False
+    arg_help = "{0} -i <notebook folder> -o <html folder> -w <workers> -f".format(argv[0])
+
+    try:
+        opts, args = getopt.getopt(
+            argv[1:], "hi:o:w:f", ["help", "input=", "output=", "workers=", "force"]
+        )
+    except getopt.GetoptError:
+        print(arg_help)
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt in ("-h", "--help"):
+            print(arg_help)  # print the help message
+            sys.exit(2)
+        elif opt in ("-i", "--input"):
+            notebook_dir = arg
+        elif opt in ("-o", "--output"):
+            html_dir = arg
+        elif opt in ("-w", "--workers"):
+            workers = int(arg)
+        elif opt in ("-f", "--force"):
+            force = True
+
+    # the HTML files are written next to the notebooks by default
+    return notebook_dir, html_dir or notebook_dir, workers, force
+
+
+def main():
+    """
+    It converts the notebooks of a folder to HTML in parallel, skipping the ones that didn't change
+    """
+    notebook_dir, html_dir, workers, force = get_args(sys.argv)
+    report = notebooks_to_html(notebook_dir, html_dir, max_workers=workers, force=force)
+
+    print(
+        f"{len(report['rendered'])} rendered, {len(report['skipped'])} unchanged, "
+        f"{len(report['failed'])} failed"
+    )
+    if report["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def share_frame(df):
+    """
+    Returns a copy of a shared dataframe that callers can modify without changing it
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        The shared dataframe
+
+    Returns
+    -------
+    pandas.DataFrame
+        A shallow copy when pandas copy-on-write is enabled, otherwise a deep copy
+    """
+    if pd.options.mode.copy_on_write is True:
+        # the data is only copied when one of the frames is modified
+        return df.copy(deep=False)
+    return df.copy()
+
+
+class SingleFlight:
+    def __init__(self, max_size=256 * 1024**2, ttl=60):
+        """
+        This is the constructor function for an in-process single-flight layer: concurrent calls with
+        the same key wait on one in-flight execution and share its result, and recent results are
+        kept in memory in a least recently used cache with a byte budget.
+
+        :param max_size: The maximum total memory of the kept results in bytes, 0 only shares
+        in-flight executions
+        :param ttl: The number of seconds a result is kept, 0 only shares in-flight executions
+        """
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._results = OrderedDict()
+        self._size = 0
+        self._stats = {"executions": 0, "shared": 0, "hits": 0}
+        self.max_size = max_size
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(sql_text, params, engine):
+        """
+        This function builds the key of a query from its resolved SQL text, parameters and engine.
+
+        :param sql_text: The resolved SQL text of the query
+        :param params: The parameters used to run the query
+        :param engine: The SQLAlchemy engine the query runs against
+        :return: a hex digest that identifies the query result.
+        """
+        payload = json.dumps(
+            # the rendered URL hides the password
+            {"sql": sql_text, "params": params, "engine": repr(engine.url)},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf8")).hexdigest()
+
+    def do(self, key, function):
+        """
+        This function returns the result of a key: a kept result when there is one, the result of
+        the in-flight execution of the key when another caller is running it, or else the result of
+        running the function. Every caller gets its own copy of the shared dataframe.
+
+        :param key: The key built with `make_key`
+        :param function: A function without arguments that returns a pandas DataFrame
+        :return: a pandas DataFrame.
+        """
+        with self._lock:
+            df = self._get(key)
+            if df is not None:
+                self._stats["hits"] += 1
+                return share_frame(df)
+
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats["executions"] += 1
+            else:
+                self._stats["shared"] += 1
+
+        if leader:
+            size = None
+            try:
+                call.result = function()
+                # measuring the strings of a large result is slow, keep it out of the lock
+                size = self._size_of(call.result)
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                    if call.error is None and size is not None:
+                        self._put(key, call.result, size)
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return share_frame(call.result)
+
+    def clear(self):
+        """
+        This function removes the kept results.
+        """
+        with self._lock:
+            self._results.clear()
+            self._size = 0
+
+    def stats(self):
+        """
+        This function returns the usage of the single-flight layer.
+        :return: a dictionary with the number of executions, shared in-flight results, kept result
+        hits, kept results and their size in bytes.
+        """
+        with self._lock:
+            return {**self._stats, "results": len(self._results), "size": self._size}
+
+    def _get(self, key):
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        df, size, expires_at = entry
+        if expires_at < time.time():
+            del self._results[key]
+            self._size -= size
+            return None
+        self._results.move_to_end(key)
+        return df
+
+    def _size_of(self, df):
+        if not self.ttl or not isinstance(df, pd.DataFrame):
+            return None
+        return int(df.memory_usage(deep=True).sum())
+
+    def _put(self, key, df, size):
+        if size > self.max_size:
+            return
+
+        previous = self._results.pop(key, None)
+        if previous is not None:
+            self._size -= previous[1]
+        self._results[key] = (df, size, time.time() + self.ttl)
+        self._size += size
+
+        while self._size > self.max_size:
+            _, (_, evicted_size, _) = self._results.popitem(last=False)
+            self._size -= evicted_size
+
+
+single_flight = SingleFlight()
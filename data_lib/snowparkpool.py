@@ -0,0 +1,328 @@
+import atexit
+import itertools
+import threading
+import pandas as pd
+from .sqltemplate import sql_templates
+
+
+class SnowparkSessionPool:
+    def __init__(self):
+        """
+        This is the constructor function for a process wide pool that hands out one session per
+        (account, user, role), so interactive logins such as `externalbrowser` only happen once per
+        process.
+        """
+        self._sessions = {}
+        self._lock = threading.Lock()
+        # one lock per key, a login only blocks the callers of its own target
+        self._key_locks = {}
+
+    def get(self, key, session_factory):
+        """
+        This function returns the session of a key, creating it on the first request.
+
+        :param key: The session target, an (account, user, role) tuple
+        :param session_factory: A function that returns a new session, only called when the session
+        does not exist yet
+        :return: a Snowpark session, or a LocalSession.
+        """
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None:
+                return session
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                session = self._sessions.get(key)
+            if session is None:
+                session = session_factory()
+                with self._lock:
+                    self._sessions[key] = session
+        return session
+
+    def close(self, key):
+        """
+        This function closes the session of a key and removes it from the pool.
+
+        :param key: The session target, an (account, user, role) tuple
+        """
+        with self._lock:
+            session = self._sessions.pop(key, None)
+        if session is not None:
+            session.close()
+
+    def shutdown(self):
+        """
+        This function closes every session of the pool.
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            try:
+                session.close()
+            except Exception as e:
+                print(f"Closing the Snowpark session failed: {e}")
+
+    def keys(self):
+        """
+        This function returns the targets of the open sessions.
+        :return: a list of (account, user, role) tuples.
+        """
+        with self._lock:
+            return list(self._sessions)
+
+
+snowpark_sessions = SnowparkSessionPool()
+atexit.register(snowpark_sessions.shutdown)
+
+
+# dialects that limit the rows with SELECT TOP n instead of a LIMIT clause
+TOP_DIALECTS = ("mssql", "teradata", "teradatasql")
+
+# SQL keyword of each join type of the Snowpark API
+JOIN_TYPES = {
+    "inner": "INNER",
+    "left": "LEFT",
+    "right": "RIGHT",
+    "outer": "FULL",
+    "full": "FULL",
+}
+
+
+def _names(columns):
+    # accepts columns as separate arguments or as a single list, like Snowpark
+    if len(columns) == 1 and isinstance(columns[0], list):
+        return list(columns[0])
+    return list(columns)
+
+
+class LocalSession:
+    def __init__(self, engine):
+        """
+        This is the constructor function for a stand-in of the Snowpark session over a SQLAlchemy
+        engine. Its dataframes support the filter, select, join, group_by, sort and limit steps of the
+        Snowpark API and run them as one SQL query in the database, so pushdown pipelines run and can
+        be tested on any provider.
+
+        :param engine: The SQLAlchemy engine
+        """
+        self._engine = engine
+        self._aliases = itertools.count()
+
+    def sql(self, query, params=None):
+        """
+        This function returns a lazy dataframe of a SQL query.
+
+        :param query: The SQL text
+        :param params: A dictionary of bind parameters, written as `:name` in the SQL text
+        :return: a LocalDataFrame.
+        """
+        return LocalDataFrame(self, query.strip().rstrip(";"), params)
+
+    def table(self, name):
+        """
+        This function returns a lazy dataframe of a table.
+
+        :param name: The table name
+        :return: a LocalDataFrame.
+        """
+        return LocalDataFrame(self, f"SELECT * FROM {name}")
+
+    def close(self):
+        # the engine and its connections belong to the engine registry
+        pass
+
+    def _alias(self):
+        return f"t{next(self._aliases)}"
+
+
+class LocalDataFrame:
+    def __init__(self, session, sql_text, params=None, order=None, limit=None):
+        """
+        This is the constructor function for a lazy dataframe of a LocalSession. Every step wraps the
+        SQL query in a new one and `to_pandas` runs it. The sort and limit steps are kept aside and
+        written in the outermost query, in the syntax of the engine dialect.
+
+        :param session: The LocalSession
+        :param sql_text: The SQL query of the dataframe
+        :param params: A dictionary of bind parameters, written as `:name` in the SQL text
+        :param order: The ORDER BY expressions of the sort step
+        :param limit: The maximum number of rows of the limit step
+        """
+        self._session = session
+        self._sql = sql_text
+        self._params = params or {}
+        self._order = order
+        self._limit = limit
+
+    @property
+    def queries(self):
+        return {"queries": [self._render()]}
+
+    def _render(self, keep_order=True):
+        # ORDER BY without a row limit means nothing in a derived table, and mssql rejects it
+        order = self._order if keep_order or self._limit is not None else None
+        if order is None and self._limit is None:
+            return self._sql
+
+        alias = self._session._alias()
+        order_by = f" ORDER BY {order}" if order else ""
+        if self._limit is None:
+            return f"SELECT * FROM ({self._sql}) AS {alias}{order_by}"
+        if self._session._engine.dialect.name in TOP_DIALECTS:
+            return f"SELECT TOP {self._limit} * FROM ({self._sql}) AS {alias}{order_by}"
+        return f"SELECT * FROM ({self._sql}) AS {alias}{order_by} LIMIT {self._limit}"
+
+    def _wrap(self, template, params=None):
+        source = f"({self._render(keep_order=False)}) AS {self._session._alias()}"
+        sql_text = template.replace("{source}", source, 1)
+        return LocalDataFrame(self._session, sql_text, {**self._params, **(params or {})})
+
+    def filter(self, condition):
+        return self._wrap(f"SELECT * FROM {{source}} WHERE {condition}")
+
+    where = filter
+
+    def select(self, *columns):
+        return self._wrap(f"SELECT {', '.join(_names(columns))} FROM {{source}}")
+
+    def join(self, right, on, how="inner"):
+        if how not in JOIN_TYPES:
+            raise ValueError(
+                f"Unsupported join: {how}. Supported joins: {', '.join(JOIN_TYPES)}."
+            )
+        on = [on] if isinstance(on, str) else list(on)
+        right_alias = self._session._alias()
+        return self._wrap(
+            f"SELECT * FROM {{source}} {JOIN_TYPES[how]} JOIN ({right._render(keep_order=False)}) AS {right_alias} "
+            f"USING ({', '.join(on)})",
+            right._params,
+        )
+
+    def group_by(self, *columns):
+        return LocalGroupBy(self, _names(columns))
+
+    def agg(self, *expressions):
+        return LocalGroupBy(self, []).agg(*expressions)
+
+    def sort(self, *columns, ascending=True):
+        direction = "ASC" if ascending else "DESC"
+        order = ", ".join(f"{column} {direction}" for column in _names(columns))
+        # sorting a limited frame sorts its rows, the limit stays in the subquery
+        frame = self if self._limit is None else self._wrap("SELECT * FROM {source}")
+        return LocalDataFrame(frame._session, frame._sql, frame._params, order, None)
+
+    def limit(self, n):
+        limit = int(n) if self._limit is None else min(self._limit, int(n))
+        return LocalDataFrame(self._session, self._sql, self._params, self._order, limit)
+
+    def count(self):
+        return int(self._wrap("SELECT COUNT(*) AS N FROM {source}").to_pandas().iloc[0, 0])
+
+    def to_pandas(self):
+        sql_text = self._render()
+        statement = sql_text if not self._params else sql_templates.statement(sql_text)
+        with self._session._engine.connect() as connection:
+            return pd.read_sql_query(statement, connection, params=self._params or None)
+
+
+class LocalGroupBy:
+    def __init__(self, frame, columns):
+        self._frame = frame
+        self._columns = columns
+
+    def agg(self, *expressions):
+        """
+        This function aggregates the groups with SQL expressions such as "SUM(UNITS) AS UNITS", or
+        (column, function) tuples like Snowpark.
+        """
+        selected = list(self._columns)
+        for expression in _names(expressions):
+            if isinstance(expression, tuple):
+                column, function = expression
+                expression = f"{function.upper()}({column})"
+            selected.append(expression)
+
+        group_by = f" GROUP BY {', '.join(self._columns)}" if self._columns else ""
+        return self._frame._wrap(f"SELECT {', '.join(selected)} FROM {{source}}{group_by}")
+
+
+def aggregate_expressions(frame, aggregations):
+    """
+    Builds the aggregate expressions of a Snowpark or local dataframe
+
+    Parameters
+    ----------
+    frame : snowflake.snowpark.DataFrame or LocalDataFrame
+        The aggregated dataframe
+    aggregations : dict
+        The output columns and their (column, function) pairs, such as {"TOTAL_UNITS": ("UNITS", "sum")}
+
+    Returns
+    -------
+    list
+        The aliased aggregate expressions
+    """
+    if isinstance(frame, LocalDataFrame):
+        return [
+            f"{function.upper()}({column}) AS {alias}"
+            for alias, (column, function) in aggregations.items()
+        ]
+
+    from snowflake.snowpark.functions import col, function as builtin
+
+    return [
+        builtin(function)(col(column)).alias(alias)
+        for alias, (column, function) in aggregations.items()
+    ]
+
+
+def apply_pushdown(
+    frame, joins=None, filters=None, group_by=None, aggregations=None, columns=None, order_by=None,
+    limit=None,
+):
+    """
+    Applies join, filter, aggregate, select, sort and limit steps to a Snowpark or local dataframe, in
+    that order. Nothing runs until the result is collected
+
+    Parameters
+    ----------
+    frame : snowflake.snowpark.DataFrame or LocalDataFrame
+        The source dataframe
+    joins : list
+        (dataframe, on, how) tuples, on is a column name or a list of them
+    filters : list
+        SQL conditions that must all match, such as ["UNITS > 0", "REGION = 'EU'"]
+    group_by : list
+        The grouping columns of the aggregations
+    aggregations : dict
+        The output columns and their (column, function) pairs, such as {"TOTAL_UNITS": ("UNITS", "sum")}
+    columns : list
+        The output columns
+    order_by : list
+        The sort columns
+    limit : int
+        The maximum number of rows
+
+    Returns
+    -------
+    snowflake.snowpark.DataFrame or LocalDataFrame
+        The transformed dataframe
+    """
+    for right, on, how in joins or []:
+        frame = frame.join(right, on=on, how=how)
+    for condition in filters or []:
+        frame = frame.filter(condition)
+    if aggregations:
+        frame = frame.group_by(list(group_by or [])).agg(aggregate_expressions(frame, aggregations))
+    elif group_by:
+        raise ValueError("group_by needs the aggregations of the groups.")
+    if columns:
+        frame = frame.select(list(columns))
+    if order_by:
+        frame = frame.sort(list(order_by))
+    if limit is not None:
+        frame = frame.limit(limit)
+    return frame
@@ -0,0 +1,277 @@
+import os
+import glob
+import uuid
+import shutil
+import weakref
+import pandas as pd
+from .stagestore import filters_expression
+
+
+# partial aggregations of each supported function, and how the partials are combined
+PARTIAL_AGGREGATIONS = {
+    "sum": [("sum", "sum")],
+    "count": [("count", "sum")],
+    "min": [("min", "min")],
+    "max": [("max", "max")],
+    "mean": [("sum", "sum"), ("count", "sum")],
+}
+
+# number of partial aggregations combined at once, bounds the memory of high cardinality groups
+PARTIALS_PER_REDUCE = 16
+
+
+def spill_chunks(chunks, spill_path):
+    """
+    Writes dataframe chunks to a temporary folder of Parquet files, one file per chunk
+
+    Parameters
+    ----------
+    chunks : iterable
+        The pandas DataFrames to be spilled
+    spill_path : str
+        The folder where the spilled results are stored, each result gets its own subfolder
+
+    Returns
+    -------
+    SpilledResult
+        A lazy handle of the spilled rows
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    result_path = os.path.join(spill_path, uuid.uuid4().hex)
+    os.makedirs(result_path)
+    rows = 0
+    try:
+        for part, chunk in enumerate(chunks):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            pq.write_table(table, os.path.join(result_path, f"part-{part:06d}.parquet"))
+            rows += table.num_rows
+    except BaseException:
+        shutil.rmtree(result_path, ignore_errors=True)
+        raise
+
+    return SpilledResult(result_path, rows)
+
+
+def _aggregate_table(table, keys, steps):
+    import pyarrow.compute as pc
+
+    # steps are (source column, function, output column) tuples, the sum of a group of nulls is 0
+    # like in pandas
+    aggregated = table.group_by(keys).aggregate(
+        [
+            (source, function, pc.ScalarAggregateOptions(min_count=0)) if function == "sum"
+            else (source, function)
+            for source, function, _ in steps
+        ]
+    )
+    names = {f"{source}_{function}": output for source, function, output in steps}
+    return aggregated.rename_columns([names.get(name, name) for name in aggregated.column_names])
+
+
+class SpilledResult:
+    def __init__(self, result_path, rows=None, columns=None, filter=None, owner=None):
+        """
+        This is the constructor function for the lazy handle of a result spilled to Parquet files.
+        Column selections and filters return new handles over the same files, and the data is only
+        read by `head`, `aggregate`, `iter_batches` and `to_pandas`. The files are deleted by `close`,
+        on exit of a `with` block or when the handle is garbage collected.
+
+        :param result_path: The folder of the Parquet files
+        :param rows: The number of spilled rows
+        :param columns: The selected columns, every column if None
+        :param filter: The pyarrow expression of the filters
+        :param owner: The handle that owns the files, a selection keeps it alive
+        """
+        self._result_path = result_path
+        self._spilled_rows = rows
+        self._columns = columns
+        self._filter = filter
+        self._owner = owner
+        self._dataset = None
+        if owner is None:
+            self._finalizer = weakref.finalize(self, shutil.rmtree, result_path, True)
+
+    @property
+    def path(self):
+        return self._result_path
+
+    @property
+    def columns(self):
+        return self._columns or self.dataset().schema.names
+
+    def __len__(self):
+        if self._filter is None and self._spilled_rows is not None:
+            return self._spilled_rows
+        return self.dataset().count_rows(filter=self._filter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __repr__(self):
+        return (
+            f"SpilledResult(path={self._result_path!r}, columns={self._columns}, "
+            f"filter={self._filter})"
+        )
+
+    def dataset(self):
+        """
+        This function returns the pyarrow dataset of the spilled files, the column types of the
+        chunks are unified so columns that were empty in some chunks are read with one type.
+
+        :return: a pyarrow Dataset.
+        """
+        if self._owner is not None:
+            return self._owner.dataset()
+        if self._dataset is None:
+            import pyarrow as pa
+            import pyarrow.dataset as ds
+            import pyarrow.parquet as pq
+
+            if not os.path.exists(self._result_path):
+                raise ValueError("The spilled result is closed.")
+            files = sorted(glob.glob(os.path.join(self._result_path, "*.parquet")))
+            schemas = [pq.read_schema(file) for file in files] or [pa.schema([])]
+            try:
+                # int chunks next to float chunks are read as float
+                schema = pa.unify_schemas(schemas, promote_options="permissive")
+            except TypeError:
+                schema = pa.unify_schemas(schemas)
+            self._dataset = ds.dataset(files, schema=schema, format="parquet")
+        return self._dataset
+
+    def select(self, columns):
+        """
+        This function returns a handle of some columns of the spilled result.
+
+        :param columns: The selected columns
+        :return: a SpilledResult.
+        """
+        return SpilledResult(
+            self._result_path, self._spilled_rows, list(columns), self._filter, self._owner or self
+        )
+
+    def filter(self, filters):
+        """
+        This function returns a handle of the rows of the spilled result that match the filters.
+
+        :param filters: A pyarrow expression, or a list of (column, operator, value) tuples that must
+        all match, such as [("REGION", "=", "EU"), ("UNITS", ">", 0)]
+        :return: a SpilledResult.
+        """
+        expression = filters_expression(filters)
+        if self._filter is not None:
+            expression = self._filter & expression
+        return SpilledResult(
+            self._result_path, self._spilled_rows, self._columns, expression, self._owner or self
+        )
+
+    def head(self, n=5):
+        """
+        This function reads the first rows of the spilled result.
+
+        :param n: The number of rows
+        :return: a pandas DataFrame.
+        """
+        return self.dataset().head(n, columns=self._columns, filter=self._filter).to_pandas()
+
+    def iter_batches(self, batch_size=50000):
+        """
+        This function reads the spilled result in chunks, so it can be processed with constant memory.
+
+        :param batch_size: The maximum number of rows of each chunk
+        :return: a generator of pandas DataFrames.
+        """
+        for batch in self.dataset().to_batches(
+            columns=self._columns, filter=self._filter, batch_size=batch_size
+        ):
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+    def to_pandas(self):
+        """
+        This function reads the whole spilled result, only use it once it fits in memory.
+
+        :return: a pandas DataFrame.
+        """
+        return self.dataset().to_table(columns=self._columns, filter=self._filter).to_pandas()
+
+    def aggregate(self, aggregations, group_by=None, batch_size=1000000):
+        """
+        This function aggregates the spilled result one chunk at a time, combining the partial
+        aggregations of the chunks, so only the groups are held in memory.
+
+        :param aggregations: The output columns and their (column, function) pairs, such as
+        {"TOTAL_UNITS": ("UNITS", "sum")}. Supported functions: sum, count, min, max, mean. Like in
+        pandas the sum of a group without values is 0 and its mean is NaN
+        :param group_by: The grouping columns, the whole result is one group if None
+        :param batch_size: The number of rows aggregated at once
+        :return: a pandas DataFrame with a row per group.
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        for column, function in aggregations.values():
+            if function not in PARTIAL_AGGREGATIONS:
+                raise ValueError(
+                    f"Unsupported aggregation: {function}. Supported aggregations: "
+                    f"{', '.join(PARTIAL_AGGREGATIONS)}."
+                )
+
+        keys = list(group_by or [])
+        if not keys:
+            # a constant key aggregates the whole result as one group
+            keys = ["__all__"]
+
+        partials = {
+            (column, partial): combine
+            for column, function in aggregations.values()
+            for partial, combine in PARTIAL_AGGREGATIONS[function]
+        }
+        read_columns = [key for key in keys if key != "__all__"]
+        read_columns += sorted({column for column, _ in partials} - set(read_columns))
+        # (source column, function, output column) of the chunk and the combining aggregations
+        chunk_steps = [(column, partial, f"{column}__{partial}") for column, partial in partials]
+        combine_steps = [
+            (f"{column}__{partial}", combine, f"{column}__{partial}")
+            for (column, partial), combine in partials.items()
+        ]
+
+        combined = []
+        for batch in self.dataset().to_batches(
+            columns=read_columns, filter=self._filter, batch_size=batch_size
+        ):
+            if not batch.num_rows:
+                continue
+            table = pa.Table.from_batches([batch])
+            if keys == ["__all__"]:
+                table = table.append_column("__all__", pa.repeat(0, table.num_rows))
+            combined.append(_aggregate_table(table, keys, chunk_steps))
+            if len(combined) >= PARTIALS_PER_REDUCE:
+                combined = [_aggregate_table(pa.concat_tables(combined), keys, combine_steps)]
+
+        if not combined:
+            return pd.DataFrame(columns=list(group_by or []) + list(aggregations))
+        groups = _aggregate_table(pa.concat_tables(combined), keys, combine_steps)
+
+        out = {key: groups[key] for key in keys if key != "__all__"}
+        for alias, (column, function) in aggregations.items():
+            if function == "mean":
+                out[alias] = pc.divide(
+                    pc.cast(groups[f"{column}__sum"], pa.float64()), groups[f"{column}__count"]
+                )
+            else:
+                out[alias] = groups[f"{column}__{function}"]
+        return pa.table(out).to_pandas()
+
+    def close(self):
+        """
+        This function deletes the spilled files, selections of the result can't be read after it.
+        """
+        owner = self._owner or self
+        owner._dataset = None
+        owner._finalizer()
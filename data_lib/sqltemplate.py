@@ -0,0 +1,74 @@
+import os
+import threading
+from collections import OrderedDict
+from sqlalchemy import text
+
+
+class SQLTemplateCache:
+    def __init__(self, max_statements=256):
+        """
+        This is the constructor function for an in-memory cache of `.sql` files, invalidated by their
+        modification time, and of the `sqlalchemy.text` statements built from them, so repeated
+        parameterized queries skip the file IO and reuse SQLAlchemy's compiled statement cache.
+
+        :param max_statements: The maximum number of statements kept, the least recently used ones are
+        dropped above it
+        """
+        self._templates = {}
+        self._statements = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_statements = max_statements
+
+    def read(self, file_path):
+        """
+        This function returns the text of a `.sql` file, reading it again only when it changed.
+
+        :param file_path: The path of the `.sql` file
+        :return: the SQL text, or None when the file does not exist.
+        """
+        try:
+            mtime = os.stat(file_path).st_mtime_ns
+        except (OSError, ValueError):
+            # missing file, or raw SQL text that isn't a valid path
+            return None
+
+        with self._lock:
+            template = self._templates.get(file_path)
+        if template is not None and template[0] == mtime:
+            return template[1]
+
+        with open(file_path) as get:
+            sql_text = get.read()
+        with self._lock:
+            self._templates[file_path] = (mtime, sql_text)
+        return sql_text
+
+    def statement(self, sql_text):
+        """
+        This function returns the `sqlalchemy.text` statement of a SQL text, with its parameters as
+        bind parameters written as `:name`.
+
+        :param sql_text: The SQL text
+        :return: a SQLAlchemy TextClause.
+        """
+        with self._lock:
+            statement = self._statements.get(sql_text)
+            if statement is None:
+                statement = text(sql_text)
+                self._statements[sql_text] = statement
+                if len(self._statements) > self.max_statements:
+                    self._statements.popitem(last=False)
+            else:
+                self._statements.move_to_end(sql_text)
+        return statement
+
+    def clear(self):
+        """
+        This function empties the cache.
+        """
+        with self._lock:
+            self._templates.clear()
+            self._statements.clear()
+
+
+sql_templates = SQLTemplateCache()
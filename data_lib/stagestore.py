@@ -0,0 +1,152 @@
+import os
+import json
+import uuid
+import shutil
+
+# file of each staged dataset with its full schema, partition columns included
+SCHEMA_FILE = "_common_metadata"
+
+
+class StageStore:
+    def __init__(self, stage_path):
+        """
+        This is the constructor function for the store of staged datasets, every dataset is a folder of
+        Parquet files in the stage folder, optionally partitioned by columns in hive style folders.
+
+        :param stage_path: The stage folder
+        """
+        self._stage_path = stage_path
+
+    def write(self, df, name, partition_by=None, mode="overwrite", row_group_size=None):
+        """
+        This function writes a dataframe to a staged dataset.
+
+        :param df: The data to be staged
+        :param name: The dataset name
+        :param partition_by: The columns whose values split the dataset in folders, such as
+        ["YEAR", "REGION"]
+        :param mode: "overwrite" replaces the dataset, "overwrite_partitions" only replaces the
+        partitions that are in df and "append" adds the rows to the dataset
+        :param row_group_size: The maximum number of rows of a Parquet row group, smaller groups let
+        reads skip more data with filters
+        """
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+
+        behaviors = {
+            "overwrite": "delete_matching",
+            "overwrite_partitions": "delete_matching",
+            "append": "overwrite_or_ignore",
+        }
+        if mode not in behaviors:
+            raise ValueError(
+                f"Unsupported mode: {mode}. Supported modes: {', '.join(behaviors)}."
+            )
+
+        dataset_path = self._path(name)
+        if mode == "overwrite" and os.path.exists(dataset_path):
+            shutil.rmtree(dataset_path)
+
+        write_options = {}
+        if row_group_size is not None:
+            write_options["max_rows_per_group"] = row_group_size
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        ds.write_dataset(
+            table,
+            dataset_path,
+            format="parquet",
+            partitioning=partition_by,
+            partitioning_flavor="hive" if partition_by else None,
+            # unique file names so appends never overwrite existing files
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior=behaviors[mode],
+            **write_options,
+        )
+
+        # the partition columns are only in the folder names, keep their types and position
+        schema = table.schema.with_metadata(
+            {
+                **(table.schema.metadata or {}),
+                b"data_lib_partition_by": json.dumps(list(partition_by or [])).encode("utf8"),
+            }
+        )
+        pq.write_metadata(schema, os.path.join(dataset_path, SCHEMA_FILE))
+
+    def read(self, name, columns=None, filters=None):
+        """
+        This function reads a staged dataset. Only the requested columns are read, partitions that
+        don't match the filters are skipped and row groups are skipped with their statistics.
+
+        :param name: The dataset name
+        :param columns: The columns to read, defaults to every column
+        :param filters: A pyarrow expression, or a list of (column, operator, value) tuples that must
+        all match, such as [("REGION", "=", "EU"), ("UNITS", ">", 0)]. A list of those lists matches
+        any of them
+        :return: a pandas DataFrame.
+        """
+        return self.dataset(name).to_table(
+            columns=columns, filter=filters_expression(filters)
+        ).to_pandas()
+
+    def dataset(self, name):
+        """
+        This function returns the pyarrow dataset of a staged dataset, for scans in batches.
+
+        :param name: The dataset name
+        :return: a pyarrow Dataset.
+        """
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+
+        dataset_path = self._path(name)
+        if not os.path.exists(dataset_path):
+            raise FileNotFoundError(f"No staged dataset named {name}")
+
+        schema_path = os.path.join(dataset_path, SCHEMA_FILE)
+        if not os.path.exists(schema_path):
+            # datasets staged without a schema file get inferred partition types
+            return ds.dataset(dataset_path, format="parquet", partitioning="hive")
+
+        schema = pq.read_schema(schema_path)
+        partition_by = json.loads((schema.metadata or {}).get(b"data_lib_partition_by", b"[]"))
+        partitioning = ds.partitioning(
+            pa.schema([schema.field(column) for column in partition_by]), flavor="hive"
+        )
+        return ds.dataset(dataset_path, schema=schema, format="parquet", partitioning=partitioning)
+
+    def drop(self, name):
+        """
+        This function deletes a staged dataset.
+
+        :param name: The dataset name
+        """
+        shutil.rmtree(self._path(name), ignore_errors=True)
+
+    def _path(self, name):
+        return os.path.join(self._stage_path, name)
+
+
+def filters_expression(filters):
+    """
+    Converts read filters to a pyarrow expression
+
+    Parameters
+    ----------
+    filters : list or pyarrow.dataset.Expression
+        (column, operator, value) tuples that must all match, a list of those lists that matches any of
+        them, or a pyarrow expression
+
+    Returns
+    -------
+    pyarrow.dataset.Expression
+        The filter expression, None without filters
+    """
+    if filters is None or not isinstance(filters, list):
+        return filters
+
+    import pyarrow.parquet as pq
+
+    return pq.filters_to_expression(filters)
@@ -0,0 +1,328 @@
+import os
+import json
+import math
+import time
+import threading
+import contextvars
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+
+
+class Span:
+    def __init__(self, operation, name=None, provider=None, environment=None, run=None):
+        """
+        This is the constructor function for the trace of one DataGetter operation.
+
+        :param operation: The traced method, such as "run_sql_query" or "export_data"
+        :param name: The query or file name
+        :param provider: The database provider
+        :param environment: The database environment
+        :param run: The name of the report run the operation belongs to
+        """
+        self.operation = operation
+        self.name = name
+        self.provider = provider
+        self.environment = environment
+        self.run = run
+        self.start = time.time()
+        self.duration = None
+        self.phases = {}
+        self.rows = None
+        self.bytes = None
+        self.error = None
+        self._start_counter = time.perf_counter()
+
+    @contextmanager
+    def phase(self, phase):
+        """
+        This function times a phase of the operation, such as connect, execute, fetch or build.
+
+        :param phase: The phase name
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[phase] = self.phases.get(phase, 0.0) + time.perf_counter() - start
+
+    def to_dict(self):
+        """
+        This function returns the span as a JSON serializable dictionary.
+        """
+        return {
+            "operation": self.operation,
+            "name": self.name,
+            "provider": self.provider,
+            "environment": self.environment,
+            "run": self.run,
+            "start": self.start,
+            "duration": self.duration,
+            "phases": self.phases,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "error": self.error,
+        }
+
+
+class Tracer:
+    def __init__(self, deep_memory=False):
+        """
+        This is the constructor function for the process wide tracer. Spans are only measured in full
+        and sent to the sinks while at least one sink is registered.
+
+        :param deep_memory: If True the result size is measured with memory_usage(deep=True), which
+        scans every string value
+        """
+        self._sinks = []
+        # the run name and the sinks of the open scope, each thread or task sees its own scope
+        self._scope = contextvars.ContextVar(f"data_lib_trace_scope_{id(self)}", default=(None, ()))
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.deep_memory = deep_memory
+
+    @property
+    def enabled(self):
+        return bool(self._sinks) or bool(self._scope.get()[1])
+
+    def add_sink(self, sink):
+        """
+        This function registers a sink that receives every finished span of the process.
+
+        :param sink: An object with an `emit(span)` method
+        """
+        with self._lock:
+            self._sinks.append(sink)
+
+    def remove_sink(self, sink):
+        """
+        This function unregisters a sink.
+
+        :param sink: A registered sink
+        """
+        with self._lock:
+            self._sinks.remove(sink)
+
+    @contextmanager
+    def scope(self, run=None, sinks=()):
+        """
+        This function scopes traces to a report run, the sinks receive the spans of the operations
+        that run inside of it and the spans are tagged with the run name. The scope belongs to the
+        current context, concurrent scopes in other threads or tasks don't see each other's spans,
+        and worker threads only join it when they run in a copy of the context.
+
+        :param run: The name of the report run, the run of the enclosing scope if None
+        :param sinks: The sinks that receive the spans of the scope
+        :return: the list of sinks.
+        """
+        sinks = list(sinks)
+        outer_run, outer_sinks = self._scope.get()
+        token = self._scope.set((outer_run if run is None else run, outer_sinks + tuple(sinks)))
+        try:
+            yield sinks
+        finally:
+            self._scope.reset(token)
+            for sink in sinks:
+                if hasattr(sink, "close"):
+                    sink.close()
+
+    @contextmanager
+    def span(self, operation, name=None, provider=None, environment=None):
+        """
+        This function traces an operation and sends its span to the sinks when it finishes.
+
+        :param operation: The traced method, such as "run_sql_query" or "export_data"
+        :param name: The query or file name
+        :param provider: The database provider
+        :param environment: The database environment
+        :return: the Span of the operation.
+        """
+        run, scope_sinks = self._scope.get()
+        span = Span(operation, name, provider, environment, run)
+
+        stack = self._stack()
+        stack.append(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = repr(e)
+            raise
+        finally:
+            stack.pop()
+            span.duration = time.perf_counter() - span._start_counter
+            with self._lock:
+                sinks = list(self._sinks)
+            for sink in sinks + list(scope_sinks):
+                sink.emit(span)
+
+    def phase(self, phase):
+        """
+        This function times a phase of the operation traced in the current thread.
+
+        :param phase: The phase name
+        """
+        stack = self._stack()
+        return stack[-1].phase(phase) if stack else nullcontext()
+
+    def record_result(self, df):
+        """
+        This function records the row count and memory size of a result dataframe on the operation
+        traced in the current thread.
+
+        :param df: The result dataframe
+        """
+        stack = self._stack()
+        if stack and self.enabled:
+            stack[-1].rows = len(df)
+            stack[-1].bytes = int(df.memory_usage(index=True, deep=self.deep_memory).sum())
+
+    def record_rows(self, rows):
+        """
+        This function records the row count of the operation traced in the current thread.
+
+        :param rows: The number of rows
+        """
+        stack = self._stack()
+        if stack:
+            stack[-1].rows = rows
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+
+class JsonLinesSink:
+    def __init__(self, path):
+        """
+        This is the constructor function for a sink that appends every span to a JSON lines file.
+
+        :param path: The path of the log file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf8") as log:
+                log.write(line + "\n")
+
+
+def percentile(values, pct):
+    """
+    This function returns the nearest-rank percentile of a list of values.
+
+    :param values: The values
+    :param pct: The percentile, between 0 and 100
+    :return: the percentile value, or None when there are no values.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class MetricsAggregator:
+    def __init__(self, max_samples=10000):
+        """
+        This is the constructor function for an in-process sink that summarizes the durations of the
+        operations.
+
+        :param max_samples: The number of most recent durations kept per operation and name
+        """
+        self._durations = defaultdict(lambda: deque(maxlen=max_samples))
+        self._counts = defaultdict(int)
+        self._errors = defaultdict(int)
+        self._rows = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def emit(self, span):
+        key = (span.operation, span.name)
+        with self._lock:
+            self._durations[key].append(span.duration)
+            self._counts[key] += 1
+            self._errors[key] += span.error is not None
+            self._rows[key] += span.rows or 0
+
+    def summary(self):
+        """
+        This function returns the count, errors, rows and p50/p95/p99 durations of every operation.
+        :return: a dictionary of (operation, name) keys and their statistics.
+        """
+        with self._lock:
+            keys = list(self._durations)
+            durations = {key: list(self._durations[key]) for key in keys}
+            summary = {
+                key: {
+                    "count": self._counts[key],
+                    "errors": self._errors[key],
+                    "rows": self._rows[key],
+                }
+                for key in keys
+            }
+
+        for key in keys:
+            summary[key].update(
+                {
+                    "p50": percentile(durations[key], 50),
+                    "p95": percentile(durations[key], 95),
+                    "p99": percentile(durations[key], 99),
+                    "max": max(durations[key]),
+                }
+            )
+        return summary
+
+
+class PrometheusTextfileSink:
+    def __init__(self, path, prefix="data_lib"):
+        """
+        This is the constructor function for a sink that keeps Prometheus counters of the operations in
+        a file for the node exporter textfile collector.
+
+        :param path: The path of the `.prom` file
+        :param prefix: The prefix of the metric names
+        """
+        self.path = path
+        self.prefix = prefix
+        self._metrics = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def emit(self, span):
+        labels = (
+            f'operation="{span.operation}",name="{_label(span.name)}",'
+            f'provider="{_label(span.provider)}",environment="{_label(span.environment)}"'
+        )
+        with self._lock:
+            self._metrics[("operation_seconds_count", labels)] += 1
+            self._metrics[("operation_seconds_sum", labels)] += span.duration
+            self._metrics[("operation_rows_total", labels)] += span.rows or 0
+            self._metrics[("operation_errors_total", labels)] += span.error is not None
+            for phase, seconds in span.phases.items():
+                self._metrics[("phase_seconds_total", f'{labels},phase="{phase}"')] += seconds
+            self._write()
+
+    def _write(self):
+        lines = [
+            f"# TYPE {self.prefix}_operation_seconds summary",
+            f"# TYPE {self.prefix}_operation_rows_total counter",
+            f"# TYPE {self.prefix}_operation_errors_total counter",
+            f"# TYPE {self.prefix}_phase_seconds_total counter",
+        ]
+        for (metric, labels), value in sorted(self._metrics.items()):
+            lines.append(f"{self.prefix}_{metric}{{{labels}}} {value}")
+
+        # the collector must never read a half written file
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf8") as prom:
+            prom.write("\n".join(lines) + "\n")
+        os.replace(temp_path, self.path)
+
+
+def _label(value, max_length=200):
+    # raw SQL query names are shortened to keep the label readable
+    text = "" if value is None else str(value)[:max_length]
+    return text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+tracer = Tracer()
@@ -25,6 +25,7 @@ setup(
         "console_scripts": [
             "crnotebook=data_lib.scripts.new_notebook:main",
             "crproject=data_lib.scripts.new_project:main",
+            "crhtml=data_lib.scripts.render_notebooks:main",
         ],
     },
     install_requires=[
@@ -43,6 +44,7 @@ setup(
         "pytest>=7.3.1",
         "black>=23.3.0",
         "pyxlsb>=1.0.10",
+        "pyarrow>=11.0.0",
         "plotly==5.14.1",
         "nbconvert>=7.3.1",
         "snowflake-sqlalchemy>=1.4.7",
@@ -0,0 +1,77 @@
+import os
+import time
+import tarfile
+import threading
+from data_lib import DataGetter, archiver
+from data_lib.archiver import Archiver
+
+
+def archiver_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "data_lib_archiver"]
+
+
+def write(path, text="data"):
+    with open(path, "w") as put:
+        put.write(text)
+
+
+def test_retention_keeps_the_newest_versions(tmp_path):
+    files = Archiver(str(tmp_path / "archive"), keep=2)
+    for version in range(4):
+        write(tmp_path / "report.csv", str(version))
+        files.archive(str(tmp_path / "report.csv"))
+    write(tmp_path / "other.csv")
+    files.archive(str(tmp_path / "other.csv"))
+    files.flush()
+
+    names = sorted(os.listdir(tmp_path / "archive"))
+    assert len([name for name in names if name.startswith("report__")]) == 2
+    assert len([name for name in names if name.startswith("other__")]) == 1
+    assert all(name.endswith(".csv.gz") for name in names)
+
+
+def test_retention_removes_old_versions(tmp_path):
+    files = Archiver(str(tmp_path / "archive"), max_age_days=1)
+    os.makedirs(tmp_path / "archive")
+    old = tmp_path / "archive" / "report__20200101_000000_000000.csv.gz"
+    write(old)
+    os.utime(old, (time.time() - 3 * 86400, time.time() - 3 * 86400))
+
+    write(tmp_path / "report.csv")
+    files.archive(str(tmp_path / "report.csv"))
+    files.flush()
+
+    names = os.listdir(tmp_path / "archive")
+    assert old.name not in names
+    assert len(names) == 1
+
+
+def test_archive_stage_compresses_folders(db, project):
+    db.stage_write(db.run_sql_query("SELECT * FROM sales"), "sales", partition_by=["REGION"])
+
+    archived = db.archive_stage("sales")
+    db.flush_archive()
+
+    assert not os.path.exists(project / "02_data" / "03_stage_files" / "sales")
+    with tarfile.open(archived + ".tar.gz") as tar:
+        assert any(name.endswith(".parquet") for name in tar.getnames())
+
+
+def test_getters_of_a_folder_share_one_idle_worker(project, monkeypatch):
+    monkeypatch.setattr(archiver, "WORKER_IDLE_SECONDS", 0.05)
+    existing = set(archiver_threads())
+    getters = [DataGetter() for _ in range(20)]
+    assert len({id(getter._archiver) for getter in getters}) == 1
+
+    for number, getter in enumerate(getters):
+        write(project / "02_data" / "03_stage_files" / f"part_{number}.csv")
+        getter.archive_stage(f"part_{number}.csv")
+    getters[0].flush_archive()
+    assert len(set(archiver_threads()) - existing) <= 1
+
+    # the worker exits once the queue stays empty
+    deadline = time.time() + 5
+    while set(archiver_threads()) - existing and time.time() < deadline:
+        time.sleep(0.01)
+    assert not set(archiver_threads()) - existing
+    assert getters[0]._archiver._worker is None
@@ -0,0 +1,39 @@
+import pandas as pd
+import pyarrow as pa
+from data_lib.arrowfetch import fetch_arrow_table, arrow_to_pandas
+
+
+def test_sqlite_without_adbc_falls_back_to_pyarrow_dtypes(db, monkeypatch):
+    monkeypatch.setattr("data_lib.arrowfetch._adbc_module", lambda backend: None)
+    assert fetch_arrow_table(db._engine, "SELECT * FROM sales") is None
+
+    df = db.run_arrow_query("SELECT * FROM sales ORDER BY ID")
+
+    assert all(isinstance(dtype, pd.ArrowDtype) for dtype in df.dtypes)
+    assert df["ID"].tolist() == [1, 2, 3, 4, 5]
+
+
+def test_as_table_returns_a_pyarrow_table(db, monkeypatch):
+    monkeypatch.setattr("data_lib.arrowfetch._adbc_module", lambda backend: None)
+
+    table = db.run_arrow_query("SELECT REGION, UNITS FROM sales ORDER BY ID", as_table=True)
+
+    assert isinstance(table, pa.Table)
+    assert table.column_names == ["REGION", "UNITS"]
+    assert table.column("UNITS").to_pylist() == [10, 0, 3, 7, 1]
+
+
+def test_params_are_bound(db, monkeypatch):
+    monkeypatch.setattr("data_lib.arrowfetch._adbc_module", lambda backend: None)
+
+    query = "SELECT ID FROM sales WHERE REGION = :region ORDER BY ID"
+    df = db.run_arrow_query(query, params={"region": "US"})
+
+    assert df["ID"].tolist() == [3, 4]
+
+
+def test_arrow_to_pandas_keeps_arrow_arrays():
+    df = arrow_to_pandas(pa.table({"N": [1, None]}))
+
+    assert df["N"].dtype == pd.ArrowDtype(pa.int64())
+    assert df["N"].isna().tolist() == [False, True]
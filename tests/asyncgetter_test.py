@@ -0,0 +1,45 @@
+import asyncio
+from data_lib.asyncgetter import AsyncDataGetter, async_engines
+
+
+def test_getters_of_a_target_share_one_limit(sqlite_target):
+    async def main():
+        first, second = AsyncDataGetter(max_concurrency=2), AsyncDataGetter(max_concurrency=8)
+        await first.init_database(*sqlite_target)
+        await second.init_database(*sqlite_target)
+        try:
+            assert first._semaphore is second._semaphore
+            assert first._executor is second._executor
+            assert first._executor._max_workers == 2
+
+            query = "SELECT COUNT(*) AS N FROM sales WHERE UNITS >= :units"
+            results = await asyncio.gather(
+                *[
+                    getter.run_sql_query(query, {"units": units})
+                    for getter in (first, second)
+                    for units in (0, 5)
+                ]
+            )
+            assert [int(df["N"].iloc[0]) for df in results] == [5, 2, 5, 2]
+        finally:
+            await first.close()
+            await second.close()
+            await async_engines.dispose(first._key)
+
+    asyncio.run(main())
+
+
+def test_thread_pool_fallback_runs_scripts_and_streams(sqlite_target):
+    async def main():
+        async with AsyncDataGetter() as db:
+            await db.init_database(*sqlite_target)
+            results = await db.execute_sql_query("UPDATE sales SET UNITS = 0 WHERE REGION = 'US'")
+            chunks = [chunk async for chunk in db.stream("SELECT * FROM sales ORDER BY ID", chunksize=2)]
+            await async_engines.dispose(db._key)
+        return results, chunks
+
+    results, chunks = asyncio.run(main())
+
+    assert results[0]["rowcount"] == 2
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert chunks[1]["UNITS"].tolist() == [0, 0]
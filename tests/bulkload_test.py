@@ -0,0 +1,51 @@
+import pandas as pd
+from sqlalchemy import inspect
+from data_lib.bulkload import SQLITE_MAX_VARIABLES, insert_method
+
+
+def read_sales(db):
+    return pd.read_sql_query("SELECT * FROM sales ORDER BY ID", db._engine)
+
+
+def test_append_inserts_the_rows(db):
+    rows = db.load_dataframe(pd.DataFrame({"ID": [6], "REGION": ["EU"], "UNITS": [4]}), "sales")
+
+    assert rows == 1
+    assert read_sales(db)["ID"].tolist() == [1, 2, 3, 4, 5, 6]
+
+
+def test_replace_recreates_the_table(db):
+    db.load_dataframe(pd.DataFrame({"ID": [9], "NOTE": ["new"]}), "sales", mode="replace")
+
+    assert read_sales(db).to_dict("records") == [{"ID": 9, "NOTE": "new"}]
+
+
+def test_upsert_replaces_matching_rows(db):
+    df = pd.DataFrame({"ID": [2, 6], "REGION": ["EU", "US"], "UNITS": [20, 6]})
+
+    db.load_dataframe(df, "sales", mode="upsert", key_columns=["ID"])
+
+    sales = read_sales(db)
+    assert sales["ID"].tolist() == [1, 2, 3, 4, 5, 6]
+    assert sales.set_index("ID").loc[[2, 6], "UNITS"].tolist() == [20, 6]
+
+
+def test_upsert_keeps_tables_named_like_the_stage(db):
+    pd.DataFrame({"KEEP": [1]}).to_sql("sales_stage", db._engine, index=False)
+
+    df = pd.DataFrame({"ID": [1], "REGION": ["EU"], "UNITS": [11]})
+
+    db.load_dataframe(df, "sales", mode="upsert", key_columns=["ID"])
+
+    assert sorted(inspect(db._engine).get_table_names()) == ["sales", "sales_stage"]
+    assert pd.read_sql_query("SELECT * FROM sales_stage", db._engine)["KEEP"].tolist() == [1]
+
+
+def test_sqlite_batches_stay_under_the_bind_variable_cap(db):
+    method, chunksize = insert_method("sqlite", 100, 10000)
+    assert method == "multi"
+    assert chunksize * 100 <= SQLITE_MAX_VARIABLES
+
+    wide = pd.DataFrame([[row] * 100 for row in range(50)], columns=[f"C{i}" for i in range(100)])
+    assert db.load_dataframe(wide, "wide") == 50
+    assert pd.read_sql_query("SELECT COUNT(*) AS N FROM wide", db._engine)["N"].tolist() == [50]
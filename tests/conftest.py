@@ -0,0 +1,73 @@
+import os
+import pytest
+import pandas as pd
+from data_lib import DataGetter
+from data_lib.credentials import credential_cache
+from data_lib.dbcon import engine_registry
+
+
+PROJECT_FOLDERS = [
+    "01_notebooks",
+    "02_data/01_input_files",
+    "02_data/02_input_query",
+    "02_data/03_stage_files",
+    "02_data/04_output_files",
+    "02_data/05_archived_files",
+]
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """
+    A project folder, DataGetter resolves its paths from the notebooks folder
+    """
+    for folder in PROJECT_FOLDERS:
+        os.makedirs(tmp_path / folder)
+    monkeypatch.chdir(tmp_path / "01_notebooks")
+    return tmp_path
+
+
+@pytest.fixture
+def db(project):
+    """
+    A DataGetter connected to a SQLite database file of the project with a sales table
+    """
+    getter = DataGetter()
+    getter._engine = getter.set_engine(f"sqlite:///{project / '02_data' / 'test.db'}")
+    pd.DataFrame(
+        {
+            "ID": [1, 2, 3, 4, 5],
+            "REGION": ["EU", "EU", "US", "US", "APAC"],
+            "UNITS": [10, 0, 3, 7, 1],
+        }
+    ).to_sql("sales", getter._engine, index=False)
+    yield getter
+    getter.flush_archive()
+    getter._engine.dispose()
+
+
+def write_query(project, name, sql_text):
+    with open(project / "02_data" / "02_input_query" / f"{name}.sql", "w") as put:
+        put.write(sql_text)
+
+
+class StaticProvider:
+    def __init__(self, credentials):
+        self.credentials = credentials
+
+    def get_many(self, targets):
+        return {target: self.credentials[target] for target in targets if target in self.credentials}
+
+
+@pytest.fixture
+def sqlite_target(db, project):
+    """
+    The ("sqlite", "Test") target of init_database, resolved to the database file of the db fixture
+    """
+    providers = credential_cache.providers
+    # non-snowflake targets need every credential, sqlite only reads the database
+    credentials = ("user", "password", "host", "0", str(project / "02_data" / "test.db"))
+    credential_cache.configure(providers=[StaticProvider({("sqlite", "Test"): credentials})])
+    yield ("sqlite", "Test")
+    credential_cache.configure(providers=providers)
+    engine_registry.shutdown()
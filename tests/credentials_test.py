@@ -0,0 +1,75 @@
+import pytest
+from data_lib.credentials import (
+    CredentialCache, EnvironmentProvider, EncryptedFileProvider, KeyringProvider, credential_cache,
+)
+from data_lib.datalibutils import create_database_uri
+
+
+class CountingProvider:
+    def __init__(self, credentials):
+        self.credentials = credentials
+        self.calls = 0
+
+    def get_many(self, targets):
+        self.calls += 1
+        return {target: self.credentials[target] for target in targets if target in self.credentials}
+
+
+@pytest.fixture
+def snowflake_env(monkeypatch):
+    monkeypatch.setenv("DATA_LIB_SNOWFLAKE_PROD_USER", "me")
+    monkeypatch.setenv("DATA_LIB_SNOWFLAKE_PROD_HOST", "acct")
+    credential_cache.configure(providers=[EnvironmentProvider()])
+    yield
+    credential_cache.configure(providers=[EnvironmentProvider(), KeyringProvider()])
+
+
+def test_cache_keeps_resolved_credentials():
+    target = ("sqlite", "Test")
+    provider = CountingProvider({target: ("", "", "", "", "test.db")})
+    cache = CredentialCache(providers=[provider])
+
+    assert cache.get(*target) == ("", "", "", "", "test.db")
+    assert cache.get(*target) == ("", "", "", "", "test.db")
+    assert provider.calls == 1
+
+    cache.invalidate(provider="sqlite")
+    cache.get(*target)
+    assert provider.calls == 2
+
+
+def test_cache_asks_the_next_provider_for_missing_targets():
+    first = CountingProvider({("sqlite", "A"): ("", "", "", "", "a.db")})
+    second = CountingProvider({("sqlite", "B"): ("", "", "", "", "b.db")})
+    cache = CredentialCache(providers=[first, second], ttl=0)
+
+    found = cache.get_many([("sqlite", "A"), ("sqlite", "B"), ("sqlite", "C")])
+
+    assert set(found) == {("sqlite", "A"), ("sqlite", "B")}
+
+
+def test_environment_provider_returns_empty_unset_values(monkeypatch):
+    monkeypatch.setenv("DATA_LIB_SNOWFLAKE_PROD_USER", "me")
+    monkeypatch.setenv("DATA_LIB_SNOWFLAKE_PROD_HOST", "acct")
+
+    assert EnvironmentProvider().get("snowflake", "Prod") == ("me", "", "acct", "", "")
+    assert EnvironmentProvider().get("snowflake", "Dev") is None
+
+
+def test_encrypted_file_round_trip(tmp_path):
+    pytest.importorskip("cryptography")
+    from cryptography.fernet import Fernet
+
+    provider = EncryptedFileProvider(str(tmp_path / "credentials.bin"), key=Fernet.generate_key())
+    provider.store("snowflake", "Prod", "me", host="acct")
+    provider.store("postgresql", "Prod", "me", "secret", "db.local", 5432, "sales")
+
+    assert provider.get("snowflake", "Prod") == ("me", "", "acct", "", "")
+    assert provider.get("postgresql", "Prod") == ("me", "secret", "db.local", "5432", "sales")
+    assert provider.get("mssql", "Prod") is None
+
+
+def test_snowflake_uri_without_a_password_uses_the_browser(snowflake_env):
+    uri = create_database_uri("snowflake", "Prod")
+
+    assert uri == "snowflake://me@acct?role=PUBLIC&authenticator=externalbrowser"
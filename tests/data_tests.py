@@ -1,3 +1,2 @@
 import pytest
-from dataLib import DB, Data
-
+from data_lib import DataGetter
@@ -0,0 +1,140 @@
+import pytest
+import pandas as pd
+from tests.conftest import write_query
+
+
+def test_run_sql_query_reads_query_files(db, project):
+    write_query(project, "sales_by_units", "SELECT * FROM sales WHERE UNITS >= {min_units}")
+
+    df = db.run_sql_query("sales_by_units", min_units=5)
+
+    assert df["ID"].tolist() == [1, 4]
+
+
+def test_iter_sql_query_yields_chunks(db):
+    chunks = list(db.iter_sql_query("SELECT * FROM sales ORDER BY ID", chunksize=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert pd.concat(chunks)["ID"].tolist() == [1, 2, 3, 4, 5]
+
+
+def test_execute_sql_query_runs_every_statement(db, project):
+    write_query(
+        project,
+        "refresh_sales",
+        "DELETE FROM sales WHERE UNITS = 0;\n"
+        "SELECT COUNT(*) FROM sales;\n"
+        "UPDATE sales SET UNITS = UNITS + 1 WHERE REGION = 'EU';",
+    )
+
+    results = db.execute_sql_query("refresh_sales")
+
+    assert [result["rowcount"] for result in results if "SELECT" not in result["statement"]] == [1, 1]
+    assert db.run_sql_query("SELECT ID, UNITS FROM sales ORDER BY ID")["UNITS"].tolist() == [11, 3, 7, 1]
+
+
+def test_execute_sql_query_rolls_back_a_failed_transaction(db):
+    script = "DELETE FROM sales; INSERT INTO missing VALUES (1)"
+
+    with pytest.raises(Exception):
+        db.execute_sql_query(script)
+
+    assert len(db.run_sql_query("SELECT * FROM sales")) == 5
+
+
+def write_input(project, name, df):
+    df.to_csv(project / "02_data" / "01_input_files" / name, index=False)
+
+
+def test_read_file_reads_literal_names_with_glob_characters(db, project):
+    write_input(project, "report [final].csv", pd.DataFrame({"N": [1, 2]}))
+
+    assert db.read_file(pd.read_csv, "report [final].csv")["N"].tolist() == [1, 2]
+
+
+def test_read_file_glob_with_projection_filter_and_source(db, project):
+    write_input(project, "drop_1.csv", pd.DataFrame({"STORE": [1, 2], "UNITS": [0, 5], "X": [1, 1]}))
+    write_input(project, "drop_2.csv", pd.DataFrame({"STORE": [3, 4], "UNITS": [7, 0], "X": [1, 1]}))
+
+    df = db.read_file(
+        pd.read_csv,
+        "drop_*.csv",
+        columns=["STORE", "UNITS"],
+        row_filter=lambda part: part["UNITS"] > 0,
+        source_column="SOURCE",
+        max_workers=2,
+    )
+
+    assert list(df.columns) == ["STORE", "UNITS", "SOURCE"]
+    assert df["STORE"].tolist() == [2, 3]
+    assert df["SOURCE"].tolist() == ["drop_1.csv", "drop_2.csv"]
+    assert df["SOURCE"].dtype == "category"
+
+
+def test_read_file_source_column_is_a_category_for_one_file(db, project):
+    write_input(project, "drop_1.csv", pd.DataFrame({"N": [1]}))
+
+    assert db.read_file(pd.read_csv, "drop_*.csv", source_column="SOURCE")["SOURCE"].dtype == "category"
+    assert db.read_file(pd.read_csv, "drop_1.csv", source_column="SOURCE")["SOURCE"].dtype == "category"
+
+
+def test_read_file_glob_without_matches(db):
+    with pytest.raises(FileNotFoundError):
+        db.read_file(pd.read_csv, "missing_*.csv")
+
+
+def test_execute_sql_query_runs_trigger_bodies(db):
+    db.execute_sql_query(
+        "CREATE TABLE log (n INT);\n"
+        "CREATE TRIGGER t AFTER INSERT ON sales BEGIN INSERT INTO log VALUES (new.UNITS); END;\n"
+        "INSERT INTO sales VALUES (6, 'EU', 8)"
+    )
+
+    assert db.run_sql_query("SELECT n FROM log")["n"].tolist() == [8]
+
+
+def test_execute_sql_query_without_splitting(db):
+    results = db.execute_sql_query(
+        "CREATE TRIGGER t AFTER DELETE ON sales BEGIN SELECT 1; END;", split=False
+    )
+
+    assert len(results) == 1
+
+
+def test_run_sql_query_reports_optimized_dtypes(db):
+    df = db.run_sql_query("SELECT * FROM sales", optimize_dtypes={"category_ratio": 0.7})
+
+    report = df.attrs["dtype_report"]
+    assert df["UNITS"].dtype == "int8"
+    assert df["REGION"].dtype == "category"
+    assert set(report) == {"bytes_before", "bytes_after", "columns"}
+    assert set(report["columns"]) == {"ID", "REGION", "UNITS"}
+    assert report["columns"]["REGION"]["dtype_before"] == "object"
+
+
+def test_read_file_reports_optimized_dtypes(db, project):
+    write_input(project, "stores.csv", pd.DataFrame({"STORE": [1, 2, 3, 4], "CITY": ["A", "A", "B", "B"]}))
+
+    df = db.read_file(pd.read_csv, "stores.csv", optimize_dtypes=True)
+
+    assert df["STORE"].dtype == "int8"
+    assert df["CITY"].dtype == "category"
+    assert df.attrs["dtype_report"]["bytes_after"] < df.attrs["dtype_report"]["bytes_before"]
+
+
+def test_run_many_keeps_going_after_a_failed_query(db, project):
+    write_query(project, "sales_by_region", "SELECT ID FROM sales WHERE REGION = '{region}' ORDER BY ID")
+
+    results = db.run_many(
+        {
+            "sales_by_region": {"region": "US"},
+            "SELECT * FROM missing_table": None,
+            "SELECT COUNT(*) AS N FROM sales": None,
+        },
+        max_workers=3,
+    )
+
+    assert results["sales_by_region"]["ID"].tolist() == [3, 4]
+    assert results["SELECT COUNT(*) AS N FROM sales"]["N"].tolist() == [5]
+    assert list(results.errors) == ["SELECT * FROM missing_table"]
+    assert "SELECT * FROM missing_table" not in results
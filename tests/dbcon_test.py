@@ -0,0 +1,54 @@
+from data_lib import DataGetter
+from data_lib.dbcon import EngineRegistry, engine_registry
+
+
+def test_getters_of_a_target_share_one_engine(sqlite_target):
+    first, second = DataGetter(), DataGetter()
+    first.init_database(*sqlite_target)
+    second.init_database(*sqlite_target)
+
+    assert first._engine is second._engine
+    assert first.run_sql_query("SELECT COUNT(*) AS N FROM sales")["N"].tolist() == [5]
+
+
+def test_pool_options_apply_when_the_engine_is_created(sqlite_target):
+    first, second = DataGetter(), DataGetter()
+    first.init_database(*sqlite_target, pool_size=2)
+    second.init_database(*sqlite_target, pool_size=7)
+
+    assert second._engine.pool.size() == 2
+
+
+def test_stats_and_shutdown(sqlite_target):
+    getter = DataGetter()
+    getter.init_database(*sqlite_target)
+    key = ("sqlite", "Test", None, "PUBLIC")
+
+    with getter._engine.connect():
+        stats = getter.pool_stats()[key]
+        assert stats["pool"] == "QueuePool"
+        assert stats["checked_out"] == 1
+
+    engine = getter._engine
+    getter.shutdown_engines()
+    assert engine_registry.stats() == {}
+
+    getter.init_database(*sqlite_target)
+    assert getter._engine is not engine
+
+
+def test_uri_factory_only_runs_for_new_engines(tmp_path):
+    registry = EngineRegistry()
+    calls = []
+
+    def uri():
+        calls.append(1)
+        return f"sqlite:///{tmp_path / 'registry.db'}"
+
+    engine = registry.get_engine("key", uri)
+    assert registry.get_engine("key", uri) is engine
+    assert calls == [1]
+
+    registry.dispose("key")
+    assert registry.get_engine("key", uri) is not engine
+    registry.shutdown()
@@ -0,0 +1,163 @@
+import os
+import pytest
+import pandas as pd
+from openpyxl import load_workbook
+from data_lib import exporter
+from data_lib.exporter import write_frames, write_parts, split_rows
+
+
+def chunks(rows, chunksize):
+    for start in range(0, rows, chunksize):
+        yield pd.DataFrame({"N": range(start, min(start + chunksize, rows))})
+
+
+def failing_chunks():
+    yield pd.DataFrame({"N": [1, 2]})
+    raise RuntimeError("cursor lost")
+
+
+def test_split_rows_fills_every_part():
+    parts = [(part, len(frame)) for part, frame in split_rows(chunks(9, 2), 3)]
+
+    assert parts == [(0, 2), (0, 1), (1, 1), (1, 2), (2, 2), (2, 1)]
+
+
+def test_xlsx_rolls_over_to_new_sheets(tmp_path):
+    path = str(tmp_path / "out.xlsx")
+
+    rows = write_frames(chunks(7, 2), path, "xlsx", max_rows=3)
+
+    wb = load_workbook(path)
+    assert rows == 7
+    assert wb.sheetnames == ["Data Export", "Data Export 2", "Data Export 3"]
+    assert [ws.max_row for ws in wb.worksheets] == [4, 4, 2]
+
+
+def test_xlsx_converts_large_frames_in_batches(tmp_path, monkeypatch):
+    batches = []
+    cell_values = exporter._cell_values
+
+    def spy(ws, frame, text):
+        batches.append(len(frame))
+        return cell_values(ws, frame, text)
+
+    monkeypatch.setattr(exporter, "XLSX_BATCH_ROWS", 4)
+    monkeypatch.setattr(exporter, "_cell_values", spy)
+    path = str(tmp_path / "out.xlsx")
+
+    write_frames(pd.DataFrame({"ID": range(10), "N": range(10)}), path, "xlsx", text_columns=["ID"])
+
+    ws = load_workbook(path).active
+    assert batches == [4, 4, 2]
+    assert [row for row in ws.iter_rows(min_row=2, values_only=True)][-1] == ("9", 9)
+
+
+@pytest.mark.parametrize("max_workers", [None, 2])
+@pytest.mark.parametrize("file_format", ["xlsx", "csv", "parquet"])
+def test_write_parts(tmp_path, file_format, max_workers):
+    path = str(tmp_path / f"out.{file_format}")
+
+    written = write_parts(chunks(7, 2), path, file_format, max_rows=3, max_workers=max_workers)
+
+    assert [(os.path.basename(path), rows) for path, rows in written] == [
+        (f"out_001.{file_format}", 3),
+        (f"out_002.{file_format}", 3),
+        (f"out_003.{file_format}", 1),
+    ]
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(path) for path, _ in written]
+
+
+@pytest.mark.parametrize("file_format", ["xlsx", "csv", "parquet"])
+def test_failed_write_keeps_the_existing_file(tmp_path, file_format):
+    path = tmp_path / f"out.{file_format}"
+    path.write_text("previous export")
+
+    with pytest.raises(RuntimeError):
+        write_frames(failing_chunks(), str(path), file_format)
+
+    assert os.listdir(tmp_path) == [path.name]
+    assert path.read_text() == "previous export"
+
+
+@pytest.mark.parametrize("max_workers", [None, 2])
+def test_failed_parts_are_removed(tmp_path, max_workers):
+    with pytest.raises(RuntimeError):
+        write_parts(failing_chunks(), str(tmp_path / "out.csv"), "csv", max_rows=1, max_workers=max_workers)
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_before_replace_sees_the_existing_file(tmp_path):
+    path = tmp_path / "out.csv"
+    path.write_text("previous export")
+    archived = []
+
+    write_frames(pd.DataFrame({"N": [1]}), str(path), "csv", before_replace=lambda p: archived.append(open(p).read()))
+
+    assert archived == ["previous export"]
+    assert pd.read_csv(path)["N"].tolist() == [1]
+
+
+def test_export_query_rollover_files(db, project):
+    written = db.export_query(
+        "SELECT * FROM sales ORDER BY ID", custom_filename="sales.csv", rollover="file",
+        max_rows=2, chunksize=2, max_workers=2,
+    )
+
+    assert [rows for _, rows in written] == [2, 2, 1]
+    assert pd.concat(pd.read_csv(path) for path, _ in written)["ID"].tolist() == [1, 2, 3, 4, 5]
+
+
+def test_export_data_archives_the_previous_output(db, project):
+    db.export_data(pd.DataFrame({"N": [1]}), custom_filename="report.csv")
+    db.export_data(pd.DataFrame({"N": [2]}), custom_filename="report.csv")
+    db.flush_archive()
+
+    output = project / "02_data" / "04_output_files"
+    assert os.listdir(output) == ["report.csv"]
+    assert len(os.listdir(project / "02_data" / "05_archived_files")) == 1
+
+
+@pytest.mark.parametrize("file_name", ["ids.csv", "ids.parquet"])
+def test_export_data_keeps_id_values(db, project, file_name):
+    db.export_data(pd.DataFrame({"ORDER_ID": [123, 456], "UNITS": [1, 2]}), custom_filename=file_name)
+
+    path = project / "02_data" / "04_output_files" / file_name
+    df = pd.read_csv(path) if file_name.endswith(".csv") else pd.read_parquet(path)
+    assert df["ORDER_ID"].tolist() == [123, 456]
+
+
+def test_export_data_writes_ids_as_text_cells(db, project):
+    df = pd.DataFrame({"ORDER_ID": [123.0, None], "UNITS": [1, 2]})
+    db.export_data(df, custom_filename="ids.xlsx")
+
+    ws = load_workbook(project / "02_data" / "04_output_files" / "ids.xlsx")["Data Export"]
+    assert [ws["A2"].value, ws["A3"].value, ws["B2"].value] == ["123", None, 1]
+    assert ws["A2"].number_format == "@"
+    assert ws["A2"].quotePrefix
+
+
+def test_parquet_promotes_null_columns_of_the_first_chunks(tmp_path):
+    path = str(tmp_path / "out.parquet")
+    frames = [
+        pd.DataFrame({"N": [1, 2], "NOTE": [None, None]}),
+        pd.DataFrame({"N": [3, None], "NOTE": [None, None]}),
+        pd.DataFrame({"N": [5, 6], "NOTE": ["a", None]}),
+    ]
+
+    rows = write_frames(frames, path, "parquet")
+
+    df = pd.read_parquet(path)
+    assert rows == 6
+    assert df["N"].tolist()[:2] == [1, 2]
+    assert df["NOTE"].tolist() == [None, None, None, None, "a", None]
+    assert os.listdir(tmp_path) == ["out.parquet"]
+
+
+def test_export_query_parquet_with_late_values(db, project):
+    db.execute_sql_query("UPDATE sales SET REGION = NULL WHERE ID <= 2")
+
+    db.export_query("SELECT * FROM sales ORDER BY ID", custom_filename="p.parquet", chunksize=2)
+
+    df = pd.read_parquet(project / "02_data" / "04_output_files" / "p.parquet")
+    assert df["REGION"].tolist() == [None, None, "US", "US", "APAC"]
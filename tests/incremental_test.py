@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+from data_lib.incremental import merge_increment, drop_staged_rows
+from tests.conftest import write_query
+
+
+@pytest.fixture
+def orders(db, project):
+    pd.DataFrame({"ORDER_ID": [1, 2], "UPDATED_AT": [10, 20], "UNITS": [1, 2]}).to_sql(
+        "orders", db._engine, index=False
+    )
+    write_query(project, "orders", "SELECT * FROM orders\n-- every order")
+    return db
+
+
+def insert(db, rows):
+    pd.DataFrame(rows, columns=["ORDER_ID", "UPDATED_AT", "UNITS"]).to_sql(
+        "orders", db._engine, index=False, if_exists="append"
+    )
+
+
+def test_query_files_ending_in_a_comment(orders):
+    orders.run_incremental("orders", "UPDATED_AT")
+    insert(orders, [(3, 30, 3)])
+
+    df = orders.run_incremental("orders", "UPDATED_AT")
+
+    assert df["ORDER_ID"].tolist() == [1, 2, 3]
+
+
+def test_append_keeps_rows_committed_at_the_high_water_mark(orders):
+    orders.run_incremental("orders", "UPDATED_AT")
+    insert(orders, [(3, 20, 3)])
+
+    df = orders.run_incremental("orders", "UPDATED_AT")
+    again = orders.run_incremental("orders", "UPDATED_AT")
+
+    assert df["ORDER_ID"].tolist() == [1, 2, 3]
+    assert again["ORDER_ID"].tolist() == [1, 2, 3]
+
+
+def test_upsert_replaces_rows_by_key(orders):
+    orders.run_incremental("orders", "UPDATED_AT", key_columns=["ORDER_ID"], mode="upsert")
+    orders.execute_sql_query("UPDATE orders SET UPDATED_AT = 40, UNITS = 9 WHERE ORDER_ID = 1")
+
+    df = orders.run_incremental("orders", "UPDATED_AT", key_columns=["ORDER_ID"], mode="upsert")
+
+    assert df.sort_values("ORDER_ID")["UNITS"].tolist() == [9, 2]
+
+
+def test_full_refresh_replaces_the_staged_rows(orders):
+    orders.run_incremental("orders", "UPDATED_AT")
+    orders.execute_sql_query("DELETE FROM orders WHERE ORDER_ID = 1")
+
+    df = orders.run_incremental("orders", "UPDATED_AT", full_refresh=True)
+
+    assert df["ORDER_ID"].tolist() == [2]
+
+
+def test_raw_sql_needs_a_name(orders):
+    with pytest.raises(ValueError):
+        orders.run_incremental("SELECT * FROM orders", "UPDATED_AT")
+
+
+def test_drop_staged_rows_by_key():
+    staged = pd.DataFrame({"ID": [1, 2], "TS": [5, 7]})
+    increment = pd.DataFrame({"ID": [2, 3, 4], "TS": [7, 7, 8]})
+
+    assert drop_staged_rows(increment, staged, "TS", 7, ["ID"])["ID"].tolist() == [3, 4]
+
+
+def test_merge_increment_upsert_needs_keys():
+    with pytest.raises(ValueError):
+        merge_increment(None, pd.DataFrame(), mode="upsert")
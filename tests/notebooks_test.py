@@ -0,0 +1,56 @@
+import os
+import pytest
+from data_lib.datalibutils import notebooks_to_html
+
+nbformat = pytest.importorskip("nbformat")
+pytest.importorskip("nbconvert")
+
+
+def write_notebook(path, text):
+    notebook = nbformat.v4.new_notebook(cells=[nbformat.v4.new_markdown_cell(text)])
+    nbformat.write(notebook, str(path))
+
+
+@pytest.fixture
+def notebooks(tmp_path):
+    folder = tmp_path / "notebooks"
+    folder.mkdir()
+    write_notebook(folder / "daily.ipynb", "# Daily")
+    write_notebook(folder / "weekly.ipynb", "# Weekly")
+    return folder
+
+
+def test_unchanged_notebooks_are_skipped(notebooks, tmp_path):
+    html_path = str(tmp_path / "html")
+
+    first = notebooks_to_html(str(notebooks), html_path, max_workers=2)
+    write_notebook(notebooks / "weekly.ipynb", "# Weekly v2")
+    second = notebooks_to_html(str(notebooks), html_path, max_workers=2)
+
+    assert sorted(first["rendered"]) == ["daily.ipynb", "weekly.ipynb"]
+    assert second["skipped"] == ["daily.ipynb"]
+    assert second["rendered"] == ["weekly.ipynb"]
+    with open(os.path.join(html_path, "weekly.html"), encoding="utf8") as get:
+        assert "Weekly v2" in get.read()
+
+
+def test_force_renders_every_notebook(notebooks, tmp_path):
+    html_path = str(tmp_path / "html")
+    notebooks_to_html(str(notebooks), html_path, max_workers=2)
+
+    report = notebooks_to_html(str(notebooks), html_path, max_workers=2, force=True)
+
+    assert sorted(report["rendered"]) == ["daily.ipynb", "weekly.ipynb"]
+    assert report["skipped"] == []
+
+
+def test_failed_notebooks_do_not_stop_the_others(notebooks, tmp_path):
+    (notebooks / "broken.ipynb").write_text("not a notebook")
+    html_path = str(tmp_path / "html")
+
+    report = notebooks_to_html(str(notebooks), html_path, max_workers=2)
+
+    assert list(report["failed"]) == ["broken.ipynb"]
+    assert sorted(report["rendered"]) == ["daily.ipynb", "weekly.ipynb"]
+    # the failed notebook is tried again on the next run
+    assert notebooks_to_html(str(notebooks), html_path, max_workers=2)["failed"].keys() == {"broken.ipynb"}
@@ -0,0 +1,109 @@
+import os
+import time
+import pandas as pd
+from data_lib import querycache
+from data_lib.querycache import QueryCache, shared_query_cache
+from data_lib import DataGetter
+
+
+def test_put_and_get(tmp_path):
+    cache = QueryCache(str(tmp_path))
+    df = pd.DataFrame({"N": [1, 2]})
+
+    cache.put("key", df, query="numbers")
+
+    pd.testing.assert_frame_equal(cache.get("key"), df)
+    assert cache.invalidate(query="numbers") == 1
+    assert cache.get("key") is None
+
+
+def test_expired_results_are_removed(tmp_path):
+    cache = QueryCache(str(tmp_path))
+    cache.put("key", pd.DataFrame({"N": [1]}), ttl=-1)
+
+    assert cache.get("key") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_results_are_evicted(tmp_path):
+    cache = QueryCache(str(tmp_path))
+    cache.put("first", pd.DataFrame({"N": range(100)}))
+    cache.max_size = os.path.getsize(tmp_path / "first.parquet") * 1.5
+
+    cache.put("second", pd.DataFrame({"N": range(100, 200)}))
+
+    assert cache.get("first") is None
+    assert cache.get("second") is not None
+
+
+def test_unstorable_results_are_returned_uncached(db):
+    db.enable_query_cache()
+
+    df = db.run_sql_query("SELECT a.ID, b.ID FROM sales a JOIN sales b ON a.ID = b.ID")
+
+    assert len(df) == 5
+    assert db._query_cache.stats()["entries"] == 0
+    assert [f for f in os.listdir(db._query_cache._cache_path) if f.endswith(".tmp")] == []
+
+
+def test_getters_share_the_cache_of_a_folder(db):
+    db.enable_query_cache()
+    other = DataGetter()
+    other._engine = db._engine
+    other.enable_query_cache()
+
+    db.run_sql_query("SELECT * FROM sales WHERE UNITS > 1")
+    other.run_sql_query("SELECT * FROM sales WHERE UNITS > 2")
+
+    cache_path = db._query_cache._cache_path
+    parquet_files = [f for f in os.listdir(cache_path) if f.endswith(".parquet")]
+    assert other._query_cache is db._query_cache
+    assert db._query_cache.stats()["entries"] == len(parquet_files) == 2
+
+
+def test_old_files_missing_from_the_index_are_removed(tmp_path):
+    pd.DataFrame({"N": [1]}).to_parquet(tmp_path / "orphan.parquet")
+    pd.DataFrame({"N": [1]}).to_parquet(tmp_path / "writing.parquet")
+    old = time.time() - 2 * querycache.ORPHAN_SECONDS
+    os.utime(tmp_path / "orphan.parquet", (old, old))
+
+    QueryCache(str(tmp_path))
+
+    assert not os.path.exists(tmp_path / "orphan.parquet")
+    assert os.path.exists(tmp_path / "writing.parquet")
+
+
+def test_caches_of_other_processes_keep_their_entries(tmp_path):
+    # separate instances of a folder stand in for notebooks running in separate kernels
+    first, second = QueryCache(str(tmp_path)), QueryCache(str(tmp_path))
+
+    first.put("ka", pd.DataFrame({"N": [1]}))
+    second.put("kb", pd.DataFrame({"N": [2]}))
+    third = QueryCache(str(tmp_path))
+
+    assert first.get("ka")["N"].tolist() == [1]
+    assert first.get("kb")["N"].tolist() == [2]
+    assert third.stats()["entries"] == 2
+
+
+def test_size_cap_applies_across_processes(tmp_path):
+    first, second = QueryCache(str(tmp_path)), QueryCache(str(tmp_path))
+    first.put("ka", pd.DataFrame({"N": range(100)}))
+    size = os.path.getsize(tmp_path / "ka.parquet")
+    second.max_size = int(size * 1.5)
+
+    second.put("kb", pd.DataFrame({"N": range(100, 200)}))
+
+    assert first.get("ka") is None
+    assert first.stats()["entries"] == 1
+
+
+def test_hits_do_not_rewrite_the_index(tmp_path):
+    cache = QueryCache(str(tmp_path))
+    cache.put("key", pd.DataFrame({"N": [1]}))
+    saved = os.stat(tmp_path / "cache_index.json").st_mtime_ns
+
+    for _ in range(5):
+        assert cache.get("key") is not None
+
+    assert os.stat(tmp_path / "cache_index.json").st_mtime_ns == saved
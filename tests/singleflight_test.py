@@ -0,0 +1,48 @@
+import time
+import threading
+import pandas as pd
+from data_lib.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    # nothing is kept, the follower can only get the result of the in-flight call
+    flight = SingleFlight(ttl=0)
+    started, release = threading.Event(), threading.Event()
+    results = []
+
+    def load():
+        started.set()
+        release.wait(5)
+        return pd.DataFrame({"N": [1, 2]})
+
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", load)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(flight.do("key", load)))
+    follower.start()
+
+    # the follower is counted as shared before it waits on the call
+    deadline = time.time() + 5
+    while flight.stats()["shared"] == 0 and time.time() < deadline:
+        time.sleep(0.001)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert [df["N"].tolist() for df in results] == [[1, 2], [1, 2]]
+    assert flight.stats()["executions"] == 1
+    assert flight.stats()["shared"] == 1
+    assert flight.stats()["results"] == 0
+
+
+def test_results_are_kept_within_the_byte_budget():
+    flight = SingleFlight()
+    df = pd.DataFrame({"N": range(100)})
+
+    flight.do("key", lambda: df)
+    assert flight.do("key", lambda: None)["N"].tolist() == list(range(100))
+    assert flight.stats()["size"] == int(df.memory_usage(deep=True).sum())
+
+    flight.max_size = 1
+    flight.do("other", lambda: df)
+    assert flight.stats()["results"] == 1
@@ -0,0 +1,61 @@
+import threading
+from types import SimpleNamespace
+from data_lib.snowparkpool import LocalSession, SnowparkSessionPool, apply_pushdown
+
+
+def test_sort_and_limit_run_in_the_outermost_query(db):
+    frame = apply_pushdown(
+        LocalSession(db._engine).table("sales"),
+        filters=["UNITS > 0"],
+        columns=["ID", "UNITS"],
+        order_by=["UNITS"],
+        limit=3,
+    )
+
+    assert frame.queries["queries"][0].endswith("ORDER BY UNITS ASC LIMIT 3")
+    assert frame.to_pandas()["ID"].tolist() == [5, 3, 4]
+    assert frame.count() == 3
+
+
+def test_steps_after_a_limit_see_the_limited_rows(db):
+    frame = LocalSession(db._engine).table("sales").sort("ID").limit(3)
+
+    assert frame.filter("REGION = 'EU'").count() == 2
+    assert frame.sort("UNITS", ascending=False).to_pandas()["ID"].tolist() == [1, 3, 2]
+
+
+def test_top_dialects_limit_with_select_top():
+    engine = SimpleNamespace(dialect=SimpleNamespace(name="mssql"))
+    frame = LocalSession(engine).table("sales").sort("UNITS").limit(2)
+
+    sql_text = frame.queries["queries"][0]
+
+    assert sql_text.startswith("SELECT TOP 2 * FROM (SELECT * FROM sales) AS ")
+    assert sql_text.endswith("ORDER BY UNITS ASC")
+    assert "LIMIT" not in sql_text
+
+
+def test_a_login_only_blocks_its_own_target():
+    pool = SnowparkSessionPool()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_login():
+        calls.append("slow")
+        started.set()
+        release.wait(5)
+        return "slow session"
+
+    waiters = [threading.Thread(target=pool.get, args=("slow", slow_login)) for _ in range(2)]
+    for waiter in waiters:
+        waiter.start()
+    started.wait(5)
+
+    # another target is served while the first login waits
+    assert pool.get("fast", lambda: "fast session") == "fast session"
+
+    release.set()
+    for waiter in waiters:
+        waiter.join()
+    assert calls == ["slow"]
+    assert pool.get("slow", slow_login) == "slow session"
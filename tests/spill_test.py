@@ -0,0 +1,100 @@
+import gc
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from data_lib import spill
+from data_lib.spill import spill_chunks
+
+
+@pytest.fixture
+def orders(db):
+    # three parts of two rows each
+    with db.spill_sql_query("SELECT * FROM sales ORDER BY ID", chunksize=2) as spilled:
+        yield spilled
+
+
+def test_spilled_rows_and_columns(orders):
+    assert len(orders) == 5
+    assert orders.columns == ["ID", "REGION", "UNITS"]
+    assert len(os.listdir(orders.path)) == 3
+
+
+def test_select_filter_and_head(orders):
+    eu = orders.filter([("REGION", "=", "EU")]).select(["ID", "UNITS"])
+
+    assert len(eu) == 2
+    assert eu.head().to_dict("list") == {"ID": [1, 2], "UNITS": [10, 0]}
+    us = orders.filter([("UNITS", ">", 0)]).filter([("REGION", "=", "US")])
+    assert us.to_pandas()["ID"].tolist() == [3, 4]
+
+
+def test_iter_batches(orders):
+    batches = list(orders.select(["ID"]).iter_batches(batch_size=2))
+
+    assert pd.concat(batches)["ID"].tolist() == [1, 2, 3, 4, 5]
+    assert all(len(batch) <= 2 for batch in batches)
+
+
+def test_aggregate_combines_partials(orders, monkeypatch):
+    # every chunk is reduced on its own before the partials are combined
+    monkeypatch.setattr(spill, "PARTIALS_PER_REDUCE", 2)
+
+    out = orders.aggregate(
+        {
+            "TOTAL": ("UNITS", "sum"),
+            "AVG": ("UNITS", "mean"),
+            "N": ("ID", "count"),
+            "TOP": ("UNITS", "max"),
+        },
+        group_by=["REGION"],
+        batch_size=1,
+    )
+
+    out = out.sort_values("REGION", ignore_index=True)
+    assert out["REGION"].tolist() == ["APAC", "EU", "US"]
+    assert out["TOTAL"].tolist() == [1, 10, 10]
+    assert out["AVG"].tolist() == [1.0, 5.0, 5.0]
+    assert out["N"].tolist() == [1, 2, 2]
+    assert out["TOP"].tolist() == [1, 10, 7]
+
+
+def test_aggregate_without_groups(orders):
+    out = orders.aggregate({"TOTAL": ("UNITS", "sum"), "AVG": ("UNITS", "mean")}, batch_size=2)
+
+    assert out.to_dict("records") == [{"TOTAL": 21, "AVG": 4.2}]
+
+
+def test_sum_of_null_values_matches_pandas(tmp_path):
+    df = pd.DataFrame({"GROUP": ["a", "a", "b"], "VALUE": [np.nan, np.nan, 1.0]})
+    spilled = spill_chunks([df], str(tmp_path))
+
+    out = spilled.aggregate({"SUM": ("VALUE", "sum"), "MEAN": ("VALUE", "mean")}, group_by=["GROUP"])
+    expected = df.groupby("GROUP")["VALUE"].agg(["sum", "mean"])
+
+    out = out.sort_values("GROUP").set_index("GROUP")
+    assert out["SUM"].tolist() == expected["sum"].tolist()
+    assert out["MEAN"].isna().tolist() == expected["mean"].isna().tolist()
+
+
+def test_close_deletes_the_files(db):
+    spilled = db.spill_sql_query("SELECT * FROM sales")
+    path = spilled.path
+
+    spilled.close()
+
+    assert not os.path.exists(path)
+    with pytest.raises(ValueError):
+        spilled.to_pandas()
+
+
+def test_selection_keeps_its_owner_alive(db):
+    selection = db.spill_sql_query("SELECT * FROM sales").select(["ID"])
+    gc.collect()
+
+    assert selection.to_pandas()["ID"].tolist() == [1, 2, 3, 4, 5]
+
+    path = selection.path
+    del selection
+    gc.collect()
+    assert not os.path.exists(path)
@@ -0,0 +1,56 @@
+import os
+from sqlalchemy import event
+from data_lib.sqltemplate import SQLTemplateCache, sql_templates
+from tests.conftest import write_query
+
+
+def test_params_are_bound_not_formatted(db, project):
+    write_query(project, "sales_by_region", "SELECT ID FROM sales WHERE REGION = :region ORDER BY ID")
+    sent = []
+    event.listen(
+        db._engine, "before_cursor_execute",
+        lambda conn, cursor, statement, parameters, context, many: sent.append((statement, parameters)),
+    )
+
+    df = db.run_sql_query("sales_by_region", params={"region": "EU"})
+    quoted = db.run_sql_query("sales_by_region", params={"region": "EU' OR '1'='1"})
+
+    assert df["ID"].tolist() == [1, 2]
+    assert quoted.empty
+    assert all("EU" not in statement for statement, _ in sent)
+    assert sent[0][1] == ("EU",)
+
+
+def test_edited_sql_files_are_read_again(db, project):
+    write_query(project, "units", "SELECT UNITS FROM sales WHERE ID = 1")
+    assert db.run_sql_query("units")["UNITS"].tolist() == [10]
+
+    write_query(project, "units", "SELECT UNITS FROM sales WHERE ID = 3")
+    path = project / "02_data" / "02_input_query" / "units.sql"
+    # a new modification time even on file systems with coarse timestamps
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10**9))
+
+    assert db.run_sql_query("units")["UNITS"].tolist() == [3]
+
+
+def test_unchanged_sql_files_are_not_read_again(tmp_path, monkeypatch):
+    cache = SQLTemplateCache()
+    path = tmp_path / "q.sql"
+    path.write_text("SELECT 1")
+    assert cache.read(str(path)) == "SELECT 1"
+
+    monkeypatch.setattr("builtins.open", None)
+    assert cache.read(str(path)) == "SELECT 1"
+
+
+def test_statement_cache_evicts_the_oldest_statements():
+    cache = SQLTemplateCache(max_statements=2)
+    first = cache.statement("SELECT 1")
+    cache.statement("SELECT 2")
+    # a cache hit makes "SELECT 1" the most recently used
+    assert cache.statement("SELECT 1") is first
+
+    cache.statement("SELECT 3")
+
+    assert list(cache._statements) == ["SELECT 1", "SELECT 3"]
+    assert sql_templates.max_statements == 256
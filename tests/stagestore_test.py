@@ -0,0 +1,43 @@
+import pandas as pd
+from data_lib.stagestore import StageStore
+
+
+def sales():
+    return pd.DataFrame(
+        {
+            "YEAR": pd.Series([2023, 2024, 2024], dtype="int64"),
+            "REGION": ["EU", "EU", "US"],
+            "UNITS": [1.5, 2.0, 3.0],
+        }
+    )
+
+
+def test_partitioned_round_trip_keeps_types_and_order(tmp_path):
+    store = StageStore(str(tmp_path))
+    df = sales()
+
+    store.write(df, "sales", partition_by=["YEAR", "REGION"])
+    out = store.read("sales").sort_values(["YEAR", "REGION"], ignore_index=True)
+
+    pd.testing.assert_frame_equal(out, df)
+
+
+def test_partition_filters_use_the_partition_types(tmp_path):
+    store = StageStore(str(tmp_path))
+    store.write(sales(), "sales", partition_by=["YEAR"])
+
+    out = store.read("sales", columns=["YEAR", "UNITS"], filters=[("YEAR", ">", 2023)])
+
+    assert out["UNITS"].sort_values().tolist() == [2.0, 3.0]
+    assert out["YEAR"].dtype == "int64"
+
+
+def test_overwrite_partitions_only_replaces_written_partitions(tmp_path):
+    store = StageStore(str(tmp_path))
+    store.write(sales(), "sales", partition_by=["YEAR"])
+
+    update = pd.DataFrame({"YEAR": [2024], "REGION": ["APAC"], "UNITS": [9.0]})
+    store.write(update, "sales", partition_by=["YEAR"], mode="overwrite_partitions")
+
+    out = store.read("sales").sort_values("YEAR", ignore_index=True)
+    assert out[["YEAR", "REGION"]].values.tolist() == [[2023, "EU"], [2024, "APAC"]]
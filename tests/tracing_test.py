@@ -0,0 +1,63 @@
+import threading
+from data_lib.tracing import Tracer, tracer
+
+
+class ListSink:
+    def __init__(self):
+        self.spans = []
+
+    def emit(self, span):
+        self.spans.append(span)
+
+
+def test_concurrent_scopes_keep_their_spans():
+    tracer = Tracer()
+    barrier = threading.Barrier(2)
+    sinks = {"north": ListSink(), "south": ListSink()}
+
+    def report(run):
+        with tracer.scope(run, [sinks[run]]):
+            # both scopes are open before either traces
+            barrier.wait()
+            with tracer.span("run_sql_query", run):
+                pass
+            barrier.wait()
+
+    threads = [threading.Thread(target=report, args=(run,)) for run in sinks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for run, sink in sinks.items():
+        assert [(span.name, span.run) for span in sink.spans] == [(run, run)]
+    assert not tracer.enabled
+
+
+def test_nested_scopes_send_spans_to_every_open_sink():
+    tracer = Tracer()
+    outer, inner = ListSink(), ListSink()
+
+    with tracer.scope("nightly", [outer]):
+        with tracer.scope(sinks=[inner]):
+            with tracer.span("export_data", "sales"):
+                pass
+        with tracer.span("read_file", "input"):
+            pass
+
+    assert [span.name for span in outer.spans] == ["sales", "input"]
+    assert [(span.name, span.run) for span in inner.spans] == [("sales", "nightly")]
+
+
+def test_run_many_is_traced_in_the_caller_scope(db):
+    sink = ListSink()
+
+    with db.trace("nightly", [sink]):
+        results = db.run_many(
+            {"SELECT * FROM sales": None, "SELECT COUNT(*) AS N FROM sales": None}, max_workers=2
+        )
+
+    assert not results.errors
+    assert {span.name for span in sink.spans} == set(results)
+    assert {span.run for span in sink.spans} == {"nightly"}
+    assert not tracer.enabled
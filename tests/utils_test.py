@@ -0,0 +1,171 @@
+import pandas as pd
+import numpy as np
+from data_lib.datalibutils import (
+    split_sql_statements, optimize_dtypes, column_trim, normalize_nulls, number_to_string, clean_dataframe,
+)
+
+
+def test_split_sql_statements_on_semicolons():
+    script = "CREATE TABLE a (x INT);\nINSERT INTO a VALUES (1);\n\n;SELECT * FROM a"
+
+    assert split_sql_statements(script) == [
+        "CREATE TABLE a (x INT)",
+        "INSERT INTO a VALUES (1)",
+        "SELECT * FROM a",
+    ]
+
+
+def test_split_sql_statements_skips_quotes_and_comments():
+    script = (
+        "INSERT INTO notes VALUES ('a;b', 'it''s; fine');\n"
+        "-- a comment; not a statement\n"
+        "/* another; one */\n"
+        'SELECT "odd;name" FROM notes;'
+    )
+
+    statements = split_sql_statements(script)
+
+    assert len(statements) == 2
+    assert statements[0] == "INSERT INTO notes VALUES ('a;b', 'it''s; fine')"
+    assert statements[1].endswith('SELECT "odd;name" FROM notes')
+
+
+def test_split_sql_statements_drops_comment_only_parts():
+    assert split_sql_statements("-- nothing here;\n;  ;") == []
+
+
+def test_split_sql_statements_keeps_blocks_together():
+    script = (
+        "CREATE TRIGGER t AFTER INSERT ON s BEGIN INSERT INTO log VALUES (new.n); END;\n"
+        "BEGIN TRANSACTION;\n"
+        "SELECT CASE WHEN n > 0 THEN 'a;b' END FROM s;\n"
+        "CREATE FUNCTION f() RETURNS int AS $body$ BEGIN RETURN 1; END; $body$ LANGUAGE plpgsql;\n"
+        "BEGIN\n  IF x THEN y := 1; END IF;\n  z := 2;\nEND;\n"
+        "COMMIT"
+    )
+
+    statements = split_sql_statements(script)
+
+    assert [statement.split()[0] for statement in statements] == [
+        "CREATE", "BEGIN", "SELECT", "CREATE", "BEGIN", "COMMIT"
+    ]
+    assert statements[0].endswith("END")
+    assert statements[3].endswith("LANGUAGE plpgsql")
+    assert statements[4].endswith("END")
+
+
+def test_split_sql_statements_reads_positional_parameters():
+    assert split_sql_statements("SELECT $1 FROM t; SELECT $2 FROM t") == [
+        "SELECT $1 FROM t",
+        "SELECT $2 FROM t",
+    ]
+
+
+def test_optimize_dtypes_downcasts_integers():
+    df = pd.DataFrame({"SMALL": [1, 2, 3], "LARGE": [1, 2, 10**10], "RATE": [0.5, 1.5, 2.5]})
+
+    out, report = optimize_dtypes(df)
+
+    assert out["SMALL"].dtype == "int8"
+    assert out["LARGE"].dtype == "int64"
+    assert out["RATE"].dtype == "float64"
+    assert report["columns"]["SMALL"] == {
+        "dtype_before": "int64",
+        "dtype_after": "int8",
+        "bytes_before": 24,
+        "bytes_after": 3,
+    }
+    assert report["bytes_after"] < report["bytes_before"]
+    assert df["SMALL"].dtype == "int64"
+
+
+def test_optimize_dtypes_category_thresholds():
+    df = pd.DataFrame({"REGION": ["EU", "US"] * 5, "NAME": [f"n{i}" for i in range(10)]})
+
+    out, _ = optimize_dtypes(df, string_dtype=None)
+    assert out["REGION"].dtype == "category"
+    assert out["NAME"].dtype == object
+
+    out, _ = optimize_dtypes(df, category_ratio=1.0, string_dtype=None)
+    assert out["NAME"].dtype == "category"
+
+    out, _ = optimize_dtypes(df, max_categories=1, string_dtype=None)
+    assert out["REGION"].dtype == object
+
+
+def test_optimize_dtypes_string_dtype_fallback():
+    df = pd.DataFrame({"NAME": [f"n{i}" for i in range(10)], "MIXED": ["a", 1] * 5})
+
+    out, report = optimize_dtypes(df, category_ratio=0.1, string_dtype="string")
+
+    assert out["NAME"].dtype == "string"
+    # only columns of strings get the string dtype
+    assert out["MIXED"].dtype == object
+    assert report["columns"]["NAME"]["dtype_after"] == "string"
+
+
+def test_optimize_dtypes_skips_unhashable_columns():
+    df = pd.DataFrame({"TAGS": [["a"], ["b"], ["a"]], "N": [1, 2, 3]})
+
+    out, report = optimize_dtypes(df)
+
+    assert out["TAGS"].dtype == object
+    assert report["columns"]["TAGS"]["dtype_after"] == "object"
+    assert out["N"].dtype == "int8"
+
+
+def test_column_trim_leaves_other_values_alone():
+    df = pd.DataFrame({"NAME": [" a ", 5, None, "b  "], "EMPTY": [None, None, None, None]})
+
+    out = column_trim(df)
+
+    assert out["NAME"].tolist() == ["a", 5, None, "b"]
+    assert out["EMPTY"].isna().all()
+    assert df["NAME"].tolist() == [" a ", 5, None, "b  "]
+
+
+def test_number_to_string_converts_every_id_column_and_keeps_nan():
+    df = pd.DataFrame({"ORDER_ID": [1.0, np.nan], "STORE_ID": [7, 8], "UNITS": [1, 2]})
+
+    out = number_to_string(df)
+
+    assert out["ORDER_ID"].iloc[0] == "'1.0"
+    assert np.isnan(out["ORDER_ID"].iloc[1])
+    assert out["STORE_ID"].tolist() == ["'7", "'8"]
+    assert out["UNITS"].tolist() == [1, 2]
+
+
+def test_normalize_nulls_replaces_placeholders():
+    out = normalize_nulls(pd.DataFrame({"CITY": ["A", "NULL", "", "n/a"], "N": [1, 2, 3, 4]}))
+
+    assert out["CITY"].isna().tolist() == [False, True, True, True]
+
+
+def test_inplace_replaces_the_columns_of_the_frame():
+    df = pd.DataFrame({"NAME": [" a "], "UNITS": [1]})
+
+    copy = clean_dataframe(df, steps=["trim"])
+    assert copy is not df
+    assert df["NAME"].tolist() == [" a "]
+    # a shallow copy shares the untouched columns
+    assert np.shares_memory(copy["UNITS"].to_numpy(), df["UNITS"].to_numpy())
+
+    same = clean_dataframe(df, steps=["trim"], inplace=True)
+    assert same is df
+    assert df["NAME"].tolist() == ["a"]
+
+
+def test_clean_dataframe_runs_custom_steps_in_order():
+    calls = []
+
+    def upper(df, inplace=False):
+        calls.append(df["NAME"].tolist())
+        df["NAME"] = df["NAME"].str.upper()
+        return df
+
+    out = clean_dataframe(pd.DataFrame({"NAME": [" a ", "NULL"]}), steps=["trim", "nulls", upper])
+
+    # the custom step runs after the trim and nulls steps
+    assert calls[0][0] == "a" and pd.isna(calls[0][1])
+    assert out["NAME"].iloc[0] == "A"
+    assert pd.isna(out["NAME"].iloc[1])